@@ -0,0 +1,23 @@
+from strawberry.asgi import GraphQL
+from async_database import async_session
+from async_schemas import schema
+from loaders import AsyncLoaders
+from metrics import CONTENT_TYPE, METRICS_ENABLED, render_metrics
+
+
+# Run with an ASGI server, e.g. `uvicorn asgi:app --workers 4`.
+class StockGraphQL(GraphQL):
+    async def get_context(self, request, response):
+        return {"request": request, "response": response, "loaders": AsyncLoaders(async_session)}
+
+
+graphql_app = StockGraphQL(schema, multipart_uploads_enabled=True)
+
+
+async def app(scope, receive, send):
+    # Each worker process serves its own counters; scrape every worker.
+    if METRICS_ENABLED and scope["type"] == "http" and scope["path"] == "/metrics":
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", CONTENT_TYPE.encode())]})
+        await send({"type": "http.response.body", "body": render_metrics().encode()})
+        return
+    await graphql_app(scope, receive, send)
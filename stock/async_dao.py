@@ -0,0 +1,81 @@
+from typing import Any, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from dao import (
+    SupplierDAO,
+    ProductDAO,
+    CategoryDAO,
+    SupplierOrderDAO,
+    SupplierOrderItemDAO,
+    ConsumerOrderDAO,
+    ConsumerOrderItemDAO,
+    ConsumerDAO,
+    StockLevelDAO,
+    RecommendationDAO,
+    SearchDAO,
+)
+
+
+class AsyncDAO:
+    """Awaitable version of a DAO class.
+
+    Every method of ``dao_class`` is available as a coroutine with the same
+    arguments. It runs through ``AsyncSession.run_sync``, so the queries go out on
+    the asyncpg connection without blocking the event loop.
+    """
+
+    dao_class: type
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.dao_class, name)
+
+        async def run(*args, **kwargs):
+            return await self.session.run_sync(lambda sync_session: method(self.dao_class(sync_session), *args, **kwargs))
+
+        return run
+
+
+class AsyncSupplierDAO(AsyncDAO):
+    dao_class = SupplierDAO
+
+
+class AsyncProductDAO(AsyncDAO):
+    dao_class = ProductDAO
+
+
+class AsyncCategoryDAO(AsyncDAO):
+    dao_class = CategoryDAO
+
+
+class AsyncSupplierOrderDAO(AsyncDAO):
+    dao_class = SupplierOrderDAO
+
+
+class AsyncSupplierOrderItemDAO(AsyncDAO):
+    dao_class = SupplierOrderItemDAO
+
+
+class AsyncConsumerOrderDAO(AsyncDAO):
+    dao_class = ConsumerOrderDAO
+
+
+class AsyncConsumerOrderItemDAO(AsyncDAO):
+    dao_class = ConsumerOrderItemDAO
+
+
+class AsyncConsumerDAO(AsyncDAO):
+    dao_class = ConsumerDAO
+
+
+class AsyncStockLevelDAO(AsyncDAO):
+    dao_class = StockLevelDAO
+
+
+class AsyncRecommendationDAO(AsyncDAO):
+    dao_class = RecommendationDAO
+
+
+class AsyncSearchDAO(AsyncDAO):
+    dao_class = SearchDAO
@@ -0,0 +1,27 @@
+import os
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from database import DATABASE_URI, MAX_OVERFLOW, POOL_PRE_PING, POOL_RECYCLE, POOL_SIZE, POOL_TIMEOUT, pool_stats
+from metrics import METRICS_ENABLED, TimedAsyncQueuePool, instrument_engine
+from slow_queries import slow_query_log
+
+ASYNC_DATABASE_URI = os.environ.get("ASYNC_DATABASE_URI", DATABASE_URI.replace("+psycopg2", "+asyncpg"))
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URI,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+    pool_recycle=POOL_RECYCLE,
+    pool_pre_ping=POOL_PRE_PING,
+    poolclass=TimedAsyncQueuePool if METRICS_ENABLED else AsyncAdaptedQueuePool,
+)
+
+if METRICS_ENABLED:
+    instrument_engine(async_engine.sync_engine, "async", pool_stats)
+if slow_query_log is not None:
+    # asyncpg statements use $n placeholders, which the sync EXPLAIN connection cannot bind.
+    slow_query_log.instrument(async_engine.sync_engine, "async")
+
+# Objects are read after the session is closed, so nothing may expire on commit.
+async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,879 @@
+import asyncio
+import io
+import strawberry
+from strawberry.file_uploads import Upload
+from typing import Annotated, List, Optional
+from datetime import date
+
+from async_dao import (
+    AsyncSupplierDAO,
+    AsyncProductDAO,
+    AsyncCategoryDAO,
+    AsyncSupplierOrderDAO,
+    AsyncSupplierOrderItemDAO,
+    AsyncConsumerOrderDAO,
+    AsyncConsumerOrderItemDAO,
+    AsyncConsumerDAO,
+    AsyncStockLevelDAO,
+    AsyncRecommendationDAO,
+    AsyncSearchDAO,
+)
+from async_database import async_engine, async_session
+from autocomplete import suggestion_index
+from cache import catalog_cache
+from catalog_import import import_catalog
+from persisted_queries import document_extensions
+from database import engine, pool_stats
+from eager_loading import CONNECTION_PATH, load_options, selected_columns
+from models import Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer
+from query_cost import QueryCost, require_admin
+from recording import recording_extensions
+from metrics import metrics_extensions
+from slow_queries import SLOW_QUERY_RECENT, slow_query_log
+from pagination import Connection, DEFAULT_PAGE_SIZE, build_connection, decode_cursor, page_size
+from schemas import (
+    SupplierSchema,
+    ProductSchema,
+    CategorySchema,
+    SupplierOrderSchema,
+    SupplierOrderItemSchema,
+    ConsumerOrderSchema,
+    ConsumerOrderItemSchema,
+    ConsumerSchema,
+    StockLevelSchema,
+    RecommendationSchema,
+    ConsumerSearchResultSchema,
+    SupplierSearchResultSchema,
+    ProductSearchResultSchema,
+    SuggestionKind,
+    SuggestionSchema,
+    CatalogImportSchema,
+    CacheStatsSchema,
+    PoolStatsSchema,
+    SlowQuerySchema,
+    supplier_schema,
+    product_schema,
+    category_schema,
+    supplier_order_schema,
+    supplier_order_item_schema,
+    consumer_order_schema,
+    consumer_order_item_schema,
+    consumer_schema,
+    SortOrder,
+    OrderItemInput,
+    # The column-only product type some lookups return, named apart from the model.
+    Product as ProductType,
+)
+
+# Same operations as schemas.py for the asyncio entry point. Every resolver opens
+# its own AsyncSession, so sibling fields of one document run concurrently.
+
+
+def stock_level_schema(stock_level) -> StockLevelSchema:
+    return StockLevelSchema(
+        product_id=stock_level.product_id,
+        quantity=stock_level.quantity,
+        updated_at=stock_level.updated_at,
+    )
+
+
+@strawberry.type
+class Query:
+    # Supplier queries
+    @strawberry.field
+    async def get_supplier_by_id(self, info: strawberry.Info, supplier_id: int) -> Optional[SupplierSchema]:
+        options = load_options(info, Supplier)
+        if options:
+            async with async_session() as session:
+                supplier = await AsyncSupplierDAO(session).get_supplier_by_id(supplier_id, options)
+        else:
+            supplier = await info.context["loaders"].supplier.load(supplier_id)
+        return supplier_schema(supplier) if supplier else None
+
+    @strawberry.field
+    async def get_all_suppliers(self, info: strawberry.Info) -> List[SupplierSchema]:
+        keys = selected_columns(info, Supplier)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncSupplierDAO(session).get_all_supplier_rows(keys)
+            suppliers = await AsyncSupplierDAO(session).get_all_suppliers(load_options(info, Supplier, project=True))
+        return [supplier_schema(supplier) for supplier in suppliers]
+
+    @strawberry.field
+    async def get_supplier_by_name(self, supplier_name: str) -> Optional[SupplierSchema]:
+        async with async_session() as session:
+            supplier = await AsyncSupplierDAO(session).get_supplier_by_name(supplier_name)
+        return supplier_schema(supplier) if supplier else None
+
+    @strawberry.field
+    async def get_suppliers_by_categories_id(self, category_ids: List[int]) -> List[SupplierSchema]:
+        async with async_session() as session:
+            suppliers = await AsyncSupplierDAO(session).get_supplier_by_categories_id(category_ids)
+        return [supplier_schema(supplier) for supplier in suppliers]
+
+    @strawberry.field
+    async def get_supplier_by_category_name(self, category_name: str) -> List[SupplierSchema]:
+        async with async_session() as session:
+            suppliers = await AsyncSupplierDAO(session).get_supplier_by_category_name(category_name)
+        return [supplier_schema(supplier) for supplier in suppliers]
+
+    # Product queries
+    @strawberry.field
+    async def get_product_by_id(self, info: strawberry.Info, product_id: int) -> Optional[ProductSchema]:
+        options = load_options(info, Product)
+        if options:
+            async with async_session() as session:
+                product = await AsyncProductDAO(session).get_product_by_id(product_id, options)
+        else:
+            product = await info.context["loaders"].product.load(product_id)
+        return product_schema(product) if product else None
+
+    @strawberry.field
+    async def get_all_products(self, info: strawberry.Info) -> List[ProductSchema]:
+        keys = selected_columns(info, Product)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncProductDAO(session).get_all_product_rows(keys)
+            products = await AsyncProductDAO(session).get_all_products(load_options(info, Product, project=True))
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_product_by_name(self, product_name: str) -> Optional[ProductSchema]:
+        async with async_session() as session:
+            product = await AsyncProductDAO(session).get_product_by_name(product_name)
+        return product_schema(product) if product else None
+
+    @strawberry.field
+    async def get_products_by_category_id(self, category_id: int) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_category_id(category_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_supplierid(self, supplier_id: int) -> List[ProductType]:
+        async with async_session() as session:
+            products = await AsyncSupplierDAO(session).get_supplier_products(supplier_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_suppliers_by_product_name(self, product_name: str) -> List[SupplierSchema]:
+        async with async_session() as session:
+            suppliers = await AsyncProductDAO(session).get_suppliers_by_product_name(product_name)
+        return [supplier_schema(supplier) for supplier in suppliers]
+
+    @strawberry.field
+    async def get_supplier_by_productid(self, info: strawberry.Info, product_id: int) -> Optional[SupplierSchema]:
+        supplier = await info.context["loaders"].supplier_by_product.load(product_id)
+        return supplier_schema(supplier) if supplier else None
+
+    @strawberry.field
+    async def get_products_by_consumer_order_item(self, consumer_order_item_id: int) -> List[ProductType]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_consumer_order_item(consumer_order_item_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_supplier_order_item(self, supplier_order_item_id: int) -> List[ProductType]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_supplier_order_item(supplier_order_item_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_supplier_order_id(self, supplier_order_id: int) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_supplierorder_id(supplier_order_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_supplier_order_date(self, supplier_order_date: date) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_supplierorder_date(supplier_order_date)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_category_name(self, category_name: str) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_category_name(category_name)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_supplier_name(self, supplier_name: str) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_supplier_name(supplier_name)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_customer_order_date(self, order_date: str) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_customer_order_date(order_date)
+        return [product_schema(product) for product in products]
+
+    # Category queries
+    @strawberry.field
+    async def get_category_by_id(self, info: strawberry.Info, category_id: int) -> Optional[CategorySchema]:
+        category = await info.context["loaders"].category.load(category_id)
+        return category_schema(category) if category else None
+
+    @strawberry.field
+    async def get_all_categories(self, info: strawberry.Info) -> List[CategorySchema]:
+        keys = selected_columns(info, Category)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncCategoryDAO(session).get_all_category_rows(keys)
+            categories = await AsyncCategoryDAO(session).get_all_categories()
+        return [category_schema(category) for category in categories]
+
+    @strawberry.field
+    async def get_category_by_name(self, category_name: str) -> Optional[CategorySchema]:
+        async with async_session() as session:
+            category = await AsyncCategoryDAO(session).get_category_by_name(category_name)
+        return category_schema(category) if category else None
+
+    @strawberry.field
+    async def get_category_by_supplierid(self, supplier_id: int) -> List[CategorySchema]:
+        async with async_session() as session:
+            categories = await AsyncCategoryDAO(session).get_category_by_supplierid(supplier_id)
+        return [category_schema(category) for category in categories]
+
+    @strawberry.field
+    async def get_category_by_suppliername(self, supplier_name: str) -> List[CategorySchema]:
+        async with async_session() as session:
+            categories = await AsyncCategoryDAO(session).get_category_by_suppliername(supplier_name)
+        return [category_schema(category) for category in categories]
+
+    # SupplierOrder queries
+    @strawberry.field
+    async def get_supplier_order_by_id(self, info: strawberry.Info, supplier_order_id: int) -> Optional[SupplierOrderSchema]:
+        options = load_options(info, SupplierOrder)
+        if options:
+            async with async_session() as session:
+                supplier_order = await AsyncSupplierOrderDAO(session).get_supplier_order_by_id(supplier_order_id, options)
+        else:
+            supplier_order = await info.context["loaders"].supplier_order.load(supplier_order_id)
+        return supplier_order_schema(supplier_order) if supplier_order else None
+
+    @strawberry.field
+    async def get_all_supplier_orders(self, info: strawberry.Info) -> List[SupplierOrderSchema]:
+        keys = selected_columns(info, SupplierOrder)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncSupplierOrderDAO(session).get_all_supplier_order_rows(keys)
+            supplier_orders = await AsyncSupplierOrderDAO(session).get_all_supplier_orders(load_options(info, SupplierOrder, project=True))
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
+
+    @strawberry.field
+    async def get_supplier_orders_by_order_date(self, info: strawberry.Info, order_date: date) -> List[SupplierOrderSchema]:
+        keys = selected_columns(info, SupplierOrder)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncSupplierOrderDAO(session).get_supplier_order_rows_by_order_date(order_date, keys)
+            supplier_orders = await AsyncSupplierOrderDAO(session).get_supplier_orders_by_order_date(order_date)
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
+
+    @strawberry.field
+    async def get_supplier_orders_by_supplier_id(self, info: strawberry.Info, supplier_id: int) -> List[SupplierOrderSchema]:
+        keys = selected_columns(info, SupplierOrder)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncSupplierOrderDAO(session).get_supplier_order_rows_by_supplier_id(supplier_id, keys)
+            supplier_orders = await AsyncSupplierOrderDAO(session).get_supplier_orders_by_supplier_id(supplier_id)
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
+
+    @strawberry.field
+    async def get_supplier_orders_by_product(self, product_name: str) -> List[SupplierOrderSchema]:
+        async with async_session() as session:
+            supplier_orders = await AsyncSupplierOrderDAO(session).get_supplier_orders_by_product(product_name)
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
+
+    # SupplierOrderItem queries
+    @strawberry.field
+    async def get_supplier_order_item_by_id(self, info: strawberry.Info, supplier_order_item_id: int) -> Optional[SupplierOrderItemSchema]:
+        options = load_options(info, SupplierOrderItem)
+        if options:
+            async with async_session() as session:
+                supplier_order_item = await AsyncSupplierOrderItemDAO(session).get_supplier_order_item_by_id(supplier_order_item_id, options)
+        else:
+            supplier_order_item = await info.context["loaders"].supplier_order_item.load(supplier_order_item_id)
+        return supplier_order_item_schema(supplier_order_item) if supplier_order_item else None
+
+    @strawberry.field
+    async def get_all_supplier_order_items(self, info: strawberry.Info) -> List[SupplierOrderItemSchema]:
+        keys = selected_columns(info, SupplierOrderItem)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncSupplierOrderItemDAO(session).get_all_supplier_order_item_rows(keys)
+            supplier_order_items = await AsyncSupplierOrderItemDAO(session).get_all_supplier_order_items(load_options(info, SupplierOrderItem, project=True))
+        return [supplier_order_item_schema(supplier_order_item) for supplier_order_item in supplier_order_items]
+
+    # ConsumerOrder queries
+    @strawberry.field
+    async def get_consumer_order_by_id(self, info: strawberry.Info, consumer_order_id: int) -> Optional[ConsumerOrderSchema]:
+        options = load_options(info, ConsumerOrder)
+        if options:
+            async with async_session() as session:
+                consumer_order = await AsyncConsumerOrderDAO(session).get_consumer_order_by_id(consumer_order_id, options)
+        else:
+            consumer_order = await info.context["loaders"].consumer_order.load(consumer_order_id)
+        return consumer_order_schema(consumer_order) if consumer_order else None
+
+    @strawberry.field
+    async def get_all_consumer_orders(self, info: strawberry.Info) -> List[ConsumerOrderSchema]:
+        keys = selected_columns(info, ConsumerOrder)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncConsumerOrderDAO(session).get_all_consumer_order_rows(keys)
+            consumer_orders = await AsyncConsumerOrderDAO(session).get_all_consumer_orders(load_options(info, ConsumerOrder, project=True))
+        return [consumer_order_schema(consumer_order) for consumer_order in consumer_orders]
+
+    @strawberry.field
+    async def get_consumer_orders_by_order_date(self, info: strawberry.Info, order_date: date) -> List[ConsumerOrderSchema]:
+        keys = selected_columns(info, ConsumerOrder)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncConsumerOrderDAO(session).get_consumer_order_rows_by_order_date(order_date, keys)
+            consumer_orders = await AsyncConsumerOrderDAO(session).get_consumer_orders_by_order_date(order_date)
+        return [consumer_order_schema(consumer_order) for consumer_order in consumer_orders]
+
+    # Date-range queries; from and to are both inclusive and either may be omitted.
+    @strawberry.field
+    async def get_supplier_orders_by_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        supplier_id: Optional[int] = None,
+        sort: SortOrder = SortOrder.ASC,
+    ) -> List[SupplierOrderSchema]:
+        async with async_session() as session:
+            supplier_orders = await AsyncSupplierOrderDAO(session).get_supplier_orders_by_date_range(
+                from_date, to_date, supplier_id, sort == SortOrder.DESC
+            )
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
+
+    @strawberry.field
+    async def get_consumer_orders_by_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        consumer_id: Optional[int] = None,
+        sort: SortOrder = SortOrder.ASC,
+    ) -> List[ConsumerOrderSchema]:
+        async with async_session() as session:
+            consumer_orders = await AsyncConsumerOrderDAO(session).get_consumer_orders_by_date_range(
+                from_date, to_date, consumer_id, sort == SortOrder.DESC
+            )
+        return [consumer_order_schema(consumer_order) for consumer_order in consumer_orders]
+
+    @strawberry.field
+    async def get_products_by_supplier_order_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        supplier_id: Optional[int] = None,
+    ) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_supplier_order_date_range(from_date, to_date, supplier_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_products_by_consumer_order_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        consumer_id: Optional[int] = None,
+    ) -> List[ProductSchema]:
+        async with async_session() as session:
+            products = await AsyncProductDAO(session).get_products_by_consumer_order_date_range(from_date, to_date, consumer_id)
+        return [product_schema(product) for product in products]
+
+    @strawberry.field
+    async def get_all_consumer_orders_by_product(self, product_name: str) -> List[ConsumerOrderSchema]:
+        async with async_session() as session:
+            consumer_orders = await AsyncConsumerOrderDAO(session).get_all_consumer_orders_by_product(product_name)
+        return [consumer_order_schema(consumer_order) for consumer_order in consumer_orders]
+
+    # ConsumerOrderItem queries
+    @strawberry.field
+    async def get_consumer_order_item_by_id(self, info: strawberry.Info, consumer_order_item_id: int) -> Optional[ConsumerOrderItemSchema]:
+        options = load_options(info, ConsumerOrderItem)
+        if options:
+            async with async_session() as session:
+                consumer_order_item = await AsyncConsumerOrderItemDAO(session).get_consumer_order_item_by_id(consumer_order_item_id, options)
+        else:
+            consumer_order_item = await info.context["loaders"].consumer_order_item.load(consumer_order_item_id)
+        return consumer_order_item_schema(consumer_order_item) if consumer_order_item else None
+
+    @strawberry.field
+    async def get_all_consumer_order_items(self, info: strawberry.Info) -> List[ConsumerOrderItemSchema]:
+        keys = selected_columns(info, ConsumerOrderItem)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncConsumerOrderItemDAO(session).get_all_consumer_order_item_rows(keys)
+            consumer_order_items = await AsyncConsumerOrderItemDAO(session).get_all_consumer_order_items(load_options(info, ConsumerOrderItem, project=True))
+        return [consumer_order_item_schema(consumer_order_item) for consumer_order_item in consumer_order_items]
+
+    # Consumer queries
+    @strawberry.field
+    async def get_consumer_by_id(self, info: strawberry.Info, consumer_id: int) -> Optional[ConsumerSchema]:
+        options = load_options(info, Consumer)
+        if options:
+            async with async_session() as session:
+                consumer = await AsyncConsumerDAO(session).get_consumer_by_id(consumer_id, options)
+        else:
+            consumer = await info.context["loaders"].consumer.load(consumer_id)
+        return consumer_schema(consumer) if consumer else None
+
+    @strawberry.field
+    async def get_consumers_by_name(self, name: str) -> List[ConsumerSchema]:
+        async with async_session() as session:
+            consumers = await AsyncConsumerDAO(session).get_consumers_by_name(name)
+        return [consumer_schema(consumer) for consumer in consumers]
+
+    @strawberry.field
+    async def get_all_consumers(self, info: strawberry.Info) -> List[ConsumerSchema]:
+        keys = selected_columns(info, Consumer)
+        async with async_session() as session:
+            if keys is not None:
+                return await AsyncConsumerDAO(session).get_all_consumer_rows(keys)
+            consumers = await AsyncConsumerDAO(session).get_all_consumers(load_options(info, Consumer, project=True))
+        return [consumer_schema(consumer) for consumer in consumers]
+
+    # Paginated list queries
+    @strawberry.field
+    async def get_all_suppliers_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[SupplierSchema]:
+        async with async_session() as session:
+            suppliers, has_next_page = await AsyncSupplierDAO(session).get_suppliers_page(
+                page_size(first), decode_cursor(after), options=load_options(info, Supplier, CONNECTION_PATH, project=True)
+            )
+        return build_connection([supplier_schema(supplier) for supplier in suppliers], has_next_page)
+
+    @strawberry.field
+    async def get_all_products_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ProductSchema]:
+        async with async_session() as session:
+            products, has_next_page = await AsyncProductDAO(session).get_products_page(
+                page_size(first), decode_cursor(after), options=load_options(info, Product, CONNECTION_PATH, project=True)
+            )
+        return build_connection([product_schema(product) for product in products], has_next_page)
+
+    @strawberry.field
+    async def get_all_categories_connection(self, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[CategorySchema]:
+        async with async_session() as session:
+            categories, has_next_page = await AsyncCategoryDAO(session).get_categories_page(page_size(first), decode_cursor(after))
+        return build_connection([category_schema(category) for category in categories], has_next_page)
+
+    @strawberry.field
+    async def get_all_supplier_orders_connection(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        order_by_date: bool = False,
+    ) -> Connection[SupplierOrderSchema]:
+        # Keyset cursors over (order_date, id) need the date even when it is not selected.
+        keep = ("order_date",) if order_by_date else ()
+        options = load_options(info, SupplierOrder, CONNECTION_PATH, project=True, keep=keep)
+        async with async_session() as session:
+            supplier_orders, has_next_page = await AsyncSupplierOrderDAO(session).get_supplier_orders_page(
+                page_size(first), decode_cursor(after), order_by_date, options=options
+            )
+        return build_connection(
+            [supplier_order_schema(supplier_order) for supplier_order in supplier_orders],
+            has_next_page,
+            ("order_date", "id") if order_by_date else ("id",),
+        )
+
+    @strawberry.field
+    async def get_all_supplier_order_items_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[SupplierOrderItemSchema]:
+        async with async_session() as session:
+            supplier_order_items, has_next_page = await AsyncSupplierOrderItemDAO(session).get_supplier_order_items_page(
+                page_size(first), decode_cursor(after), options=load_options(info, SupplierOrderItem, CONNECTION_PATH, project=True)
+            )
+        return build_connection(
+            [supplier_order_item_schema(supplier_order_item) for supplier_order_item in supplier_order_items],
+            has_next_page,
+        )
+
+    @strawberry.field
+    async def get_all_consumer_orders_connection(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        order_by_date: bool = False,
+    ) -> Connection[ConsumerOrderSchema]:
+        # Keyset cursors over (order_date, id) need the date even when it is not selected.
+        keep = ("order_date",) if order_by_date else ()
+        options = load_options(info, ConsumerOrder, CONNECTION_PATH, project=True, keep=keep)
+        async with async_session() as session:
+            consumer_orders, has_next_page = await AsyncConsumerOrderDAO(session).get_consumer_orders_page(
+                page_size(first), decode_cursor(after), order_by_date, options=options
+            )
+        return build_connection(
+            [consumer_order_schema(consumer_order) for consumer_order in consumer_orders],
+            has_next_page,
+            ("order_date", "id") if order_by_date else ("id",),
+        )
+
+    @strawberry.field
+    async def get_all_consumer_order_items_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ConsumerOrderItemSchema]:
+        async with async_session() as session:
+            consumer_order_items, has_next_page = await AsyncConsumerOrderItemDAO(session).get_consumer_order_items_page(
+                page_size(first), decode_cursor(after), options=load_options(info, ConsumerOrderItem, CONNECTION_PATH, project=True)
+            )
+        return build_connection(
+            [consumer_order_item_schema(consumer_order_item) for consumer_order_item in consumer_order_items],
+            has_next_page,
+        )
+
+    @strawberry.field
+    async def get_all_consumers_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ConsumerSchema]:
+        async with async_session() as session:
+            consumers, has_next_page = await AsyncConsumerDAO(session).get_consumers_page(
+                page_size(first), decode_cursor(after), options=load_options(info, Consumer, CONNECTION_PATH, project=True)
+            )
+        return build_connection([consumer_schema(consumer) for consumer in consumers], has_next_page)
+
+    # Stock queries
+    @strawberry.field
+    async def stock_level(self, product_id: int) -> StockLevelSchema:
+        async with async_session() as session:
+            return stock_level_schema(await AsyncStockLevelDAO(session).get_stock_level(product_id))
+
+    @strawberry.field
+    async def stock_levels(self, ids: List[int]) -> List[StockLevelSchema]:
+        async with async_session() as session:
+            stock_levels = {
+                stock_level.product_id: stock_level
+                for stock_level in await AsyncStockLevelDAO(session).get_stock_levels_by_product_ids(ids)
+            }
+        return [stock_level_schema(stock_levels[product_id]) for product_id in ids if product_id in stock_levels]
+
+    # Recommendation queries
+    @strawberry.field
+    async def frequently_bought_with(self, product_id: int, limit: int = 5) -> List[RecommendationSchema]:
+        async with async_session() as session:
+            recommendations = await AsyncRecommendationDAO(session).get_frequently_bought_with(product_id, limit)
+        return [
+            RecommendationSchema(product=product_schema(product), order_count=order_count)
+            for product, order_count in recommendations
+        ]
+
+    # Search queries, best match first
+    @strawberry.field
+    async def search_consumers(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[ConsumerSearchResultSchema]:
+        async with async_session() as session:
+            hits, has_next_page = await AsyncSearchDAO(session).search_consumers(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [ConsumerSearchResultSchema(consumer=consumer_schema(consumer), score=score) for consumer, score in hits],
+            has_next_page,
+            keys=[[score, consumer.id] for consumer, score in hits],
+        )
+
+    @strawberry.field
+    async def search_suppliers(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[SupplierSearchResultSchema]:
+        async with async_session() as session:
+            hits, has_next_page = await AsyncSearchDAO(session).search_suppliers(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [SupplierSearchResultSchema(supplier=supplier_schema(supplier), score=score) for supplier, score in hits],
+            has_next_page,
+            keys=[[score, supplier.id] for supplier, score in hits],
+        )
+
+    @strawberry.field
+    async def search_products(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[ProductSearchResultSchema]:
+        async with async_session() as session:
+            hits, has_next_page = await AsyncSearchDAO(session).search_products(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [ProductSearchResultSchema(product=product_schema(product), score=score) for product, score in hits],
+            has_next_page,
+            keys=[[score, product.id] for product, score in hits],
+        )
+
+    # Autocomplete, answered from the in-process prefix index
+    @strawberry.field
+    async def suggest(self, prefix: str, limit: int = 10, kinds: Optional[List[SuggestionKind]] = None) -> List[SuggestionSchema]:
+        if suggestion_index.needs_load():
+            async with async_session() as session:
+                await session.run_sync(suggestion_index.ensure_loaded)
+        return [
+            SuggestionSchema(kind=SuggestionKind(suggestion.kind), id=suggestion.id, name=suggestion.name)
+            for suggestion in suggestion_index.suggest(prefix, limit, [kind.value for kind in kinds] if kinds else None)
+        ]
+
+    @strawberry.field
+    async def get_catalog_cache_stats(self, info: strawberry.Info) -> CacheStatsSchema:
+        require_admin(info)
+        return CacheStatsSchema(**catalog_cache.stats())
+
+    @strawberry.field
+    async def get_db_pool_stats(self, info: strawberry.Info) -> PoolStatsSchema:
+        require_admin(info)
+        return PoolStatsSchema(**pool_stats(async_engine.pool))
+
+    @strawberry.field
+    async def get_slow_queries(self, info: strawberry.Info, limit: int = 20) -> List[SlowQuerySchema]:
+        require_admin(info)
+        if slow_query_log is None:
+            return []
+        return [SlowQuerySchema(**vars(record)) for record in slow_query_log.slow_queries(min(limit, SLOW_QUERY_RECENT))]
+
+
+@strawberry.type
+class Mutation:
+    # Supplier mutations
+    @strawberry.mutation
+    async def create_supplier(self, name: str, contact_number: str) -> SupplierSchema:
+        async with async_session() as session:
+            supplier = await AsyncSupplierDAO(session).create_supplier(name, contact_number)
+        return supplier_schema(supplier)
+
+    @strawberry.mutation
+    async def update_supplier(
+        self,
+        supplier_id: int,
+        name: Optional[str] = None,
+        contact_number: Optional[str] = None,
+    ) -> Optional[SupplierSchema]:
+        async with async_session() as session:
+            supplier = await AsyncSupplierDAO(session).update_supplier(supplier_id, name, contact_number)
+        return supplier_schema(supplier) if supplier else None
+
+    @strawberry.mutation
+    async def delete_supplier(self, supplier_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncSupplierDAO(session).delete_supplier(supplier_id)
+
+    # Product mutations
+    @strawberry.mutation
+    async def create_product(
+        self,
+        name: str,
+        unit_price: float,
+        description: str,
+        category_id: int,
+    ) -> ProductSchema:
+        async with async_session() as session:
+            product = await AsyncProductDAO(session).create_product(name, unit_price, description, category_id)
+        return product_schema(product)
+
+    @strawberry.mutation
+    async def update_product(
+        self,
+        product_id: int,
+        name: Optional[str] = None,
+        unit_price: Optional[float] = None,
+        description: Optional[str] = None,
+    ) -> Optional[ProductSchema]:
+        async with async_session() as session:
+            product = await AsyncProductDAO(session).update_product(product_id, name, unit_price, description)
+        return product_schema(product) if product else None
+
+    @strawberry.mutation
+    async def delete_product(self, product_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncProductDAO(session).delete_product(product_id)
+
+    @strawberry.mutation
+    async def import_catalog(self, file: Upload, format: str = "csv") -> CatalogImportSchema:
+        # The import streams through psycopg2's COPY, so it runs on the sync engine in a worker thread.
+        stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        result = await asyncio.to_thread(import_catalog, engine, stream, format)
+        return CatalogImportSchema(
+            inserted=result.inserted,
+            updated=result.updated,
+            rejected=result.rejected,
+            suppliers_inserted=result.suppliers_inserted,
+            categories_inserted=result.categories_inserted,
+        )
+
+    # Category mutations
+    @strawberry.mutation
+    async def create_category(self, category_name: str) -> CategorySchema:
+        async with async_session() as session:
+            category = await AsyncCategoryDAO(session).create_category(category_name)
+        return category_schema(category)
+
+    @strawberry.mutation
+    async def update_category(self, category_id: int, category_name: str) -> Optional[CategorySchema]:
+        async with async_session() as session:
+            category = await AsyncCategoryDAO(session).update_category(category_id, category_name)
+        return category_schema(category) if category else None
+
+    @strawberry.mutation
+    async def delete_category(self, category_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncCategoryDAO(session).delete_category(category_id)
+
+    # SupplierOrder mutations
+    @strawberry.mutation
+    async def create_supplier_order(self, supplier_id: int, order_date: date, total_amount: float) -> SupplierOrderSchema:
+        async with async_session() as session:
+            supplier_order = await AsyncSupplierOrderDAO(session).create_supplier_order(supplier_id, order_date, total_amount)
+        return supplier_order_schema(supplier_order)
+
+    @strawberry.mutation
+    async def update_supplier_order(
+        self,
+        supplier_order_id: int,
+        order_date: Optional[date] = None,
+        total_amount: Optional[float] = None,
+    ) -> Optional[SupplierOrderSchema]:
+        async with async_session() as session:
+            supplier_order = await AsyncSupplierOrderDAO(session).update_supplier_order(supplier_order_id, order_date, total_amount)
+        return supplier_order_schema(supplier_order) if supplier_order else None
+
+    @strawberry.mutation
+    async def delete_supplier_order(self, supplier_order_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncSupplierOrderDAO(session).delete_supplier_order(supplier_order_id)
+
+    # SupplierOrderItem mutations
+    @strawberry.mutation
+    async def create_supplier_order_item(
+        self,
+        supplier_order_id: int,
+        product_id: int,
+        item_name: str,
+        quantity: int,
+        unit_price: float,
+        total_price: Optional[float],
+    ) -> SupplierOrderItemSchema:
+        async with async_session() as session:
+            supplier_order_item = await AsyncSupplierOrderItemDAO(session).create_supplier_order_item(
+                supplier_order_id=supplier_order_id,
+                product_id=product_id,
+                item_name=item_name,
+                quantity=quantity,
+                unit_price=unit_price,
+                total_price=total_price,
+            )
+        return supplier_order_item_schema(supplier_order_item)
+
+    @strawberry.mutation
+    async def create_supplier_order_items(self, supplier_order_id: int, items: List[OrderItemInput]) -> List[SupplierOrderItemSchema]:
+        async with async_session() as session:
+            supplier_order_items = await AsyncSupplierOrderItemDAO(session).create_supplier_order_items(
+                supplier_order_id, [strawberry.asdict(item) for item in items]
+            )
+        return [supplier_order_item_schema(supplier_order_item) for supplier_order_item in supplier_order_items]
+
+    @strawberry.mutation
+    async def update_supplier_order_item(
+        self,
+        supplier_order_item_id: int,
+        item_name: Optional[str] = None,
+        quantity: Optional[int] = None,
+        unit_price: Optional[float] = None,
+        total_price: Optional[float] = None,
+    ) -> Optional[SupplierOrderItemSchema]:
+        async with async_session() as session:
+            supplier_order_item = await AsyncSupplierOrderItemDAO(session).update_supplier_order_item(
+                supplier_order_item_id,
+                item_name=item_name,
+                quantity=quantity,
+                unit_price=unit_price,
+                total_price=total_price,
+            )
+        return supplier_order_item_schema(supplier_order_item) if supplier_order_item else None
+
+    @strawberry.mutation
+    async def delete_supplier_order_item(self, supplier_order_item_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncSupplierOrderItemDAO(session).delete_supplier_order_item(supplier_order_item_id)
+
+    # ConsumerOrder mutations
+    @strawberry.mutation
+    async def create_consumer_order(self, consumer_id: int, order_date: date, total_amount: float) -> ConsumerOrderSchema:
+        async with async_session() as session:
+            consumer_order = await AsyncConsumerOrderDAO(session).create_consumer_order(consumer_id, order_date, total_amount)
+        return consumer_order_schema(consumer_order)
+
+    @strawberry.mutation
+    async def update_consumer_order(
+        self,
+        consumer_order_id: int,
+        order_date: Optional[date] = None,
+        total_amount: Optional[float] = None,
+    ) -> Optional[ConsumerOrderSchema]:
+        async with async_session() as session:
+            consumer_order = await AsyncConsumerOrderDAO(session).update_consumer_order(consumer_order_id, order_date, total_amount)
+        return consumer_order_schema(consumer_order) if consumer_order else None
+
+    @strawberry.mutation
+    async def delete_consumer_order(self, consumer_order_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncConsumerOrderDAO(session).delete_consumer_order(consumer_order_id)
+
+    # ConsumerOrderItem mutations
+    @strawberry.mutation
+    async def create_consumer_order_item(
+        self,
+        consumer_order_id: int,
+        product_id: int,
+        item_name: str,
+        quantity: int,
+        unit_price: float,
+    ) -> ConsumerOrderItemSchema:
+        async with async_session() as session:
+            consumer_order_item = await AsyncConsumerOrderItemDAO(session).create_consumer_order_item(
+                consumer_order_id, product_id, item_name, quantity, unit_price
+            )
+        return consumer_order_item_schema(consumer_order_item)
+
+    @strawberry.mutation
+    async def create_consumer_order_items(self, consumer_order_id: int, items: List[OrderItemInput]) -> List[ConsumerOrderItemSchema]:
+        async with async_session() as session:
+            consumer_order_items = await AsyncConsumerOrderItemDAO(session).create_consumer_order_items(
+                consumer_order_id, [strawberry.asdict(item) for item in items]
+            )
+        return [consumer_order_item_schema(consumer_order_item) for consumer_order_item in consumer_order_items]
+
+    @strawberry.mutation
+    async def update_consumer_order_item(
+        self,
+        consumer_order_item_id: int,
+        item_name: Optional[str] = None,
+        quantity: Optional[int] = None,
+        unit_price: Optional[float] = None,
+    ) -> Optional[ConsumerOrderItemSchema]:
+        async with async_session() as session:
+            consumer_order_item = await AsyncConsumerOrderItemDAO(session).update_consumer_order_item(
+                consumer_order_item_id, item_name, quantity, unit_price
+            )
+        return consumer_order_item_schema(consumer_order_item) if consumer_order_item else None
+
+    @strawberry.mutation
+    async def delete_consumer_order_item(self, consumer_order_item_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncConsumerOrderItemDAO(session).delete_consumer_order_item(consumer_order_item_id)
+
+    # Consumer mutations
+    @strawberry.mutation
+    async def create_consumer(self, name: str, contact_number: str) -> ConsumerSchema:
+        async with async_session() as session:
+            consumer = await AsyncConsumerDAO(session).create_consumer(name, contact_number)
+        return consumer_schema(consumer)
+
+    @strawberry.mutation
+    async def update_consumer(
+        self,
+        consumer_id: int,
+        name: Optional[str] = None,
+        contact_number: Optional[str] = None,
+    ) -> Optional[ConsumerSchema]:
+        async with async_session() as session:
+            consumer = await AsyncConsumerDAO(session).update_consumer(consumer_id, name, contact_number)
+        return consumer_schema(consumer) if consumer else None
+
+    @strawberry.mutation
+    async def delete_consumer(self, consumer_id: int) -> bool:
+        async with async_session() as session:
+            return await AsyncConsumerDAO(session).delete_consumer(consumer_id)
+
+
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[*document_extensions, QueryCost, *recording_extensions, *metrics_extensions])
@@ -0,0 +1,136 @@
+"""In-process prefix index for autocomplete over product, supplier and category names.
+
+Every worker keeps the names in one sorted list and answers a prefix with a bisect
+plus a short scan, so a keystroke costs microseconds and no database round trip.
+The list is built from a single query, kept current by the DAO writes of this
+process and rebuilt every ``SUGGEST_REFRESH_SECONDS`` to pick up writes made by
+other workers.
+"""
+import bisect
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+from models import Category, Product, Supplier
+
+PRODUCT = "product"
+SUPPLIER = "supplier"
+CATEGORY = "category"
+
+MAX_SUGGESTIONS = 50
+
+REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", 300))
+
+# (name, kind, id): about 150 bytes per name, so a million names is roughly 150 MB.
+Entry = Tuple[str, str, int]
+
+
+def sort_key(entry: Entry) -> Tuple[str, str, int]:
+    return entry[0].casefold(), entry[1], entry[2]
+
+
+def prefix_key(entry: Entry) -> str:
+    return entry[0].casefold()
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    kind: str
+    id: int
+    name: str
+
+
+class PrefixIndex:
+    """Names sorted case-insensitively and searched with bisect.
+
+    Writers copy the list, change the copy and swap it in under a lock, so a
+    lookup always walks one consistent list without locking. A write costs one
+    list copy, which is fine for catalog edits that happen far less often than
+    keystrokes.
+    """
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._entries: List[Entry] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def load(self, session: Session) -> int:
+        """Rebuilds the index from one query over the three name columns; returns the name count."""
+        rows = session.execute(union_all(
+            select(Product.name, literal(PRODUCT), Product.id).where(Product.name.isnot(None)),
+            select(Supplier.name, literal(SUPPLIER), Supplier.id).where(Supplier.name.isnot(None)),
+            select(Category.category_name, literal(CATEGORY), Category.id).where(Category.category_name.isnot(None)),
+        )).all()
+        self.replace(rows)
+        return len(rows)
+
+    def ensure_loaded(self, session: Session) -> None:
+        if not self.needs_load():
+            return
+        with self._load_lock:
+            # Another request may have rebuilt it while this one waited.
+            if self.needs_load():
+                self.load(session)
+
+    def replace(self, rows: Iterable[Sequence]) -> None:
+        entries = sorted(((name, kind, entity_id) for name, kind, entity_id in rows), key=sort_key)
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        # The next lookup rebuilds the index, e.g. after a bulk catalog import.
+        with self._lock:
+            self._loaded_at = None
+
+    def put(self, kind: str, entity_id: int, name: Optional[str], old_name: Optional[str] = None) -> None:
+        with self._lock:
+            entries = list(self._entries)
+            if old_name is not None:
+                self._discard(entries, (old_name, kind, entity_id))
+            if name:
+                bisect.insort(entries, (name, kind, entity_id), key=sort_key)
+            self._entries = entries
+
+    def remove(self, kind: str, entity_id: int, name: Optional[str]) -> None:
+        if name is None:
+            return
+        with self._lock:
+            entries = list(self._entries)
+            self._discard(entries, (name, kind, entity_id))
+            self._entries = entries
+
+    @staticmethod
+    def _discard(entries: List[Entry], entry: Entry) -> None:
+        index = bisect.bisect_left(entries, sort_key(entry), key=sort_key)
+        if index < len(entries) and entries[index] == entry:
+            del entries[index]
+
+    def suggest(self, prefix: str, limit: int = 10, kinds: Optional[Sequence[str]] = None) -> List[Suggestion]:
+        entries = self._entries
+        key = prefix.casefold()
+        suggestions: List[Suggestion] = []
+        index = bisect.bisect_left(entries, key, key=prefix_key)
+        limit = max(0, min(limit, MAX_SUGGESTIONS))
+        while index < len(entries) and len(suggestions) < limit:
+            name, kind, entity_id = entries[index]
+            if not name.casefold().startswith(key):
+                break
+            if kinds is None or kind in kinds:
+                suggestions.append(Suggestion(kind=kind, id=entity_id, name=name))
+            index += 1
+        return suggestions
+
+
+suggestion_index = PrefixIndex()
@@ -0,0 +1,660 @@
+"""Resolver-level benchmarks over a reproducible seeded dataset.
+
+Every Query field and Mutation of ``schemas.schema`` is executed through the real
+Strawberry schema (extensions, loaders, DAOs and all) against a database seeded
+from a fixed random seed, and each operation reports p50/p95/p99 latency, SQL
+statements per call and peak Python memory. Results are written as JSON so two
+commits can be compared:
+
+    python benchmark.py --reset --output before.json
+    python benchmark.py --reset --output after.json --compare before.json
+
+An empty database is seeded first. ``--reset`` drops and reseeds a database that
+already has rows (the benchmarked mutations leave rows behind, so pass it when
+comparing runs); without it the existing rows are benchmarked as they are.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import click
+from graphql import GraphQLNonNull, GraphQLObjectType, GraphQLSchema, Undefined, get_named_type, is_leaf_type
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models import (
+    Base, Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer,
+)
+from dao import (
+    CategoryDAO,
+    ConsumerDAO,
+    ConsumerOrderDAO,
+    ConsumerOrderItemDAO,
+    ProductDAO,
+    StockLevelDAO,
+    SupplierDAO,
+    SupplierOrderDAO,
+    SupplierOrderItemDAO,
+)
+from migrations import stamp
+from query_cost import ADMIN_CLIENTS, CLIENT_BUDGETS, CLIENT_HEADER
+
+DEFAULT_DATABASE_URI = "sqlite:///benchmark.db"
+
+# Rows per unit of --scale.
+SCALE_ROWS = {
+    "suppliers": 20,
+    "categories": 20,
+    "products": 200,
+    "consumers": 200,
+    "supplier_orders": 100,
+    "consumer_orders": 1000,
+}
+LINES_PER_SUPPLIER_ORDER = 5
+LINES_PER_CONSUMER_ORDER = 3
+
+# Order dates cover the year before this day, so the data does not depend on when it is seeded.
+DATASET_END = date(2024, 1, 1)
+DATASET_DAYS = 365
+
+INSERT_BATCH_SIZE = 5000
+
+# Nesting depth of the generated selection sets (Connection > edges > node > product > fields).
+SELECTION_DEPTH = 4
+
+# Selections that deep cost far more than the default query budget, so the benchmark
+# sends them as its own client. QUERY_CLIENT_BUDGETS can still override this budget.
+# The client is also an admin, so the admin-only queries are measured too.
+BENCHMARK_CLIENT_ID = "benchmark"
+BENCHMARK_BUDGET = {"max_cost": 1000000}
+
+WORDS = (
+    "apple", "bread", "butter", "cheese", "chocolate", "coffee", "cookie", "honey", "juice", "lemon",
+    "milk", "noodle", "olive", "orange", "pasta", "pepper", "rice", "salt", "sugar", "tea",
+)
+ADJECTIVES = ("fresh", "organic", "dark", "classic", "golden", "spicy", "sweet", "smoked", "wild", "royal")
+FIRST_NAMES = ("Anna", "Ben", "Carla", "David", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas")
+LAST_NAMES = ("Smith", "Garcia", "Khan", "Muller", "Rossi", "Tanaka", "Silva", "Novak", "Okafor", "Larsen")
+
+
+@dataclass
+class Dataset:
+    """Ids and names of the rows the operations pick their arguments from."""
+
+    suppliers: List[Tuple[int, str]]
+    categories: List[Tuple[int, str]]
+    products: List[Tuple[int, str]]
+    consumers: List[Tuple[int, str]]
+    supplier_orders: List[int]
+    supplier_order_items: List[int]
+    consumer_orders: List[int]
+    consumer_order_items: List[int]
+    order_dates: List[date]
+
+    @classmethod
+    def load(cls, session: Session) -> "Dataset":
+        def ids(model) -> List[int]:
+            return list(session.scalars(select(model.id).order_by(model.id)))
+
+        def names(model, column) -> List[Tuple[int, str]]:
+            return [tuple(row) for row in session.execute(
+                select(model.id, column).where(column.isnot(None)).order_by(model.id)
+            )]
+
+        return cls(
+            suppliers=names(Supplier, Supplier.name),
+            categories=names(Category, Category.category_name),
+            products=names(Product, Product.name),
+            consumers=names(Consumer, Consumer.name),
+            supplier_orders=ids(SupplierOrder),
+            supplier_order_items=ids(SupplierOrderItem),
+            consumer_orders=ids(ConsumerOrder),
+            consumer_order_items=ids(ConsumerOrderItem),
+            order_dates=sorted(set(session.scalars(
+                select(ConsumerOrder.order_date).where(ConsumerOrder.order_date.isnot(None))
+                .order_by(ConsumerOrder.id).limit(1000)
+            ))),
+        )
+
+    def empty_tables(self) -> List[str]:
+        return [name for name, rows in vars(self).items() if not rows]
+
+
+def seed_dataset(engine: Engine, scale: int, seed: int) -> Dict[str, int]:
+    """Fills an empty schema with a deterministic catalog and order history; returns the row counts."""
+    rng = random.Random(seed)
+    rows = {table: count * scale for table, count in SCALE_ROWS.items()}
+    with engine.begin() as connection:
+        def insert_all(model, values: List[dict]) -> None:
+            for start in range(0, len(values), INSERT_BATCH_SIZE):
+                connection.execute(insert(model), values[start:start + INSERT_BATCH_SIZE])
+
+        insert_all(Supplier, [
+            {"id": i, "name": f"{rng.choice(WORDS).title()} {rng.choice(ADJECTIVES).title()} Supplies {i}",
+             "contact_number": f"555-{i:06d}"}
+            for i in range(1, rows["suppliers"] + 1)
+        ])
+        insert_all(Category, [
+            {"id": i, "category_name": f"{rng.choice(ADJECTIVES).title()} {WORDS[i % len(WORDS)]} {i}"}
+            for i in range(1, rows["categories"] + 1)
+        ])
+        prices = {i: round(rng.uniform(0.5, 50), 2) for i in range(1, rows["products"] + 1)}
+        product_ids = list(prices)
+        insert_all(Product, [
+            {"id": i, "category_id": rng.randint(1, rows["categories"]),
+             "name": f"{rng.choice(ADJECTIVES).title()} {rng.choice(WORDS)} {i}", "unit_price": prices[i],
+             "description": f"{rng.choice(ADJECTIVES)} {rng.choice(WORDS)} with {rng.choice(WORDS)}"}
+            for i in range(1, rows["products"] + 1)
+        ])
+        insert_all(Consumer, [
+            {"id": i, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}", "contact_number": f"777-{i:06d}"}
+            for i in range(1, rows["consumers"] + 1)
+        ])
+
+        def orders(model, line_model, order_column: str, count: int, owner_column: str, owner_count: int,
+                   lines_per_order: int) -> None:
+            order_rows, line_rows = [], []
+            for order_id in range(1, count + 1):
+                order_date = DATASET_END - timedelta(days=rng.randrange(DATASET_DAYS))
+                total = 0.0
+                for product_id in rng.sample(product_ids, lines_per_order):
+                    quantity = rng.randint(1, 10)
+                    total_price = round(quantity * prices[product_id], 2)
+                    total += total_price
+                    line_rows.append({
+                        "id": len(line_rows) + 1, order_column: order_id, "product_id": product_id,
+                        "item_name": f"line {len(line_rows) + 1}", "quantity": quantity,
+                        "unit_price": prices[product_id], "total_price": total_price, "order_date": order_date,
+                    })
+                order_rows.append({
+                    "id": order_id, owner_column: rng.randint(1, owner_count),
+                    "order_date": order_date, "total_amount": round(total, 2),
+                })
+            insert_all(model, order_rows)
+            insert_all(line_model, line_rows)
+
+        orders(SupplierOrder, SupplierOrderItem, "supplier_order_id", rows["supplier_orders"], "supplier_id",
+               rows["suppliers"], LINES_PER_SUPPLIER_ORDER)
+        orders(ConsumerOrder, ConsumerOrderItem, "consumer_order_id", rows["consumer_orders"], "consumer_id",
+               rows["consumers"], LINES_PER_CONSUMER_ORDER)
+
+        if connection.dialect.name == "postgresql":
+            # Explicit ids leave the serial sequences behind; move them past the seeded rows.
+            for model in (Supplier, Category, Product, Consumer, SupplierOrder, SupplierOrderItem,
+                          ConsumerOrder, ConsumerOrderItem):
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{model.__tablename__}', 'id'), "
+                    f"(SELECT max(id) FROM {model.__tablename__}))"
+                )
+
+    with Session(bind=engine) as session:
+        from recommendations import refresh_recommendations
+        StockLevelDAO(session).rebuild_stock_levels()
+        refresh_recommendations(session, full=True)
+    rows["supplier_order_items"] = rows["supplier_orders"] * LINES_PER_SUPPLIER_ORDER
+    rows["consumer_order_items"] = rows["consumer_orders"] * LINES_PER_CONSUMER_ORDER
+    return rows
+
+
+def prepare_database(engine: Engine, scale: int, seed: int, reset: bool) -> Optional[Dict[str, int]]:
+    """Seeds the database when it is empty (or ``reset``); returns the seeded row counts, or None."""
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as session:
+        if session.scalar(select(func.count()).select_from(Product)) and not reset:
+            return None
+    stamp(engine)
+    return seed_dataset(engine, scale, seed)
+
+
+# Arguments of Query fields, by GraphQL argument name. Arguments that are not
+# listed here are left to their defaults.
+def _pick(rows: list, rng: random.Random):
+    return rng.choice(rows)
+
+
+def _date_window(dataset: Dataset, rng: random.Random) -> Tuple[str, str]:
+    start = _pick(dataset.order_dates, rng)
+    return start.isoformat(), (start + timedelta(days=30)).isoformat()
+
+
+QUERY_ARGUMENTS: Dict[str, Callable[[Dataset, random.Random], Any]] = {
+    "supplierId": lambda ds, rng: _pick(ds.suppliers, rng)[0],
+    "productId": lambda ds, rng: _pick(ds.products, rng)[0],
+    "categoryId": lambda ds, rng: _pick(ds.categories, rng)[0],
+    "consumerId": lambda ds, rng: _pick(ds.consumers, rng)[0],
+    "supplierOrderId": lambda ds, rng: _pick(ds.supplier_orders, rng),
+    "supplierOrderItemId": lambda ds, rng: _pick(ds.supplier_order_items, rng),
+    "consumerOrderId": lambda ds, rng: _pick(ds.consumer_orders, rng),
+    "consumerOrderItemId": lambda ds, rng: _pick(ds.consumer_order_items, rng),
+    "supplierName": lambda ds, rng: _pick(ds.suppliers, rng)[1],
+    "productName": lambda ds, rng: _pick(ds.products, rng)[1],
+    "categoryName": lambda ds, rng: _pick(ds.categories, rng)[1],
+    "name": lambda ds, rng: _pick(ds.consumers, rng)[1].split()[0],
+    "orderDate": lambda ds, rng: _pick(ds.order_dates, rng).isoformat(),
+    "supplierOrderDate": lambda ds, rng: _pick(ds.order_dates, rng).isoformat(),
+    "from": lambda ds, rng: _date_window(ds, rng)[0],
+    "to": lambda ds, rng: _date_window(ds, rng)[1],
+    "categoryIds": lambda ds, rng: [row[0] for row in rng.sample(ds.categories, min(3, len(ds.categories)))],
+    "ids": lambda ds, rng: [row[0] for row in rng.sample(ds.products, min(20, len(ds.products)))],
+    "query": lambda ds, rng: rng.choice(WORDS),
+    "prefix": lambda ds, rng: _pick(ds.products, rng)[1][:3],
+}
+
+# Every benchmark run of a mutation gets fresh arguments; rows it deletes are
+# created beforehand, outside the timed call.
+MutationArguments = Callable[["MutationContext"], Dict[str, Any]]
+
+
+@dataclass
+class MutationContext:
+    dataset: Dataset
+    rng: random.Random
+    engine: Engine
+    counter: int = 0
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"bench {prefix} {self.rng.choice(WORDS)} {self.counter}"
+
+    def session(self) -> Session:
+        return Session(bind=self.engine)
+
+    def product(self) -> Tuple[int, str]:
+        return _pick(self.dataset.products, self.rng)
+
+    def disposable_supplier(self) -> int:
+        with self.session() as session:
+            return SupplierDAO(session).create_supplier(self.unique("supplier"), "000").id
+
+    def disposable_category(self) -> int:
+        with self.session() as session:
+            return CategoryDAO(session).create_category(self.unique("category")).id
+
+    def disposable_product(self) -> int:
+        # Deleting a product also deletes its category, so it gets one of its own.
+        with self.session() as session:
+            return ProductDAO(session).create_product(self.unique("product"), 1.0, "", self.disposable_category()).id
+
+    def disposable_consumer(self) -> int:
+        with self.session() as session:
+            return ConsumerDAO(session).create_consumer(self.unique("consumer"), "000").id
+
+    def disposable_supplier_order(self) -> int:
+        with self.session() as session:
+            order = SupplierOrderDAO(session).create_supplier_order(_pick(self.dataset.suppliers, self.rng)[0], DATASET_END, 0)
+            SupplierOrderItemDAO(session).create_supplier_order_items(order.id, self.order_items())
+            return order.id
+
+    def disposable_consumer_order(self) -> int:
+        with self.session() as session:
+            order = ConsumerOrderDAO(session).create_consumer_order(_pick(self.dataset.consumers, self.rng)[0], DATASET_END, 0)
+            ConsumerOrderItemDAO(session).create_consumer_order_items(order.id, self.order_items())
+            return order.id
+
+    def disposable_supplier_order_item(self) -> int:
+        with self.session() as session:
+            product_id, name = self.product()
+            return SupplierOrderItemDAO(session).create_supplier_order_item(
+                _pick(self.dataset.supplier_orders, self.rng), product_id, name, 1, 1.0
+            ).id
+
+    def disposable_consumer_order_item(self) -> int:
+        with self.session() as session:
+            product_id, name = self.product()
+            return ConsumerOrderItemDAO(session).create_consumer_order_item(
+                _pick(self.dataset.consumer_orders, self.rng), product_id, name, 1, 1.0
+            ).id
+
+    def order_items(self, count: int = 3) -> List[Dict[str, Any]]:
+        return [
+            {"product_id": product_id, "item_name": name, "quantity": self.rng.randint(1, 5), "unit_price": 1.0}
+            for product_id, name in self.rng.sample(self.dataset.products, min(count, len(self.dataset.products)))
+        ]
+
+    def order_item_inputs(self, count: int = 3) -> List[Dict[str, Any]]:
+        return [
+            {"productId": item["product_id"], "itemName": item["item_name"], "quantity": item["quantity"], "unitPrice": item["unit_price"]}
+            for item in self.order_items(count)
+        ]
+
+
+def _catalog_file(context: MutationContext):
+    from werkzeug.datastructures import FileStorage
+    lines = ["name,unit_price,description,category_name,supplier_name,supplier_contact_number"]
+    for _ in range(100):
+        lines.append(f"{context.product()[1]},{context.rng.randint(1, 50)}.00,imported,,,")
+    return FileStorage(io.BytesIO("\n".join(lines).encode()), filename="catalog.csv")
+
+
+MUTATION_ARGUMENTS: Dict[str, MutationArguments] = {
+    "createSupplier": lambda c: {"name": c.unique("supplier"), "contactNumber": "000"},
+    "updateSupplier": lambda c: {"supplierId": _pick(c.dataset.suppliers, c.rng)[0], "contactNumber": f"{c.rng.randint(0, 999999)}"},
+    "deleteSupplier": lambda c: {"supplierId": c.disposable_supplier()},
+    "createProduct": lambda c: {
+        "name": c.unique("product"), "unitPrice": 1.0, "description": "", "categoryId": _pick(c.dataset.categories, c.rng)[0],
+    },
+    "updateProduct": lambda c: {"productId": c.product()[0], "unitPrice": round(c.rng.uniform(0.5, 50), 2)},
+    "deleteProduct": lambda c: {"productId": c.disposable_product()},
+    "importCatalog": lambda c: {"file": _catalog_file(c), "format": "csv"},
+    "createCategory": lambda c: {"categoryName": c.unique("category")},
+    "updateCategory": lambda c: {"categoryId": c.disposable_category(), "categoryName": c.unique("category")},
+    "deleteCategory": lambda c: {"categoryId": c.disposable_category()},
+    "createSupplierOrder": lambda c: {
+        "supplierId": _pick(c.dataset.suppliers, c.rng)[0], "orderDate": DATASET_END.isoformat(), "totalAmount": 0.0,
+    },
+    "updateSupplierOrder": lambda c: {"supplierOrderId": _pick(c.dataset.supplier_orders, c.rng), "totalAmount": 1.0},
+    "deleteSupplierOrder": lambda c: {"supplierOrderId": c.disposable_supplier_order()},
+    "createSupplierOrderItem": lambda c: {
+        "supplierOrderId": _pick(c.dataset.supplier_orders, c.rng), "productId": c.product()[0],
+        "itemName": "bench line", "quantity": 1, "unitPrice": 1.0, "totalPrice": 1.0,
+    },
+    "createSupplierOrderItems": lambda c: {
+        "supplierOrderId": _pick(c.dataset.supplier_orders, c.rng), "items": c.order_item_inputs(),
+    },
+    "updateSupplierOrderItem": lambda c: {"supplierOrderItemId": _pick(c.dataset.supplier_order_items, c.rng), "quantity": c.rng.randint(1, 10)},
+    "deleteSupplierOrderItem": lambda c: {"supplierOrderItemId": c.disposable_supplier_order_item()},
+    "createConsumerOrder": lambda c: {
+        "consumerId": _pick(c.dataset.consumers, c.rng)[0], "orderDate": DATASET_END.isoformat(), "totalAmount": 0.0,
+    },
+    "updateConsumerOrder": lambda c: {"consumerOrderId": _pick(c.dataset.consumer_orders, c.rng), "totalAmount": 1.0},
+    "deleteConsumerOrder": lambda c: {"consumerOrderId": c.disposable_consumer_order()},
+    "createConsumerOrderItem": lambda c: {
+        "consumerOrderId": _pick(c.dataset.consumer_orders, c.rng), "productId": c.product()[0],
+        "itemName": "bench line", "quantity": 1, "unitPrice": 1.0, "totalPrice": 1.0,
+    },
+    "updateConsumerOrderItem": lambda c: {"consumerOrderItemId": _pick(c.dataset.consumer_order_items, c.rng), "quantity": c.rng.randint(1, 10)},
+    "deleteConsumerOrderItem": lambda c: {"consumerOrderItemId": c.disposable_consumer_order_item()},
+    "createConsumerOrderItems": lambda c: {
+        "consumerOrderId": _pick(c.dataset.consumer_orders, c.rng), "items": c.order_item_inputs(),
+    },
+    "createConsumer": lambda c: {"name": c.unique("consumer"), "contactNumber": "000"},
+    "updateConsumer": lambda c: {"consumerId": _pick(c.dataset.consumers, c.rng)[0], "contactNumber": f"{c.rng.randint(0, 999999)}"},
+    "deleteConsumer": lambda c: {"consumerId": c.disposable_consumer()},
+}
+
+# Mutations that only run on PostgreSQL.
+POSTGRES_ONLY = {"importCatalog"}
+
+
+def selection_set(graphql_type, depth: int = SELECTION_DEPTH) -> str:
+    """Selects every scalar of the type and of its nested objects down to ``depth`` levels."""
+    named = get_named_type(graphql_type)
+    if is_leaf_type(named):
+        return ""
+    fields = []
+    for name, graphql_field in named.fields.items():
+        if any(isinstance(argument.type, GraphQLNonNull) for argument in graphql_field.args.values()):
+            continue
+        field_type = get_named_type(graphql_field.type)
+        if is_leaf_type(field_type):
+            fields.append(name)
+        elif isinstance(field_type, GraphQLObjectType) and depth > 1:
+            nested = selection_set(field_type, depth - 1)
+            if nested:
+                fields.append(f"{name} {nested}")
+    return "{ " + " ".join(fields) + " }" if fields else ""
+
+
+@dataclass
+class Operation:
+    name: str
+    kind: str
+    document: str
+    arguments: Callable[[], Dict[str, Any]]
+
+
+def build_operations(graphql_schema: GraphQLSchema, dataset: Dataset, engine: Engine,
+                     rng: random.Random) -> Tuple[List[Operation], Dict[str, str]]:
+    """One operation per root field; returns them and the fields that were skipped, with the reason."""
+    operations: List[Operation] = []
+    skipped: Dict[str, str] = {}
+    context = MutationContext(dataset=dataset, rng=rng, engine=engine)
+    postgres = engine.dialect.name == "postgresql"
+    for kind, root in (("query", graphql_schema.query_type), ("mutation", graphql_schema.mutation_type)):
+        for name, graphql_field in root.fields.items():
+            if kind == "query":
+                names = [argument for argument in graphql_field.args if argument in QUERY_ARGUMENTS]
+                missing = [
+                    argument for argument, value in graphql_field.args.items()
+                    if argument not in QUERY_ARGUMENTS and isinstance(value.type, GraphQLNonNull)
+                    and value.default_value is Undefined
+                ]
+                if missing:
+                    skipped[name] = f"no benchmark value for {', '.join(missing)}"
+                    continue
+                arguments = (lambda names=names: {argument: QUERY_ARGUMENTS[argument](dataset, rng) for argument in names})
+            else:
+                if name not in MUTATION_ARGUMENTS:
+                    skipped[name] = "no benchmark arguments"
+                    continue
+                if name in POSTGRES_ONLY and not postgres:
+                    skipped[name] = "needs PostgreSQL"
+                    continue
+                factory = MUTATION_ARGUMENTS[name]
+                names = list(graphql_field.args)
+                arguments = (lambda factory=factory: factory(context))
+
+            definitions = ", ".join(f"${argument}: {graphql_field.args[argument].type}" for argument in names)
+            call = ", ".join(f"{argument}: ${argument}" for argument in names)
+            document = (
+                f"{kind} Bench{name[0].upper()}{name[1:]}{f'({definitions})' if definitions else ''} "
+                f"{{ {name}{f'({call})' if call else ''} {selection_set(graphql_field.type)} }}"
+            )
+            operations.append(Operation(name=name, kind=kind, document=document, arguments=arguments))
+    return operations, skipped
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile, which is stable for the small sample sizes used here.
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class StatementCounter:
+    def __init__(self, engine: Engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+
+@dataclass
+class OperationResult:
+    kind: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    statements: float
+    peak_memory_kb: float
+    errors: int = 0
+    error: Optional[str] = None
+
+
+async def _execute(graphql_schema, operation: Operation, variables: Dict[str, Any], db_session) -> Tuple[float, List]:
+    context = {"request": SimpleNamespace(headers={CLIENT_HEADER: BENCHMARK_CLIENT_ID})}
+    started = time.perf_counter()
+    result = await graphql_schema.execute(operation.document, variable_values=variables, context_value=context)
+    elapsed = time.perf_counter() - started
+    # Same as the request teardown: the next call starts with a fresh session.
+    db_session.remove()
+    return elapsed, result.errors or []
+
+
+async def benchmark_operation(graphql_schema, operation: Operation, counter: StatementCounter, db_session,
+                              iterations: int, warmup: int) -> OperationResult:
+    errors: List = []
+    for _ in range(warmup):
+        await _execute(graphql_schema, operation, operation.arguments(), db_session)
+
+    timings: List[float] = []
+    statements = 0
+    for _ in range(iterations):
+        variables = operation.arguments()
+        before = counter.count
+        elapsed, call_errors = await _execute(graphql_schema, operation, variables, db_session)
+        statements += counter.count - before
+        timings.append(elapsed * 1000)
+        errors.extend(call_errors)
+
+    # Memory is measured in a separate call because tracing slows everything down.
+    variables = operation.arguments()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await _execute(graphql_schema, operation, variables, db_session)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return OperationResult(
+        kind=operation.kind,
+        iterations=iterations,
+        p50_ms=round(percentile(timings, 0.50), 3),
+        p95_ms=round(percentile(timings, 0.95), 3),
+        p99_ms=round(percentile(timings, 0.99), 3),
+        mean_ms=round(sum(timings) / len(timings), 3) if timings else 0.0,
+        statements=round(statements / iterations, 2) if iterations else 0.0,
+        peak_memory_kb=round(peak / 1024, 1),
+        errors=len(errors),
+        error=errors[0].message if errors else None,
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Lists the operations whose p95 grew by more than ``threshold``, that issue more statements or fail more often."""
+    regressions = []
+    for name, result in current["operations"].items():
+        before = baseline.get("operations", {}).get(name)
+        if before is None:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["statements"] > before["statements"]:
+            regressions.append(f"{name}: statements {before['statements']} -> {result['statements']}")
+        if result["errors"] > before.get("errors", 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {result['errors']} ({result['error']})")
+    return regressions
+
+
+def run(database_uri: str, scale: int, seed: int, iterations: int, warmup: int, reset: bool,
+        only: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    os.environ["DATABASE_URI"] = database_uri
+    # database.py builds its engine from DATABASE_URI at import time.
+    from database import db_session, engine
+    from schemas import schema
+
+    CLIENT_BUDGETS.setdefault(BENCHMARK_CLIENT_ID, BENCHMARK_BUDGET)
+    ADMIN_CLIENTS.add(BENCHMARK_CLIENT_ID)
+    seeded = prepare_database(engine, scale, seed, reset)
+    with Session(bind=engine) as session:
+        dataset = Dataset.load(session)
+    empty = dataset.empty_tables()
+    if empty:
+        raise click.ClickException(f"The database has no {', '.join(empty)}; run with --reset to seed it")
+
+    operations, skipped = build_operations(schema._schema, dataset, engine, random.Random(seed))
+    if only:
+        operations = [operation for operation in operations if operation.name in only]
+    counter = StatementCounter(engine)
+    # Errors are counted in the results; a traceback per failed call would drown the report.
+    logging.getLogger("strawberry.execution").setLevel(logging.CRITICAL)
+
+    async def run_all() -> Dict[str, OperationResult]:
+        results = {}
+        for operation in operations:
+            results[operation.name] = await benchmark_operation(schema, operation, counter, db_session, iterations, warmup)
+        return results
+
+    results = asyncio.run(run_all())
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "scale": scale,
+            "seed": seed,
+            "seeded_rows": seeded,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "operations": {name: vars(result) for name, result in results.items()},
+        "skipped": skipped,
+    }
+
+
+@click.command()
+@click.option("--database-uri", default=DEFAULT_DATABASE_URI, show_default=True,
+              help="SQLite file or local PostgreSQL database to seed and query.")
+@click.option("--scale", type=int, default=1, show_default=True, help="Dataset size multiplier.")
+@click.option("--seed", type=int, default=42, show_default=True, help="Random seed for the dataset and the arguments.")
+@click.option("--iterations", type=int, default=50, show_default=True, help="Timed calls per operation.")
+@click.option("--warmup", type=int, default=3, show_default=True, help="Untimed calls per operation.")
+@click.option("--reset", is_flag=True, help="Drop and reseed a database that already has rows.")
+@click.option("--only", multiple=True, help="Benchmark only these root fields (repeatable).")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the JSON results here.")
+@click.option("--compare", "baseline_path", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Earlier results to compare against; exits with status 1 on a regression.")
+@click.option("--threshold", type=float, default=0.2, show_default=True, help="Allowed relative p95 growth.")
+def main(database_uri, scale, seed, iterations, warmup, reset, only, output, baseline_path, threshold):
+    results = run(database_uri, scale, seed, iterations, warmup, reset, only)
+
+    click.echo(f"{'operation':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'stmts':>7} {'peak kB':>9} errors")
+    for name, result in results["operations"].items():
+        click.echo(
+            f"{name:<40} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+            f"{result['statements']:>7} {result['peak_memory_kb']:>9} {result['errors'] or ''}"
+        )
+    for name, reason in results["skipped"].items():
+        click.echo(f"skipped {name}: {reason}")
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as stream:
+            regressions = compare(json.load(stream), results, threshold)
+        for regression in regressions:
+            click.echo(f"regression {regression}")
+
+    if output:
+        # Timings of failed calls measure the error path, so they make no baseline.
+        failed = [name for name, result in results["operations"].items() if result["errors"]]
+        if failed:
+            raise click.ClickException(f"Not writing {output}: {', '.join(failed)} returned errors")
+        with open(output, "w", encoding="utf-8") as stream:
+            json.dump(results, stream, indent=2, default=str)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
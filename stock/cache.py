@@ -0,0 +1,169 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+MISSING = object()
+
+
+class LRUCache:
+    """In-process cache bounded by entry count, with a per-entry time to live."""
+
+    backend = "memory"
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCache:
+    """Cache kept in a Redis-compatible server, shared by every worker process.
+
+    Redis applies the TTL and its own eviction policy, so only hits and misses
+    are counted here.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, ttl: float = 300.0, prefix: str = "stock:catalog:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        raw = self.client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "size": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+
+class NullCache:
+    backend = "none"
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "size": 0, "hits": 0, "misses": self.misses, "evictions": 0, "expirations": 0}
+
+
+def create_cache(backend: str = "memory", max_size: int = 10000, ttl: float = 300.0, redis_url: Optional[str] = None):
+    if backend == "none":
+        return NullCache()
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis cache backend needs the 'redis' package installed")
+        return RedisCache(redis.Redis.from_url(redis_url or "redis://localhost:6379/0"), ttl)
+    if backend == "memory":
+        return LRUCache(max_size, ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+# Products, categories and suppliers change rarely, so their lookups are served
+# from here and the DAO write methods invalidate the affected keys.
+catalog_cache = create_cache(
+    os.environ.get("CATALOG_CACHE_BACKEND", "memory"),
+    int(os.environ.get("CATALOG_CACHE_SIZE", 10000)),
+    float(os.environ.get("CATALOG_CACHE_TTL", 300)),
+    os.environ.get("CATALOG_CACHE_REDIS_URL"),
+)
+
+# Precomputed frequently-bought-together lists, per process; the refresh job clears it.
+recommendation_cache = LRUCache(
+    int(os.environ.get("RECOMMENDATION_CACHE_SIZE", 50000)),
+    float(os.environ.get("RECOMMENDATION_CACHE_TTL", 600)),
+)
@@ -0,0 +1,179 @@
+import csv
+import json
+import tempfile
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Dict, Iterator, List, Optional
+from sqlalchemy.engine import Engine
+from autocomplete import suggestion_index
+from cache import catalog_cache
+
+CATALOG_FORMATS = ("csv", "ndjson")
+
+STAGING_COLUMNS = ("line", "name", "unit_price", "description", "category_name", "supplier_name", "supplier_contact_number")
+
+# Rows are cleaned in Python, spooled to a CSV buffer and loaded with a single
+# COPY; everything after that is set-based SQL inside the same transaction.
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE catalog_staging (
+        line integer,
+        name text,
+        unit_price numeric(10, 2),
+        description text,
+        category_name text,
+        supplier_name text,
+        supplier_contact_number text
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING = f"COPY catalog_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+LOCK_CATALOG = "LOCK TABLE suppliers, categories, products IN SHARE ROW EXCLUSIVE MODE"
+
+# The last line wins when a name appears more than once in the file.
+LATEST_PRODUCTS = "(SELECT DISTINCT ON (lower(name)) * FROM catalog_staging ORDER BY lower(name), line DESC)"
+
+CATEGORY_ID = "(SELECT min(c.id) FROM categories c WHERE lower(c.category_name) = lower(st.category_name))"
+
+UPDATE_SUPPLIERS = """
+    UPDATE suppliers s
+    SET contact_number = st.supplier_contact_number
+    FROM (
+        SELECT DISTINCT ON (lower(supplier_name)) supplier_name, supplier_contact_number
+        FROM catalog_staging
+        WHERE supplier_name IS NOT NULL AND supplier_contact_number IS NOT NULL
+        ORDER BY lower(supplier_name), line DESC
+    ) st
+    WHERE lower(s.name) = lower(st.supplier_name)
+      AND s.contact_number IS DISTINCT FROM st.supplier_contact_number
+"""
+
+INSERT_SUPPLIERS = """
+    INSERT INTO suppliers (name, contact_number)
+    SELECT DISTINCT ON (lower(supplier_name)) supplier_name, supplier_contact_number
+    FROM catalog_staging st
+    WHERE supplier_name IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM suppliers s WHERE lower(s.name) = lower(st.supplier_name))
+    ORDER BY lower(supplier_name), line DESC
+"""
+
+INSERT_CATEGORIES = """
+    INSERT INTO categories (category_name)
+    SELECT DISTINCT ON (lower(category_name)) category_name
+    FROM catalog_staging st
+    WHERE category_name IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM categories c WHERE lower(c.category_name) = lower(st.category_name))
+    ORDER BY lower(category_name), line DESC
+"""
+
+UPDATE_PRODUCTS = f"""
+    UPDATE products p
+    SET unit_price = st.unit_price,
+        description = coalesce(st.description, p.description),
+        category_id = coalesce({CATEGORY_ID}, p.category_id)
+    FROM {LATEST_PRODUCTS} st
+    WHERE lower(p.name) = lower(st.name)
+"""
+
+INSERT_PRODUCTS = f"""
+    INSERT INTO products (name, unit_price, description, category_id)
+    SELECT st.name, st.unit_price, st.description, {CATEGORY_ID}
+    FROM {LATEST_PRODUCTS} st
+    WHERE NOT EXISTS (SELECT 1 FROM products p WHERE lower(p.name) = lower(st.name))
+"""
+
+
+@dataclass
+class CatalogImportResult:
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    suppliers_inserted: int = 0
+    categories_inserted: int = 0
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Optional[Dict[str, Any]]]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"Unsupported catalog format: {fmt}")
+
+
+def _text(record: Dict[str, Any], key: str) -> Optional[str]:
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def clean_record(record: Optional[Dict[str, Any]]) -> Optional[List[Any]]:
+    if record is None:
+        return None
+    name = _text(record, "name")
+    if name is None:
+        return None
+    try:
+        unit_price = Decimal(str(record.get("unit_price")).strip())
+    except InvalidOperation:
+        return None
+    if not unit_price.is_finite() or unit_price < 0:
+        return None
+    return [
+        name,
+        unit_price,
+        _text(record, "description"),
+        _text(record, "category_name"),
+        _text(record, "supplier_name"),
+        _text(record, "supplier_contact_number"),
+    ]
+
+
+def import_catalog(engine: Engine, stream: IO[str], fmt: str = "csv") -> CatalogImportResult:
+    result = CatalogImportResult()
+
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024, mode="w+", newline="") as buffer:
+        writer = csv.writer(buffer)
+        for line, record in enumerate(read_records(stream, fmt), start=1):
+            row = clean_record(record)
+            if row is None:
+                result.rejected += 1
+                continue
+            writer.writerow([line] + row)
+        buffer.seek(0)
+
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(CREATE_STAGING_TABLE)
+            cursor.copy_expert(COPY_STAGING, buffer)
+            cursor.execute(LOCK_CATALOG)
+            cursor.execute(UPDATE_SUPPLIERS)
+            cursor.execute(INSERT_SUPPLIERS)
+            result.suppliers_inserted = cursor.rowcount
+            cursor.execute(INSERT_CATEGORIES)
+            result.categories_inserted = cursor.rowcount
+            cursor.execute(UPDATE_PRODUCTS)
+            result.updated = cursor.rowcount
+            cursor.execute(INSERT_PRODUCTS)
+            result.inserted = cursor.rowcount
+            connection.commit()
+            # Set-based upserts touch an unknown set of rows, so drop every cached catalog entry.
+            catalog_cache.clear()
+            suggestion_index.invalidate()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    return result
@@ -1,32 +1,212 @@
-import re
-from typing import List, Optional
-from sqlalchemy.orm import Session, join
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Query, Session, join
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy import func
-from datetime import date
-from models import Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer
+from sqlalchemy.engine import Result
+from sqlalchemy import and_, case, delete, func, insert, inspect, literal, or_, select, text, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date, datetime
+from models import (
+    Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer,
+    StockLevel, StockMovement, ProductRecommendation,
+)
+from cache import MISSING, catalog_cache, recommendation_cache
+from autocomplete import CATEGORY, PRODUCT, SUPPLIER, suggestion_index
+from rows import Row, row_class
 
 class NoResultFoundError(Exception):
     pass
 
+
+def keyset_page(query: Query, columns: Sequence, first: int, after: Optional[Sequence] = None) -> Tuple[list, bool]:
+    # Seek past the last key of the previous page instead of using OFFSET, so
+    # every page is one index range scan no matter how deep the client pages.
+    if after:
+        if len(after) != len(columns):
+            raise ValueError("Cursor does not match the requested ordering")
+        values = [
+            date.fromisoformat(value) if column.type.python_type is date and isinstance(value, str) else value
+            for column, value in zip(columns, after)
+        ]
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    rows = query.order_by(*columns).limit(first + 1).all()
+    return rows[:first], len(rows) > first
+
+def filter_date_range(query, column, start: Optional[date] = None, end: Optional[date] = None):
+    # Inclusive on both ends, so a quarter is one range scan on the order_date index.
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column <= end)
+    return query
+
+def select_rows(session: Session, model, keys: Sequence[str], *criteria) -> List[Row]:
+    # A Core select on the session's connection: the tuples go straight into
+    # slotted rows, skipping ORM instances, the identity map and change tracking.
+    # Read-only; pending changes are not flushed first.
+    columns = inspect(model).columns
+    statement = select(*(columns[key] for key in keys)).where(*criteria)
+    row = row_class(model, keys)
+    return [row(*values) for values in session.connection().execute(statement)]
+
+def get_product_prices(session: Session, product_ids: List[int]) -> Dict[int, Optional[float]]:
+    # Validate every product of a multi-line order with one query.
+    prices = dict(session.query(Product.id, Product.unit_price).filter(Product.id.in_(set(product_ids))).all())
+    missing = sorted(set(product_ids) - set(prices))
+    if missing:
+        raise NoResultFoundError(f"Product not found: {', '.join(str(product_id) for product_id in missing)}")
+    return prices
+
+def add_to_order_total(session: Session, order_model, order_id: int, delta: float):
+    # total_amount = total_amount + :delta is evaluated by the database under the
+    # row lock, so concurrent line writes on one order never overwrite each other.
+    # Returns the order's (order_date,) row for its lines, or None if there is no such order.
+    return session.execute(
+        update(order_model)
+        .where(order_model.id == order_id)
+        .values(total_amount=func.coalesce(order_model.total_amount, 0) + delta)
+        .returning(order_model.order_date)
+    ).first()
+
+def subtract_line_totals(session: Session, order_model, lines: list, order_key: str) -> None:
+    # Takes the amounts of lines about to be deleted off their orders, one UPDATE
+    # per order, in id order so concurrent writers lock the orders consistently.
+    totals: Dict[int, float] = {}
+    for line in lines:
+        order_id = getattr(line, order_key)
+        if order_id is not None and line.total_price:
+            totals[order_id] = totals.get(order_id, 0) + line.total_price
+    for order_id, total in sorted(totals.items()):
+        add_to_order_total(session, order_model, order_id, -total)
+
+def dialect_insert(session: Session):
+    # INSERT with ON CONFLICT support for the dialect the session is bound to.
+    return sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+
+# Stock ledger sources. Supplier lines add stock and consumer lines remove it.
+SUPPLIER_ORDER_ITEM = "supplier_order_item"
+CONSUMER_ORDER_ITEM = "consumer_order_item"
+
+def detach_returned(session: Session, instances: list) -> None:
+    # The rows were just populated by INSERT ... RETURNING; detached, commit() does
+    # not expire them, so reading the response does not refresh each row.
+    for instance in instances:
+        session.expunge(instance)
+
+def item_movement(source: str, item_id: Optional[int], product_id: Optional[int], quantity: Optional[int]) -> dict:
+    sign = -1 if source == CONSUMER_ORDER_ITEM else 1
+    return {"product_id": product_id, "quantity": sign * (quantity or 0), "source": source, "source_id": item_id}
+
+def reversed_movements(source: str, lines: list) -> List[dict]:
+    # Movements that undo the stock effect of order lines about to be deleted.
+    return [item_movement(source, line.id, line.product_id, -(line.quantity or 0)) for line in lines]
+
+def record_stock_movements(session: Session, movements: List[dict]) -> None:
+    # Appends the movements to the ledger and folds them into stock_levels with one
+    # INSERT ... ON CONFLICT DO UPDATE, so on-hand quantity is never summed from history.
+    movements = [movement for movement in movements if movement["product_id"] is not None and movement["quantity"]]
+    if not movements:
+        return
+    now = datetime.utcnow()
+    session.execute(insert(StockMovement), [dict(movement, created_at=now) for movement in movements])
+
+    deltas: Dict[int, int] = {}
+    for movement in movements:
+        deltas[movement["product_id"]] = deltas.get(movement["product_id"], 0) + movement["quantity"]
+    # Sorted so concurrent writers take the stock_levels row locks in the same order.
+    rows = [
+        {"product_id": product_id, "quantity": quantity, "updated_at": now}
+        for product_id, quantity in sorted(deltas.items()) if quantity
+    ]
+    if not rows:
+        return
+    statement = dialect_insert(session)(StockLevel).values(rows)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[StockLevel.product_id],
+        set_={"quantity": StockLevel.quantity + statement.excluded.quantity, "updated_at": statement.excluded.updated_at},
+    ))
+
+# Catalog cache helpers. Rows are cached as plain column snapshots and handed
+# back as detached instances, so a cached row never drags a closed session along.
+def cache_key(model, kind: str, value) -> str:
+    return f"{model.__tablename__}:{kind}:{value}"
+
+def snapshot(instance) -> dict:
+    return {column.key: getattr(instance, column.key) for column in instance.__table__.columns}
+
+def cached_get_by_ids(cache, session: Session, model, ids: List[int]) -> list:
+    rows, missing = [], []
+    for entity_id in ids:
+        values = cache.get(cache_key(model, "id", entity_id))
+        if values is MISSING:
+            missing.append(entity_id)
+        else:
+            rows.append(model(**values))
+    if missing:
+        for row in session.query(model).filter(model.id.in_(missing)).all():
+            cache.set(cache_key(model, "id", row.id), snapshot(row))
+            rows.append(row)
+    return rows
+
+def cached_get_by_name(cache, session: Session, model, column, name: str):
+    # Names map to ids (or None for a known miss); the row itself lives under its id key.
+    key = cache_key(model, "name", name.lower())
+    entity_id = cache.get(key)
+    if entity_id is None:
+        return None
+    if entity_id is not MISSING:
+        rows = cached_get_by_ids(cache, session, model, [entity_id])
+        if rows and (getattr(rows[0], column.key) or "").lower() == name.lower():
+            return rows[0]
+    row = session.query(model).filter(func.lower(column) == func.lower(name)).first()
+    cache.set(key, row.id if row else None)
+    if row:
+        cache.set(cache_key(model, "id", row.id), snapshot(row))
+    return row
+
+def invalidate_cached(cache, model, entity_id: Optional[int] = None, *names: Optional[str]) -> None:
+    keys = [cache_key(model, "name", name.lower()) for name in names if name]
+    if entity_id is not None:
+        keys.append(cache_key(model, "id", entity_id))
+    cache.delete(*keys)
+
 class SupplierDAO:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache=None):
         self.session = session
+        self.cache = catalog_cache if cache is None else cache
 
     def create_supplier(self, name: str, contact_number: str) -> Supplier:
         supplier = Supplier(name=name, contact_number=contact_number)
         self.session.add(supplier)
         self.session.commit()
+        invalidate_cached(self.cache, Supplier, None, name)
+        suggestion_index.put(SUPPLIER, supplier.id, name)
         return supplier
 
-    def get_supplier_by_id(self, supplier_id: int) -> Optional[Supplier]:
-        try:
-            return self.session.query(Supplier).filter_by(id=supplier_id).one()
-        except NoResultFound:
+    def get_supplier_by_id(self, supplier_id: int, options: Sequence = ()) -> Optional[Supplier]:
+        if options:
+            # Loader options need a live query; the cache only holds column snapshots.
+            suppliers = self.session.query(Supplier).options(*options).filter_by(id=supplier_id).all()
+        else:
+            suppliers = cached_get_by_ids(self.cache, self.session, Supplier, [supplier_id])
+        if not suppliers:
             raise NoResultFoundError("Supplier not found")
+        return suppliers[0]
 
-    def get_all_suppliers(self) -> List[Supplier]:
-        return self.session.query(Supplier).all()
+    def get_suppliers_by_ids(self, supplier_ids: List[int]) -> List[Supplier]:
+        return cached_get_by_ids(self.cache, self.session, Supplier, supplier_ids)
+
+    def get_all_suppliers(self, options: Sequence = ()) -> List[Supplier]:
+        return self.session.query(Supplier).options(*options).all()
+
+    def get_all_supplier_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, Supplier, keys)
+
+    def get_suppliers_page(self, first: int, after: Optional[Sequence] = None, options: Sequence = ()) -> Tuple[List[Supplier], bool]:
+        return keyset_page(self.session.query(Supplier).options(*options), [Supplier.id], first, after)
     
     def get_supplier_products(self, supplier_id: int) -> List[Product]:
         supplier = self.session.query(Supplier).get(supplier_id)
@@ -42,23 +222,22 @@ class SupplierDAO:
         return products
     
     def get_supplier_by_name(self, supplier_name: str) -> Optional[Supplier]:
-        supplier = (
-            self.session.query(Supplier)
-            .filter(func.lower(Supplier.name) == func.lower(supplier_name))
-            .first()
-        )
-        return supplier
+        return cached_get_by_name(self.cache, self.session, Supplier, Supplier.name, supplier_name)
             
 
 
     def update_supplier(self, supplier_id: int, name: Optional[str] = None, contact_number: Optional[str] = None) -> Optional[Supplier]:
         try:
             supplier = self.session.query(Supplier).filter_by(id=supplier_id).one()
+            old_name = supplier.name
             if name:
                 supplier.name = name
             if contact_number:
                 supplier.contact_number = contact_number
             self.session.commit()
+            invalidate_cached(self.cache, Supplier, supplier_id, old_name, name)
+            if name:
+                suggestion_index.put(SUPPLIER, supplier_id, name, old_name)
             return supplier
         except NoResultFound:
             raise NoResultFoundError("Supplier not found")
@@ -66,8 +245,19 @@ class SupplierDAO:
     def delete_supplier(self, supplier_id: int) -> bool:
         try:
             supplier = self.session.query(Supplier).filter_by(id=supplier_id).one()
+            supplier_name = supplier.name
+            # The supplier's orders and their lines go with it, so their stock movements are reversed too.
+            lines = (
+                self.session.query(SupplierOrderItem)
+                .join(SupplierOrder, SupplierOrderItem.supplier_order_id == SupplierOrder.id)
+                .filter(SupplierOrder.supplier_id == supplier_id)
+                .all()
+            )
+            record_stock_movements(self.session, reversed_movements(SUPPLIER_ORDER_ITEM, lines))
             self.session.delete(supplier)
             self.session.commit()
+            invalidate_cached(self.cache, Supplier, supplier_id, supplier_name)
+            suggestion_index.remove(SUPPLIER, supplier_id, supplier_name)
             return True
         except NoResultFound:
             raise NoResultFoundError("Supplier not found")
@@ -99,20 +289,30 @@ class SupplierDAO:
 
 
 class ProductDAO:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache=None):
         self.session = session
+        self.cache = catalog_cache if cache is None else cache
 
     def create_product(self, name: str, unit_price: float, description: str, category_id: int) -> Product:
         product = Product(name=name, unit_price=unit_price, description=description, category_id=category_id)
         self.session.add(product)
         self.session.commit()
+        invalidate_cached(self.cache, Product, None, name)
+        suggestion_index.put(PRODUCT, product.id, name)
         return product
 
-    def get_product_by_id(self, product_id: int) -> Optional[Product]:
-        try:
-            return self.session.query(Product).filter_by(id=product_id).one()
-        except NoResultFound:
+    def get_product_by_id(self, product_id: int, options: Sequence = ()) -> Optional[Product]:
+        if options:
+            # Loader options need a live query; the cache only holds column snapshots.
+            products = self.session.query(Product).options(*options).filter_by(id=product_id).all()
+        else:
+            products = cached_get_by_ids(self.cache, self.session, Product, [product_id])
+        if not products:
             raise NoResultFoundError("Product not found")
+        return products[0]
+
+    def get_products_by_ids(self, product_ids: List[int]) -> List[Product]:
+        return cached_get_by_ids(self.cache, self.session, Product, product_ids)
 
 
 
@@ -127,8 +327,14 @@ class ProductDAO:
         )
 
 
-    def get_all_products(self) -> List[Product]:
-        return self.session.query(Product).all()
+    def get_all_products(self, options: Sequence = ()) -> List[Product]:
+        return self.session.query(Product).options(*options).all()
+
+    def get_all_product_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, Product, keys)
+
+    def get_products_page(self, first: int, after: Optional[Sequence] = None, options: Sequence = ()) -> Tuple[List[Product], bool]:
+        return keyset_page(self.session.query(Product).options(*options), [Product.id], first, after)
     
     
     def get_products_by_consumer_order_item(self, consumer_order_item_id: int) -> List[Product]:
@@ -156,6 +362,7 @@ class ProductDAO:
                        description: Optional[str] = None) -> Optional[Product]:
         try:
             product = self.session.query(Product).filter_by(id=product_id).one()
+            old_name = product.name
             if name:
                 product.name = name
             if unit_price:
@@ -163,6 +370,9 @@ class ProductDAO:
             if description:
                 product.description = description
             self.session.commit()
+            invalidate_cached(self.cache, Product, product_id, old_name, name)
+            if name:
+                suggestion_index.put(PRODUCT, product_id, name, old_name)
             return product
         except NoResultFound:
             raise NoResultFoundError("Product not found")
@@ -170,8 +380,24 @@ class ProductDAO:
     def delete_product(self, product_id: int) -> bool:
         try:
             product = self.session.query(Product).filter_by(id=product_id).one()
+            product_name = product.name
+            category = snapshot(product.category) if product.category is not None else None
+            # The product's order lines go with it, so their orders' totals drop too.
+            subtract_line_totals(self.session, SupplierOrder, product.supplier_order_items, "supplier_order_id")
+            subtract_line_totals(self.session, ConsumerOrder, product.consumer_order_items, "consumer_order_id")
+            # Recorded before the delete: the ledger rows reference the product.
+            record_stock_movements(self.session, [
+                *reversed_movements(SUPPLIER_ORDER_ITEM, product.supplier_order_items),
+                *reversed_movements(CONSUMER_ORDER_ITEM, product.consumer_order_items),
+            ])
             self.session.delete(product)
             self.session.commit()
+            invalidate_cached(self.cache, Product, product_id, product_name)
+            suggestion_index.remove(PRODUCT, product_id, product_name)
+            # Deleting a product cascades to its category.
+            if category is not None:
+                invalidate_cached(self.cache, Category, category["id"], category["category_name"])
+                suggestion_index.remove(CATEGORY, category["id"], category["category_name"])
             return True
         except NoResultFound:
             raise NoResultFoundError("Product not found")
@@ -201,17 +427,29 @@ class ProductDAO:
         
         return supplier
 
+    def get_suppliers_by_product_ids(self, product_ids: List[int]) -> List[tuple]:
+        # One (product_id, Supplier) per product: the supplier of its earliest order line.
+        first_items = (
+            self.session.query(func.min(SupplierOrderItem.id).label("id"))
+            .filter(SupplierOrderItem.product_id.in_(product_ids))
+            .group_by(SupplierOrderItem.product_id)
+            .subquery()
+        )
+        return (
+            self.session.query(SupplierOrderItem.product_id, Supplier)
+            .select_from(SupplierOrderItem)
+            .join(first_items, first_items.c.id == SupplierOrderItem.id)
+            .join(SupplierOrder, SupplierOrderItem.supplier_order_id == SupplierOrder.id)
+            .join(Supplier, Supplier.id == SupplierOrder.supplier_id)
+            .all()
+        )
+
+
+
 
-    
 
-    
     def get_product_by_name(self, product_name: str) -> Optional[Product]:
-        product = (
-            self.session.query(Product)
-            .filter(func.lower(Product.name) == func.lower(product_name))
-            .first()
-        )
-        return product
+        return cached_get_by_name(self.cache, self.session, Product, Product.name, product_name)
     
 
     def get_products_by_supplierorder_id(self, supplier_order_id: int) -> List[Product]:
@@ -231,6 +469,21 @@ class ProductDAO:
             .filter(SupplierOrder.order_date == supplier_order_date)
             .all()
         )
+
+    def get_products_by_supplier_order_date_range(self, start: Optional[date], end: Optional[date],
+                                                  supplier_id: Optional[int] = None) -> List[Product]:
+        # A semi-join returns each product once however many lines matched.
+        # Filtering the lines' copy of order_date as well lets a partitioned layout
+        # prune both tables.
+        lines = (
+            select(SupplierOrderItem.product_id)
+            .join(SupplierOrder, SupplierOrderItem.supplier_order_id == SupplierOrder.id)
+        )
+        lines = filter_date_range(lines, SupplierOrder.order_date, start, end)
+        lines = filter_date_range(lines, SupplierOrderItem.order_date, start, end)
+        if supplier_id is not None:
+            lines = lines.where(SupplierOrder.supplier_id == supplier_id)
+        return self.session.query(Product).filter(Product.id.in_(lines)).order_by(Product.id).all()
     
     def get_products_by_category_name(self, category_name: str) -> List[Product]:
         return (
@@ -257,6 +510,18 @@ class ProductDAO:
             .all()
         )
 
+    def get_products_by_consumer_order_date_range(self, start: Optional[date], end: Optional[date],
+                                                  consumer_id: Optional[int] = None) -> List[Product]:
+        lines = (
+            select(ConsumerOrderItem.product_id)
+            .join(ConsumerOrder, ConsumerOrderItem.consumer_order_id == ConsumerOrder.id)
+        )
+        lines = filter_date_range(lines, ConsumerOrder.order_date, start, end)
+        lines = filter_date_range(lines, ConsumerOrderItem.order_date, start, end)
+        if consumer_id is not None:
+            lines = lines.where(ConsumerOrder.consumer_id == consumer_id)
+        return self.session.query(Product).filter(Product.id.in_(lines)).order_by(Product.id).all()
+
     
 
     
@@ -267,29 +532,44 @@ class ProductDAO:
 
 
 class CategoryDAO:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache=None):
         self.session = session
+        self.cache = catalog_cache if cache is None else cache
 
     def create_category(self, category_name: str) -> Category:
         category = Category(category_name=category_name)
         self.session.add(category)
         self.session.commit()
+        invalidate_cached(self.cache, Category, None, category_name)
+        suggestion_index.put(CATEGORY, category.id, category_name)
         return category
 
     def get_category_by_id(self, category_id: int) -> Optional[Category]:
-        try:
-            return self.session.query(Category).filter_by(id=category_id).one()
-        except NoResultFound:
+        categories = cached_get_by_ids(self.cache, self.session, Category, [category_id])
+        if not categories:
             raise NoResultFoundError("Category not found")
+        return categories[0]
+
+    def get_categories_by_ids(self, category_ids: List[int]) -> List[Category]:
+        return cached_get_by_ids(self.cache, self.session, Category, category_ids)
 
     def get_all_categories(self) -> List[Category]:
         return self.session.query(Category).all()
 
+    def get_all_category_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, Category, keys)
+
+    def get_categories_page(self, first: int, after: Optional[Sequence] = None) -> Tuple[List[Category], bool]:
+        return keyset_page(self.session.query(Category), [Category.id], first, after)
+
     def update_category(self, category_id: int, category_name: str) -> Optional[Category]:
         try:
             category = self.session.query(Category).filter_by(id=category_id).one()
+            old_name = category.category_name
             category.category_name = category_name
             self.session.commit()
+            invalidate_cached(self.cache, Category, category_id, old_name, category_name)
+            suggestion_index.put(CATEGORY, category_id, category_name, old_name)
             return category
         except NoResultFound:
             raise NoResultFoundError("Category not found")
@@ -297,20 +577,17 @@ class CategoryDAO:
     def delete_category(self, category_id: int) -> bool:
         try:
             category = self.session.query(Category).filter_by(id=category_id).one()
+            category_name = category.category_name
             self.session.delete(category)
             self.session.commit()
+            invalidate_cached(self.cache, Category, category_id, category_name)
+            suggestion_index.remove(CATEGORY, category_id, category_name)
             return True
         except NoResultFound:
             raise NoResultFoundError("Category not found")
         
     def get_category_by_name(self, category_name: str) -> Optional[Category]:
-        category = (
-            self.session.query(Category)
-            .filter(func.lower(Category.category_name) == func.lower(category_name))
-            .first()
-        )
-        
-        return category
+        return cached_get_by_name(self.cache, self.session, Category, Category.category_name, category_name)
     
     def get_category_by_product_name(self, product_name: str) -> List[Category]:
         category = (
@@ -362,32 +639,66 @@ class SupplierOrderDAO:
     def __init__(self, session: Session):
         self.session = session
 
-    def create_supplier_order(self, supplier_id: int, order_date: str, total_amount: float) -> SupplierOrder:
+    def create_supplier_order(self, supplier_id: int, order_date: date, total_amount: float) -> SupplierOrder:
         supplier_order = SupplierOrder(supplier_id=supplier_id, order_date=order_date, total_amount=total_amount)
         self.session.add(supplier_order)
         self.session.commit()
         return supplier_order
 
-    def get_supplier_order_by_id(self, supplier_order_id: int) -> Optional[SupplierOrder]:
+    def get_supplier_order_by_id(self, supplier_order_id: int, options: Sequence = ()) -> Optional[SupplierOrder]:
         try:
-            return self.session.query(SupplierOrder).filter_by(id=supplier_order_id).one()
+            return self.session.query(SupplierOrder).options(*options).filter_by(id=supplier_order_id).one()
         except NoResultFound:
             raise NoResultFoundError("SupplierOrder not found")
 
-    def get_all_supplier_orders(self) -> List[SupplierOrder]:
-        return self.session.query(SupplierOrder).all()
+    def get_supplier_orders_by_ids(self, supplier_order_ids: List[int]) -> List[SupplierOrder]:
+        return self.session.query(SupplierOrder).filter(SupplierOrder.id.in_(supplier_order_ids)).all()
+
+    def get_supplier_orders_by_supplier_ids(self, supplier_ids: List[int]) -> List[SupplierOrder]:
+        return self.session.query(SupplierOrder).filter(SupplierOrder.supplier_id.in_(supplier_ids)).order_by(SupplierOrder.id).all()
+
+    def get_all_supplier_orders(self, options: Sequence = ()) -> List[SupplierOrder]:
+        return self.session.query(SupplierOrder).options(*options).all()
+
+    def get_all_supplier_order_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, SupplierOrder, keys)
+
+    def get_supplier_orders_page(self, first: int, after: Optional[Sequence] = None, order_by_date: bool = False,
+                          options: Sequence = ()) -> Tuple[List[SupplierOrder], bool]:
+        columns = [SupplierOrder.order_date, SupplierOrder.id] if order_by_date else [SupplierOrder.id]
+        return keyset_page(self.session.query(SupplierOrder).options(*options), columns, first, after)
 
     def get_supplier_orders_by_order_date(self, order_date: date) -> List[SupplierOrder]:
         return self.session.query(SupplierOrder).filter(SupplierOrder.order_date == order_date).all()
 
+    def get_supplier_order_rows_by_order_date(self, order_date: date, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, SupplierOrder, keys, SupplierOrder.order_date == order_date)
+
+    def get_supplier_orders_by_date_range(self, start: Optional[date], end: Optional[date],
+                                          supplier_id: Optional[int] = None,
+                                          descending: bool = False) -> List[SupplierOrder]:
+        query = filter_date_range(self.session.query(SupplierOrder), SupplierOrder.order_date, start, end)
+        if supplier_id is not None:
+            query = query.filter(SupplierOrder.supplier_id == supplier_id)
+        if descending:
+            return query.order_by(SupplierOrder.order_date.desc(), SupplierOrder.id.desc()).all()
+        return query.order_by(SupplierOrder.order_date, SupplierOrder.id).all()
+
 
 
-    def update_supplier_order(self, supplier_order_id: int, order_date: Optional[str] = None,
+    def update_supplier_order(self, supplier_order_id: int, order_date: Optional[date] = None,
                               total_amount: Optional[float] = None) -> Optional[SupplierOrder]:
         try:
             supplier_order = self.session.query(SupplierOrder).filter_by(id=supplier_order_id).one()
             if order_date:
                 supplier_order.order_date = order_date
+                # Lines carry a copy of the order date (the partition key when partitioned).
+                self.session.flush()
+                self.session.execute(
+                    update(SupplierOrderItem)
+                    .where(SupplierOrderItem.supplier_order_id == supplier_order_id)
+                    .values(order_date=supplier_order.order_date)
+                )
             if total_amount:
                 supplier_order.total_amount = total_amount
             self.session.commit()
@@ -398,7 +709,10 @@ class SupplierOrderDAO:
     def delete_supplier_order(self, supplier_order_id: int) -> bool:
         try:
             supplier_order = self.session.query(SupplierOrder).filter_by(id=supplier_order_id).one()
+            # The lines go with the order, so their stock movements are reversed too.
+            movements = reversed_movements(SUPPLIER_ORDER_ITEM, supplier_order.items)
             self.session.delete(supplier_order)
+            record_stock_movements(self.session, movements)
             self.session.commit()
             return True
         except NoResultFound:
@@ -409,6 +723,9 @@ class SupplierOrderDAO:
             return self.session.query(SupplierOrder).filter_by(supplier_id=supplier_id).all()
         except NoResultFound:
             return []
+
+    def get_supplier_order_rows_by_supplier_id(self, supplier_id: int, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, SupplierOrder, keys, SupplierOrder.supplier_id == supplier_id)
         
     def get_supplier_orders_by_product(self, product_name: str) -> List[SupplierOrder]:
         supplier_orders = self.session.query(SupplierOrder).join(SupplierOrderItem).join(Product).filter(Product.name == product_name).all()
@@ -428,6 +745,7 @@ class SupplierOrderItemDAO:
         quantity: int,
         unit_price: float,
         calculate_total: bool = True,
+        total_price: Optional[float] = None,
     ) -> SupplierOrderItem:
         supplier_order_item = SupplierOrderItem(
             supplier_order_id=supplier_order_id,
@@ -437,32 +755,74 @@ class SupplierOrderItemDAO:
             unit_price=unit_price,
         )
 
-        if calculate_total:
-            supplier_order_item.calculate_total_price()
+        # An explicit line total wins over the one priced from the product.
+        if total_price is not None:
+            supplier_order_item.total_price = total_price
+        elif calculate_total:
+            price = get_product_prices(self.session, [product_id])[product_id]
+            supplier_order_item.total_price = quantity * float(price) if quantity is not None and price is not None else 0
 
         # Update the total_amount of the associated SupplierOrder
-        try:
-            supplier_order = self.session.query(SupplierOrder).filter_by(id=supplier_order_id).one()
-            if supplier_order_item.total_price is not None:
-                if supplier_order.total_amount is None:
-                    supplier_order.total_amount = 0  # Initialize to 0 if None
-                supplier_order.total_amount += supplier_order_item.total_price
+        supplier_order = add_to_order_total(self.session, SupplierOrder, supplier_order_id, supplier_order_item.total_price or 0)
+        if supplier_order is None:
+            self.session.rollback()
+            raise NoResultFoundError("SupplierOrderItem not found")
 
-            self.session.add(supplier_order_item)
-            self.session.commit()
+        supplier_order_item.order_date = supplier_order.order_date
+        self.session.add(supplier_order_item)
+        self.session.flush()
+        record_stock_movements(self.session, [
+            item_movement(SUPPLIER_ORDER_ITEM, supplier_order_item.id, product_id, quantity),
+        ])
+        self.session.commit()
+        return supplier_order_item
 
-            return supplier_order_item
-        except NoResultFound:
-            raise NoResultFoundError("SupplierOrderItem not found")
+    def create_supplier_order_items(self, supplier_order_id: int, items: List[dict]) -> List[SupplierOrderItem]:
+        if not items:
+            return []
+        prices = get_product_prices(self.session, [item["product_id"] for item in items])
+        rows = []
+        for item in items:
+            price = prices[item["product_id"]]
+            total_price = item["quantity"] * float(price) if item["quantity"] is not None and price is not None else 0
+            rows.append(dict(item, supplier_order_id=supplier_order_id, total_price=total_price))
+
+        # One UPDATE for the order total; zero rows matched means the order does not exist.
+        supplier_order = add_to_order_total(self.session, SupplierOrder, supplier_order_id, sum(row["total_price"] for row in rows))
+        if supplier_order is None:
+            self.session.rollback()
+            raise NoResultFoundError("SupplierOrder not found")
+        for row in rows:
+            row["order_date"] = supplier_order.order_date
+
+        supplier_order_items = self.session.scalars(insert(SupplierOrderItem).returning(SupplierOrderItem), rows).all()
+        record_stock_movements(self.session, [
+            item_movement(SUPPLIER_ORDER_ITEM, item.id, item.product_id, item.quantity) for item in supplier_order_items
+        ])
+        detach_returned(self.session, supplier_order_items)
+        self.session.commit()
+        return supplier_order_items
 
-    def get_supplier_order_item_by_id(self, supplier_order_item_id: int) -> Optional[SupplierOrderItem]:
+    def get_supplier_order_item_by_id(self, supplier_order_item_id: int, options: Sequence = ()) -> Optional[SupplierOrderItem]:
         try:
-            return self.session.query(SupplierOrderItem).filter_by(id=supplier_order_item_id).one()
+            return self.session.query(SupplierOrderItem).options(*options).filter_by(id=supplier_order_item_id).one()
         except NoResultFound:
             raise NoResultFoundError("SupplierOrderItem not found")
 
-    def get_all_supplier_order_items(self) -> List[SupplierOrderItem]:
-        return self.session.query(SupplierOrderItem).all()
+    def get_supplier_order_items_by_ids(self, supplier_order_item_ids: List[int]) -> List[SupplierOrderItem]:
+        return self.session.query(SupplierOrderItem).filter(SupplierOrderItem.id.in_(supplier_order_item_ids)).all()
+
+    def get_supplier_order_items_by_order_ids(self, supplier_order_ids: List[int]) -> List[SupplierOrderItem]:
+        return self.session.query(SupplierOrderItem).filter(SupplierOrderItem.supplier_order_id.in_(supplier_order_ids)).order_by(SupplierOrderItem.id).all()
+
+    def get_all_supplier_order_items(self, options: Sequence = ()) -> List[SupplierOrderItem]:
+        return self.session.query(SupplierOrderItem).options(*options).all()
+
+    def get_all_supplier_order_item_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, SupplierOrderItem, keys)
+
+    def get_supplier_order_items_page(self, first: int, after: Optional[Sequence] = None, options: Sequence = ()) -> Tuple[List[SupplierOrderItem], bool]:
+        return keyset_page(self.session.query(SupplierOrderItem).options(*options), [SupplierOrderItem.id], first, after)
 
     def update_supplier_order_item(
         self,
@@ -471,9 +831,15 @@ class SupplierOrderItemDAO:
         quantity: Optional[int] = None,
         unit_price: Optional[float] = None,
         calculate_total: bool = True,
+        total_price: Optional[float] = None,
     ) -> Optional[SupplierOrderItem]:
         try:
-            supplier_order_item = self.session.query(SupplierOrderItem).filter_by(id=supplier_order_item_id).one()
+            # FOR UPDATE keeps the old line total stable until the order delta is applied.
+            supplier_order_item = (
+                self.session.query(SupplierOrderItem).filter_by(id=supplier_order_item_id).with_for_update().one()
+            )
+            previous_total = supplier_order_item.total_price or 0
+            previous_quantity = supplier_order_item.quantity or 0
             if item_name is not None:
                 supplier_order_item.item_name = item_name
             if quantity is not None:
@@ -481,16 +847,23 @@ class SupplierOrderItemDAO:
             if unit_price is not None:
                 supplier_order_item.unit_price = unit_price
 
-            if calculate_total:
+            if total_price is not None:
+                supplier_order_item.total_price = total_price
+            elif calculate_total:
                 supplier_order_item.calculate_total_price()
 
-            # Update the total_amount of the associated SupplierOrder
-            supplier_order = supplier_order_item.order
-            if supplier_order:
-                if supplier_order_item.total_price is not None:
-                    if supplier_order.total_amount is None:
-                        supplier_order.total_amount = 0  # Initialize to 0 if None
-                    supplier_order.total_amount += supplier_order_item.total_price
+            # Update the total_amount of the associated SupplierOrder by the change in this line
+            delta = float(supplier_order_item.total_price or 0) - float(previous_total)
+            if supplier_order_item.supplier_order_id is not None and delta:
+                self.session.flush()
+                add_to_order_total(self.session, SupplierOrder, supplier_order_item.supplier_order_id, delta)
+
+            record_stock_movements(self.session, [
+                item_movement(
+                    SUPPLIER_ORDER_ITEM, supplier_order_item.id, supplier_order_item.product_id,
+                    (supplier_order_item.quantity or 0) - previous_quantity,
+                ),
+            ])
 
             self.session.commit()
             return supplier_order_item
@@ -498,13 +871,22 @@ class SupplierOrderItemDAO:
             raise NoResultFoundError("SupplierOrderItem not found")
 
     def delete_supplier_order_item(self, supplier_order_item_id: int) -> bool:
-        try:
-            supplier_order_item = self.session.query(SupplierOrderItem).filter_by(id=supplier_order_item_id).one()
-            self.session.delete(supplier_order_item)
-            self.session.commit()
-            return True
-        except NoResultFound:
+        # DELETE ... RETURNING hands back the line total that was actually removed.
+        deleted = self.session.execute(
+            delete(SupplierOrderItem)
+            .where(SupplierOrderItem.id == supplier_order_item_id)
+            .returning(SupplierOrderItem.supplier_order_id, SupplierOrderItem.total_price, SupplierOrderItem.product_id, SupplierOrderItem.quantity)
+        ).first()
+        if deleted is None:
+            self.session.rollback()
             raise NoResultFoundError("SupplierOrderItem not found")
+        if deleted.supplier_order_id is not None and deleted.total_price:
+            add_to_order_total(self.session, SupplierOrder, deleted.supplier_order_id, -deleted.total_price)
+        record_stock_movements(self.session, [
+            item_movement(SUPPLIER_ORDER_ITEM, supplier_order_item_id, deleted.product_id, -(deleted.quantity or 0)),
+        ])
+        self.session.commit()
+        return True
 
 
 class ConsumerOrderDAO:
@@ -514,7 +896,7 @@ class ConsumerOrderDAO:
     def create_consumer_order(
         self,
         consumer_id: int,
-        order_date: str,
+        order_date: date,
         total_amount: float,
     ) -> ConsumerOrder:
         consumer_order = ConsumerOrder(consumer_id=consumer_id, order_date=order_date, total_amount=total_amount)
@@ -523,28 +905,62 @@ class ConsumerOrderDAO:
         self.session.commit()
         return consumer_order
 
-    def get_consumer_order_by_id(self, consumer_order_id: int) -> Optional[ConsumerOrder]:
+    def get_consumer_order_by_id(self, consumer_order_id: int, options: Sequence = ()) -> Optional[ConsumerOrder]:
         try:
-            return self.session.query(ConsumerOrder).filter_by(id=consumer_order_id).one()
+            return self.session.query(ConsumerOrder).options(*options).filter_by(id=consumer_order_id).one()
         except NoResultFound:
             raise NoResultFoundError("ConsumerOrder not found")
 
-    def get_all_consumer_orders(self) -> List[ConsumerOrder]:
-        return self.session.query(ConsumerOrder).all()
+    def get_consumer_orders_by_ids(self, consumer_order_ids: List[int]) -> List[ConsumerOrder]:
+        return self.session.query(ConsumerOrder).filter(ConsumerOrder.id.in_(consumer_order_ids)).all()
+
+    def get_consumer_orders_by_consumer_ids(self, consumer_ids: List[int]) -> List[ConsumerOrder]:
+        return self.session.query(ConsumerOrder).filter(ConsumerOrder.consumer_id.in_(consumer_ids)).order_by(ConsumerOrder.id).all()
+
+    def get_all_consumer_orders(self, options: Sequence = ()) -> List[ConsumerOrder]:
+        return self.session.query(ConsumerOrder).options(*options).all()
+
+    def get_all_consumer_order_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, ConsumerOrder, keys)
+
+    def get_consumer_orders_page(self, first: int, after: Optional[Sequence] = None, order_by_date: bool = False,
+                          options: Sequence = ()) -> Tuple[List[ConsumerOrder], bool]:
+        columns = [ConsumerOrder.order_date, ConsumerOrder.id] if order_by_date else [ConsumerOrder.id]
+        return keyset_page(self.session.query(ConsumerOrder).options(*options), columns, first, after)
     
     def get_consumer_orders_by_order_date(self, order_date: date) -> List[ConsumerOrder]:
         return self.session.query(ConsumerOrder).filter(ConsumerOrder.order_date == order_date).all()
 
+    def get_consumer_order_rows_by_order_date(self, order_date: date, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, ConsumerOrder, keys, ConsumerOrder.order_date == order_date)
+
+    def get_consumer_orders_by_date_range(self, start: Optional[date], end: Optional[date],
+                                          consumer_id: Optional[int] = None,
+                                          descending: bool = False) -> List[ConsumerOrder]:
+        query = filter_date_range(self.session.query(ConsumerOrder), ConsumerOrder.order_date, start, end)
+        if consumer_id is not None:
+            query = query.filter(ConsumerOrder.consumer_id == consumer_id)
+        if descending:
+            return query.order_by(ConsumerOrder.order_date.desc(), ConsumerOrder.id.desc()).all()
+        return query.order_by(ConsumerOrder.order_date, ConsumerOrder.id).all()
+
     def update_consumer_order(
         self,
         consumer_order_id: int,
-        order_date: Optional[str] = None,
+        order_date: Optional[date] = None,
         total_amount: Optional[float] = None,
     ) -> Optional[ConsumerOrder]:
         try:
             consumer_order = self.session.query(ConsumerOrder).filter_by(id=consumer_order_id).one()
             if order_date is not None:
                 consumer_order.order_date = order_date
+                # Lines carry a copy of the order date (the partition key when partitioned).
+                self.session.flush()
+                self.session.execute(
+                    update(ConsumerOrderItem)
+                    .where(ConsumerOrderItem.consumer_order_id == consumer_order_id)
+                    .values(order_date=consumer_order.order_date)
+                )
             if total_amount is not None:
                 consumer_order.total_amount = total_amount
 
@@ -556,12 +972,38 @@ class ConsumerOrderDAO:
     def delete_consumer_order(self, consumer_order_id: int) -> bool:
         try:
             consumer_order = self.session.query(ConsumerOrder).filter_by(id=consumer_order_id).one()
+            # The lines go with the order, so their stock movements are reversed too.
+            movements = reversed_movements(CONSUMER_ORDER_ITEM, consumer_order.items)
             self.session.delete(consumer_order)
+            record_stock_movements(self.session, movements)
             self.session.commit()
             return True
         except NoResultFound:
             raise NoResultFoundError("ConsumerOrder not found")
         
+    def stream_consumer_order_lines(self, start: Optional[date] = None, end: Optional[date] = None,
+                                    batch_size: int = 1000) -> Result:
+        # yield_per makes the driver use a server-side cursor, so only one batch
+        # of rows is held in memory however large the date range is.
+        query = (
+            select(
+                ConsumerOrder.id.label("consumer_order_id"),
+                ConsumerOrder.consumer_id,
+                ConsumerOrder.order_date,
+                ConsumerOrder.total_amount,
+                ConsumerOrderItem.id.label("consumer_order_item_id"),
+                ConsumerOrderItem.product_id,
+                ConsumerOrderItem.item_name,
+                ConsumerOrderItem.quantity,
+                ConsumerOrderItem.unit_price,
+                ConsumerOrderItem.total_price,
+            )
+            .outerjoin(ConsumerOrderItem, ConsumerOrderItem.consumer_order_id == ConsumerOrder.id)
+            .order_by(ConsumerOrder.order_date, ConsumerOrder.id, ConsumerOrderItem.id)
+        )
+        query = filter_date_range(query, ConsumerOrder.order_date, start, end)
+        return self.session.execute(query.execution_options(yield_per=batch_size))
+
     def get_all_consumer_orders_by_product(self, product_name: str) -> List[ConsumerOrder]:
         consumer_orders = self.session.query(ConsumerOrder).join(ConsumerOrderItem).join(Product).filter(Product.name == product_name).all()
         return consumer_orders
@@ -589,27 +1031,67 @@ class ConsumerOrderItemDAO:
             total_price=total_price,
         )
         consumer_order_item.total_price = quantity * unit_price
-        self.session.add(consumer_order_item)
 
         # Update the total_amount of the associated ConsumerOrder
-        try:
-            consumer_order = self.session.query(ConsumerOrder).filter_by(id=consumer_order_id).one()
-            consumer_order.total_amount += total_price
+        consumer_order = add_to_order_total(self.session, ConsumerOrder, consumer_order_id, consumer_order_item.total_price)
+        if consumer_order is None:
+            self.session.rollback()
+            raise NoResultFoundError("ConsumerOrderItem not found")
 
-            self.session.commit()
+        consumer_order_item.order_date = consumer_order.order_date
+        self.session.add(consumer_order_item)
+        self.session.flush()
+        record_stock_movements(self.session, [
+            item_movement(CONSUMER_ORDER_ITEM, consumer_order_item.id, product_id, quantity),
+        ])
+        self.session.commit()
+        return consumer_order_item
 
-            return consumer_order_item
-        except NoResultFound:
-            raise NoResultFoundError("ConsumerOrderItem not found")
+    def create_consumer_order_items(self, consumer_order_id: int, items: List[dict]) -> List[ConsumerOrderItem]:
+        if not items:
+            return []
+        get_product_prices(self.session, [item["product_id"] for item in items])
+        rows = [
+            dict(item, consumer_order_id=consumer_order_id, total_price=item["quantity"] * item["unit_price"])
+            for item in items
+        ]
+
+        # One UPDATE for the order total; zero rows matched means the order does not exist.
+        consumer_order = add_to_order_total(self.session, ConsumerOrder, consumer_order_id, sum(row["total_price"] for row in rows))
+        if consumer_order is None:
+            self.session.rollback()
+            raise NoResultFoundError("ConsumerOrder not found")
+        for row in rows:
+            row["order_date"] = consumer_order.order_date
+
+        consumer_order_items = self.session.scalars(insert(ConsumerOrderItem).returning(ConsumerOrderItem), rows).all()
+        record_stock_movements(self.session, [
+            item_movement(CONSUMER_ORDER_ITEM, item.id, item.product_id, item.quantity) for item in consumer_order_items
+        ])
+        detach_returned(self.session, consumer_order_items)
+        self.session.commit()
+        return consumer_order_items
 
-    def get_consumer_order_item_by_id(self, consumer_order_item_id: int) -> Optional[ConsumerOrderItem]:
+    def get_consumer_order_item_by_id(self, consumer_order_item_id: int, options: Sequence = ()) -> Optional[ConsumerOrderItem]:
         try:
-            return self.session.query(ConsumerOrderItem).filter_by(id=consumer_order_item_id).one()
+            return self.session.query(ConsumerOrderItem).options(*options).filter_by(id=consumer_order_item_id).one()
         except NoResultFound:
             raise NoResultFoundError("ConsumerOrderItem not found")
 
-    def get_all_consumer_order_items(self) -> List[ConsumerOrderItem]:
-        return self.session.query(ConsumerOrderItem).all()
+    def get_consumer_order_items_by_ids(self, consumer_order_item_ids: List[int]) -> List[ConsumerOrderItem]:
+        return self.session.query(ConsumerOrderItem).filter(ConsumerOrderItem.id.in_(consumer_order_item_ids)).all()
+
+    def get_consumer_order_items_by_order_ids(self, consumer_order_ids: List[int]) -> List[ConsumerOrderItem]:
+        return self.session.query(ConsumerOrderItem).filter(ConsumerOrderItem.consumer_order_id.in_(consumer_order_ids)).order_by(ConsumerOrderItem.id).all()
+
+    def get_all_consumer_order_items(self, options: Sequence = ()) -> List[ConsumerOrderItem]:
+        return self.session.query(ConsumerOrderItem).options(*options).all()
+
+    def get_all_consumer_order_item_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, ConsumerOrderItem, keys)
+
+    def get_consumer_order_items_page(self, first: int, after: Optional[Sequence] = None, options: Sequence = ()) -> Tuple[List[ConsumerOrderItem], bool]:
+        return keyset_page(self.session.query(ConsumerOrderItem).options(*options), [ConsumerOrderItem.id], first, after)
 
     def update_consumer_order_item(
         self,
@@ -620,7 +1102,12 @@ class ConsumerOrderItemDAO:
         total_price: Optional[float] = None,
     ) -> Optional[ConsumerOrderItem]:
         try:
-            consumer_order_item = self.session.query(ConsumerOrderItem).filter_by(id=consumer_order_item_id).one()
+            # FOR UPDATE keeps the old line total stable until the order delta is applied.
+            consumer_order_item = (
+                self.session.query(ConsumerOrderItem).filter_by(id=consumer_order_item_id).with_for_update().one()
+            )
+            previous_total = consumer_order_item.total_price or 0
+            previous_quantity = consumer_order_item.quantity or 0
             if item_name is not None:
                 consumer_order_item.item_name = item_name
             if quantity is not None:
@@ -632,11 +1119,21 @@ class ConsumerOrderItemDAO:
                 consumer_order_item.total_price = quantity * unit_price
             elif total_price is not None:
                 consumer_order_item.total_price = total_price
-
-            # Update the total_amount of the associated ConsumerOrder
-            consumer_order = consumer_order_item.order
-            if consumer_order:
-                consumer_order.total_amount += consumer_order_item.total_price
+            elif quantity is not None or unit_price is not None:
+                consumer_order_item.total_price = consumer_order_item.quantity * consumer_order_item.unit_price
+
+            # Update the total_amount of the associated ConsumerOrder by the change in this line
+            delta = float(consumer_order_item.total_price or 0) - float(previous_total)
+            if consumer_order_item.consumer_order_id is not None and delta:
+                self.session.flush()
+                add_to_order_total(self.session, ConsumerOrder, consumer_order_item.consumer_order_id, delta)
+
+            record_stock_movements(self.session, [
+                item_movement(
+                    CONSUMER_ORDER_ITEM, consumer_order_item.id, consumer_order_item.product_id,
+                    (consumer_order_item.quantity or 0) - previous_quantity,
+                ),
+            ])
 
             self.session.commit()
             return consumer_order_item
@@ -644,13 +1141,22 @@ class ConsumerOrderItemDAO:
             raise NoResultFoundError("ConsumerOrderItem not found")
 
     def delete_consumer_order_item(self, consumer_order_item_id: int) -> bool:
-        try:
-            consumer_order_item = self.session.query(ConsumerOrderItem).filter_by(id=consumer_order_item_id).one()
-            self.session.delete(consumer_order_item)
-            self.session.commit()
-            return True
-        except NoResultFound:
+        # DELETE ... RETURNING hands back the line total that was actually removed.
+        deleted = self.session.execute(
+            delete(ConsumerOrderItem)
+            .where(ConsumerOrderItem.id == consumer_order_item_id)
+            .returning(ConsumerOrderItem.consumer_order_id, ConsumerOrderItem.total_price, ConsumerOrderItem.product_id, ConsumerOrderItem.quantity)
+        ).first()
+        if deleted is None:
+            self.session.rollback()
             raise NoResultFoundError("ConsumerOrderItem not found")
+        if deleted.consumer_order_id is not None and deleted.total_price:
+            add_to_order_total(self.session, ConsumerOrder, deleted.consumer_order_id, -deleted.total_price)
+        record_stock_movements(self.session, [
+            item_movement(CONSUMER_ORDER_ITEM, consumer_order_item_id, deleted.product_id, -(deleted.quantity or 0)),
+        ])
+        self.session.commit()
+        return True
 
 
 class ConsumerDAO:
@@ -663,18 +1169,27 @@ class ConsumerDAO:
         self.session.commit()
         return consumer
 
-    def get_consumer_by_id(self, consumer_id: int) -> Optional[Consumer]:
+    def get_consumer_by_id(self, consumer_id: int, options: Sequence = ()) -> Optional[Consumer]:
         try:
-            return self.session.query(Consumer).filter_by(id=consumer_id).one()
+            return self.session.query(Consumer).options(*options).filter_by(id=consumer_id).one()
         except NoResultFound:
             raise NoResultFoundError("Consumer not found")
 
-    def get_consumers_by_name(self, name: str) -> List[Consumer]:
-        pattern = re.compile(name, re.IGNORECASE)
-        return self.session.query(Consumer).filter(pattern.match(Consumer.name)).all()
+    def get_consumers_by_ids(self, consumer_ids: List[int]) -> List[Consumer]:
+        return self.session.query(Consumer).filter(Consumer.id.in_(consumer_ids)).all()
+
+    def get_consumers_by_name(self, name: str, limit: int = 50) -> List[Consumer]:
+        consumers, _ = SearchDAO(self.session).search_consumers(name, limit)
+        return [consumer for consumer, _ in consumers]
+
+    def get_all_consumers(self, options: Sequence = ()) -> List[Consumer]:
+        return self.session.query(Consumer).options(*options).all()
 
-    def get_all_consumers(self) -> List[Consumer]:
-        return self.session.query(Consumer).all()
+    def get_all_consumer_rows(self, keys: Sequence[str]) -> List[Row]:
+        return select_rows(self.session, Consumer, keys)
+
+    def get_consumers_page(self, first: int, after: Optional[Sequence] = None, options: Sequence = ()) -> Tuple[List[Consumer], bool]:
+        return keyset_page(self.session.query(Consumer).options(*options), [Consumer.id], first, after)
 
     def update_consumer(self, consumer_id: int, name: Optional[str] = None,
                         contact_number: Optional[str] = None) -> Optional[Consumer]:
@@ -692,8 +1207,185 @@ class ConsumerDAO:
     def delete_consumer(self, consumer_id: int) -> bool:
         try:
             consumer = self.session.query(Consumer).filter_by(id=consumer_id).one()
+            # The consumer's orders and their lines go with it, so their stock movements are reversed too.
+            lines = (
+                self.session.query(ConsumerOrderItem)
+                .join(ConsumerOrder, ConsumerOrderItem.consumer_order_id == ConsumerOrder.id)
+                .filter(ConsumerOrder.consumer_id == consumer_id)
+                .all()
+            )
+            record_stock_movements(self.session, reversed_movements(CONSUMER_ORDER_ITEM, lines))
             self.session.delete(consumer)
             self.session.commit()
             return True
         except NoResultFound:
             raise NoResultFoundError("Consumer not found")
+
+
+class StockLevelDAO:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_stock_levels_by_product_ids(self, product_ids: List[int]) -> List[StockLevel]:
+        # Primary-key lookups only; products that never moved report zero on hand.
+        rows = self.session.execute(
+            select(Product.id, func.coalesce(StockLevel.quantity, 0), StockLevel.updated_at)
+            .outerjoin(StockLevel, StockLevel.product_id == Product.id)
+            .where(Product.id.in_(product_ids))
+        ).all()
+        return [
+            StockLevel(product_id=product_id, quantity=quantity, updated_at=updated_at)
+            for product_id, quantity, updated_at in rows
+        ]
+
+    def get_stock_level(self, product_id: int) -> StockLevel:
+        stock_levels = self.get_stock_levels_by_product_ids([product_id])
+        if not stock_levels:
+            raise NoResultFoundError("Product not found")
+        return stock_levels[0]
+
+    def get_stock_movements(self, product_id: int, limit: int = 100) -> List[StockMovement]:
+        return (
+            self.session.query(StockMovement)
+            .filter(StockMovement.product_id == product_id)
+            .order_by(StockMovement.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def rebuild_stock_levels(self) -> int:
+        """Recomputes the ledger and every stock level from the order lines; returns the product count."""
+        if self.session.get_bind().dialect.name == "postgresql":
+            # Line writers wait here instead of folding deltas into a half-built table.
+            self.session.execute(text("LOCK TABLE stock_levels, stock_movements IN EXCLUSIVE MODE"))
+        self.session.execute(delete(StockMovement))
+        self.session.execute(delete(StockLevel))
+
+        now = datetime.utcnow()
+        lines = union_all(
+            select(
+                SupplierOrderItem.product_id, SupplierOrderItem.quantity,
+                literal(SUPPLIER_ORDER_ITEM), SupplierOrderItem.id, literal(now),
+            ).where(SupplierOrderItem.product_id.isnot(None), SupplierOrderItem.quantity != 0),
+            select(
+                ConsumerOrderItem.product_id, -ConsumerOrderItem.quantity,
+                literal(CONSUMER_ORDER_ITEM), ConsumerOrderItem.id, literal(now),
+            ).where(ConsumerOrderItem.product_id.isnot(None), ConsumerOrderItem.quantity != 0),
+        )
+        self.session.execute(
+            insert(StockMovement.__table__).from_select(["product_id", "quantity", "source", "source_id", "created_at"], lines)
+        )
+        result = self.session.execute(
+            insert(StockLevel.__table__).from_select(
+                ["product_id", "quantity", "updated_at"],
+                select(StockMovement.product_id, func.sum(StockMovement.quantity), literal(now))
+                .group_by(StockMovement.product_id),
+            )
+        )
+        self.session.commit()
+        return result.rowcount
+
+
+class RecommendationDAO:
+    def __init__(self, session: Session, cache=None):
+        self.session = session
+        self.cache = recommendation_cache if cache is None else cache
+
+    def get_related_product_ids(self, product_id: int) -> List[Tuple[int, int]]:
+        # The whole precomputed top-K list is cached per product; callers slice it.
+        key = cache_key(ProductRecommendation, "product", product_id)
+        related = self.cache.get(key)
+        if related is MISSING:
+            related = [
+                (related_product_id, order_count)
+                for related_product_id, order_count in self.session.query(
+                    ProductRecommendation.related_product_id, ProductRecommendation.order_count
+                )
+                .filter(ProductRecommendation.product_id == product_id)
+                .order_by(ProductRecommendation.rank)
+                .all()
+            ]
+            self.cache.set(key, related)
+        return related
+
+    def get_frequently_bought_with(self, product_id: int, limit: int = 5) -> List[Tuple[Product, int]]:
+        related = self.get_related_product_ids(product_id)[:limit]
+        products = {product.id: product for product in ProductDAO(self.session).get_products_by_ids([pid for pid, _ in related])}
+        return [(products[pid], order_count) for pid, order_count in related if pid in products]
+
+
+# Lowest pg_trgm word similarity that still counts as a search hit; lower values
+# tolerate more typos at the cost of noisier results.
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get("SEARCH_SIMILARITY_THRESHOLD", 0.3))
+
+# A product whose description matches ranks below one whose name matches as well.
+DESCRIPTION_WEIGHT = 0.5
+
+
+class SearchDAO:
+    """Ranked, typo-tolerant search over consumer, supplier and product names.
+
+    On PostgreSQL a hit is a pg_trgm word-similarity match, answered from the GIN
+    trigram indexes, and the similarity is the relevance score. Other databases
+    fall back to a case-insensitive substring match. Pages are keyset-paginated on
+    (score, id), so the cursor is the last hit's ``[score, id]``.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def _postgres(self) -> bool:
+        return self.session.get_bind().dialect.name == "postgresql"
+
+    def _match(self, column, term: str):
+        # Returns the filter and the score of one searchable column.
+        if self._postgres():
+            # column %> term is term <% column, the indexable form of word_similarity.
+            return column.op("%>")(term), func.word_similarity(term, column)
+        lowered = func.lower(column)
+        return (
+            lowered.contains(term.lower(), autoescape=True),
+            case(
+                (lowered == term.lower(), 1.0),
+                (lowered.startswith(term.lower(), autoescape=True), 0.75),
+                (lowered.contains(term.lower(), autoescape=True), 0.5),
+                else_=0.0,
+            ),
+        )
+
+    def _search(self, model, condition, score, first: int, after: Optional[Sequence] = None) -> Tuple[list, bool]:
+        if self._postgres():
+            # Scoped to the transaction, so pooled connections keep the server default.
+            self.session.execute(select(func.set_config(
+                "pg_trgm.word_similarity_threshold", str(SEARCH_SIMILARITY_THRESHOLD), True
+            )))
+        query = self.session.query(model, score).filter(condition)
+        if after:
+            if len(after) != 2:
+                raise ValueError("Cursor does not match the requested ordering")
+            after_score, after_id = after
+            query = query.filter(or_(score < after_score, and_(score == after_score, model.id > after_id)))
+        rows = query.order_by(score.desc(), model.id).limit(first + 1).all()
+        return [(row, float(row_score)) for row, row_score in rows[:first]], len(rows) > first
+
+    def search_consumers(self, term: str, first: int, after: Optional[Sequence] = None) -> Tuple[List[Tuple[Consumer, float]], bool]:
+        if not term.strip():
+            return [], False
+        condition, score = self._match(Consumer.name, term)
+        return self._search(Consumer, condition, score, first, after)
+
+    def search_suppliers(self, term: str, first: int, after: Optional[Sequence] = None) -> Tuple[List[Tuple[Supplier, float]], bool]:
+        if not term.strip():
+            return [], False
+        condition, score = self._match(Supplier.name, term)
+        return self._search(Supplier, condition, score, first, after)
+
+    def search_products(self, term: str, first: int, after: Optional[Sequence] = None) -> Tuple[List[Tuple[Product, float]], bool]:
+        if not term.strip():
+            return [], False
+        name_condition, name_score = self._match(Product.name, term)
+        description_condition, description_score = self._match(Product.description, term)
+        # PostgreSQL's greatest() skips the NULL score of a product without a description.
+        greatest = func.greatest if self._postgres() else func.max
+        score = greatest(name_score, description_score * DESCRIPTION_WEIGHT)
+        return self._search(Product, or_(name_condition, description_condition), score, first, after)
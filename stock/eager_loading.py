@@ -0,0 +1,107 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from strawberry.types.nodes import FragmentSpread, InlineFragment, SelectedField
+from models import (
+    Supplier,
+    Product,
+    SupplierOrder,
+    SupplierOrderItem,
+    ConsumerOrder,
+    ConsumerOrderItem,
+    Consumer,
+)
+
+# GraphQL relationship fields of each type, by the model relationship they expose.
+RELATIONSHIP_FIELDS = {
+    Supplier: {"orders": Supplier.orders},
+    Product: {"category": Product.category},
+    SupplierOrder: {"supplier": SupplierOrder.supplier, "items": SupplierOrder.items},
+    SupplierOrderItem: {"product": SupplierOrderItem.product},
+    ConsumerOrder: {"consumer": ConsumerOrder.consumer, "items": ConsumerOrder.items},
+    ConsumerOrderItem: {"product": ConsumerOrderItem.product},
+    Consumer: {"orders": Consumer.orders},
+}
+
+# Where the entity sits below a connection field.
+CONNECTION_PATH = ("edges", "node")
+
+
+def _fields(selections: Iterable) -> Iterator[SelectedField]:
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        elif isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from _fields(selection.selections)
+
+
+def _column_keys(mapper, columns) -> set:
+    return {mapper.get_property_by_column(column).key for column in columns}
+
+
+def _attribute_name(field: SelectedField) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", field.name).lower()
+
+
+def _projection(model, selections: Iterable, keep: Sequence[str] = ()):
+    """``load_only`` for the selected columns, plus the keys relationships and cursors need."""
+    mapper = inspect(model)
+    names = {_attribute_name(field) for field in _fields(selections)}
+    names = (names | set(keep)) & set(mapper.column_attrs.keys())
+    names |= _column_keys(mapper, mapper.primary_key)
+    for field in _fields(selections):
+        attribute = RELATIONSHIP_FIELDS.get(model, {}).get(field.name)
+        if attribute is not None:
+            names |= _column_keys(mapper, attribute.property.local_columns)
+    return load_only(*(getattr(model, name) for name in sorted(names)))
+
+
+def _options(model, selections: Iterable) -> Iterator:
+    relationships = RELATIONSHIP_FIELDS.get(model, {})
+    for field in _fields(selections):
+        attribute = relationships.get(field.name)
+        if attribute is None:
+            continue
+        # One extra SELECT ... WHERE fk IN (...) per collection; many-to-one rows join in.
+        loader = selectinload(attribute) if attribute.property.uselist else joinedload(attribute)
+        related = attribute.property.mapper.class_
+        remote = _column_keys(attribute.property.mapper, attribute.property.remote_side)
+        yield loader.options(_projection(related, field.selections, remote), *_options(related, field.selections))
+
+
+def load_options(info, model, path: Sequence[str] = (), project: bool = False, keep: Sequence[str] = ()) -> List:
+    """Loader options for the relationship fields selected below the current field.
+
+    ``path`` leads from the field to the entity, e.g. ``CONNECTION_PATH``. Related
+    rows only load the columns the query selected; with ``project`` the entity's
+    own columns are narrowed too, keeping ``keep`` (e.g. cursor columns). Without
+    ``project`` the result is empty when nothing nested is selected, so by-id
+    lookups can keep their DataLoader and cache for flat queries.
+    """
+    selections = info.selected_fields[0].selections
+    for name in path:
+        selections = [selection for field in _fields(selections) if field.name == name for selection in field.selections]
+    options = list(_options(model, selections))
+    if project:
+        options.insert(0, _projection(model, selections, keep))
+    return options
+
+
+def selected_columns(info, model, keep: Sequence[str] = ()) -> Optional[Tuple[str, ...]]:
+    """Column keys a flat selection of ``model`` reads, primary key included.
+
+    None when the selection needs ORM instances: it reaches into a relationship
+    (see ``load_options``) or asks for a field that is not a column.
+    """
+    mapper = inspect(model)
+    relationships = RELATIONSHIP_FIELDS.get(model, {})
+    names = set(keep) | _column_keys(mapper, mapper.primary_key)
+    for field in _fields(info.selected_fields[0].selections):
+        if field.name.startswith("__"):
+            continue
+        name = _attribute_name(field)
+        if field.name in relationships or name not in mapper.column_attrs:
+            return None
+        names.add(name)
+    return tuple(sorted(names))
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Iterator, Optional
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+from dao import ConsumerOrderDAO
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _csv_chunks(result: Result) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for partition in result.partitions():
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(result: Result) -> Iterator[str]:
+    columns = list(result.keys())
+    for partition in result.partitions():
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in partition)
+
+
+def export_consumer_orders(session: Session, fmt: str, start: Optional[date] = None,
+                           end: Optional[date] = None) -> Iterator[str]:
+    # Emits one chunk per fetched batch so the HTTP response can be written while
+    # the cursor is still being read.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    try:
+        result = ConsumerOrderDAO(session).stream_consumer_order_lines(start, end)
+        chunks = _csv_chunks(result) if fmt == "csv" else _ndjson_chunks(result)
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+    finally:
+        session.close()
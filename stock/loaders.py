@@ -0,0 +1,138 @@
+from typing import Any, Callable, Dict, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from strawberry.dataloader import DataLoader
+from dao import (
+    NoResultFoundError,
+    SupplierDAO,
+    ProductDAO,
+    CategoryDAO,
+    SupplierOrderDAO,
+    SupplierOrderItemDAO,
+    ConsumerOrderDAO,
+    ConsumerOrderItemDAO,
+    ConsumerDAO,
+    StockLevelDAO,
+)
+
+
+# Put each row back in the position of the key that asked for it. Missing keys
+# get an error instead of a row so a single bad id only fails its own field.
+def order_by_keys(rows: List[Any], keys: List[int], not_found: str) -> List[Any]:
+    rows_by_id = {row.id: row for row in rows}
+    return [rows_by_id.get(key, NoResultFoundError(not_found)) for key in keys]
+
+
+# One list per parent key, empty when the parent has no children.
+def group_by_keys(rows: List[Any], keys: List[int], attribute: str) -> List[List[Any]]:
+    groups: Dict[int, List[Any]] = {key: [] for key in keys}
+    for row in rows:
+        groups[getattr(row, attribute)].append(row)
+    return [groups[key] for key in keys]
+
+
+class Loaders:
+    """One set of DataLoaders per GraphQL request.
+
+    Every ``load(id)`` made while the document executes is collected into a single
+    ``WHERE id IN (...)`` query per entity, and the results are memoized until the
+    request ends.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.supplier = DataLoader(load_fn=self.load_suppliers)
+        self.product = DataLoader(load_fn=self.load_products)
+        self.category = DataLoader(load_fn=self.load_categories)
+        self.supplier_order = DataLoader(load_fn=self.load_supplier_orders)
+        self.supplier_order_item = DataLoader(load_fn=self.load_supplier_order_items)
+        self.consumer_order = DataLoader(load_fn=self.load_consumer_orders)
+        self.consumer_order_item = DataLoader(load_fn=self.load_consumer_order_items)
+        self.consumer = DataLoader(load_fn=self.load_consumers)
+        self.supplier_by_product = DataLoader(load_fn=self.load_suppliers_by_product)
+        self.stock_level = DataLoader(load_fn=self.load_stock_levels)
+        self.supplier_orders_by_supplier = DataLoader(load_fn=self.load_supplier_orders_by_supplier)
+        self.supplier_order_items_by_order = DataLoader(load_fn=self.load_supplier_order_items_by_order)
+        self.consumer_orders_by_consumer = DataLoader(load_fn=self.load_consumer_orders_by_consumer)
+        self.consumer_order_items_by_order = DataLoader(load_fn=self.load_consumer_order_items_by_order)
+
+    async def fetch(self, dao_class: type, method: str, keys: List[int]) -> List[Any]:
+        return getattr(dao_class(self.session), method)(keys)
+
+    async def load_suppliers(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(SupplierDAO, "get_suppliers_by_ids", keys)
+        return order_by_keys(rows, keys, "Supplier not found")
+
+    async def load_products(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ProductDAO, "get_products_by_ids", keys)
+        return order_by_keys(rows, keys, "Product not found")
+
+    async def load_categories(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(CategoryDAO, "get_categories_by_ids", keys)
+        return order_by_keys(rows, keys, "Category not found")
+
+    async def load_supplier_orders(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(SupplierOrderDAO, "get_supplier_orders_by_ids", keys)
+        return order_by_keys(rows, keys, "SupplierOrder not found")
+
+    async def load_supplier_order_items(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(SupplierOrderItemDAO, "get_supplier_order_items_by_ids", keys)
+        return order_by_keys(rows, keys, "SupplierOrderItem not found")
+
+    async def load_consumer_orders(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ConsumerOrderDAO, "get_consumer_orders_by_ids", keys)
+        return order_by_keys(rows, keys, "ConsumerOrder not found")
+
+    async def load_consumer_order_items(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ConsumerOrderItemDAO, "get_consumer_order_items_by_ids", keys)
+        return order_by_keys(rows, keys, "ConsumerOrderItem not found")
+
+    async def load_consumers(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ConsumerDAO, "get_consumers_by_ids", keys)
+        return order_by_keys(rows, keys, "Consumer not found")
+
+    async def load_suppliers_by_product(self, keys: List[int]) -> List[Any]:
+        suppliers: Dict[int, Any] = {}
+        for product_id, supplier in await self.fetch(ProductDAO, "get_suppliers_by_product_ids", keys):
+            suppliers.setdefault(product_id, supplier)
+        return [suppliers.get(key) for key in keys]
+
+    async def load_stock_levels(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(StockLevelDAO, "get_stock_levels_by_product_ids", keys)
+        stock_levels = {row.product_id: row for row in rows}
+        return [stock_levels.get(key, NoResultFoundError("Product not found")) for key in keys]
+
+    async def load_supplier_orders_by_supplier(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(SupplierOrderDAO, "get_supplier_orders_by_supplier_ids", keys)
+        return group_by_keys(rows, keys, "supplier_id")
+
+    async def load_supplier_order_items_by_order(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(SupplierOrderItemDAO, "get_supplier_order_items_by_order_ids", keys)
+        return group_by_keys(rows, keys, "supplier_order_id")
+
+    async def load_consumer_orders_by_consumer(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ConsumerOrderDAO, "get_consumer_orders_by_consumer_ids", keys)
+        return group_by_keys(rows, keys, "consumer_id")
+
+    async def load_consumer_order_items_by_order(self, keys: List[int]) -> List[Any]:
+        rows = await self.fetch(ConsumerOrderItemDAO, "get_consumer_order_items_by_order_ids", keys)
+        return group_by_keys(rows, keys, "consumer_order_id")
+
+
+class AsyncLoaders(Loaders):
+    """Loaders for the asyncio entry point; each batch runs on its own AsyncSession."""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
+        super().__init__(None)
+        self.session_factory = session_factory
+
+    async def fetch(self, dao_class: type, method: str, keys: List[int]) -> List[Any]:
+        async with self.session_factory() as session:
+            return await session.run_sync(lambda sync_session: getattr(dao_class(sync_session), method)(keys))
+
+
+def get_loaders(context: Dict[str, Any], session: Session) -> Loaders:
+    loaders = context.get("loaders")
+    if loaders is None:
+        loaders = context["loaders"] = Loaders(session)
+    return loaders
@@ -0,0 +1,342 @@
+"""Open-loop load generator for the /graphql endpoint.
+
+Requests are scheduled at a fixed rate and handed to ``--concurrency`` client
+threads. Latency is measured from the scheduled send time, so when the server
+falls behind the time spent waiting for a free client counts too instead of
+silently lowering the offered load.
+
+Traffic is either replayed from a log recorded by the server (start it with
+GRAPHQL_RECORD_PATH set, see recording.py) or a synthetic mix of catalog and
+order reads with ``createConsumerOrderItem`` writes:
+
+    python loadtest.py --url http://127.0.0.1:5000/graphql --rps 200 --concurrency 16 --duration 60
+    python loadtest.py --replay recorded.ndjson --rps 100 --reads-only --output report.json
+
+Every ``--interval`` seconds it prints throughput, errors, latency percentiles
+and the server's connection pool usage (from ``getDbPoolStats``).
+"""
+import http.client
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import click
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+MUTATION = re.compile(r"^\s*mutation\b")
+
+POOL_STATS_QUERY = "query LoadTestPoolStats { getDbPoolStats { size checkedOut overflow maxOverflow } }"
+
+
+@dataclass
+class Request:
+    operation_name: Optional[str]
+    query: str
+    variables: Dict[str, Any] = field(default_factory=dict)
+
+    def body(self) -> bytes:
+        return json.dumps({"query": self.query, "variables": self.variables, "operationName": self.operation_name}).encode()
+
+
+class GraphQLClient:
+    """One keep-alive HTTP connection; each client thread owns its own."""
+
+    def __init__(self, url: str, timeout: float, headers: Dict[str, str]):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.path = parts.path or "/"
+        self.headers = {"Content-Type": "application/json", **headers}
+
+    def send(self, request: Request) -> Tuple[bool, Optional[dict]]:
+        try:
+            self.connection.request("POST", self.path, body=request.body(), headers=self.headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            # The server dropped the connection; the next request reconnects.
+            self.connection.close()
+            return False, None
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return False, None
+        return response.status == 200 and not data.get("errors"), data
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+@dataclass
+class Window:
+    """Counters for one reporting interval (or, merged, the whole run)."""
+
+    started: float
+    ok: int = 0
+    errors: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+    histogram: List[int] = field(default_factory=lambda: [0] * len(HISTOGRAM_BOUNDS_MS))
+    backlog: int = 0
+    pool: Optional[Dict[str, int]] = None
+
+    def add(self, latency_ms: float, ok: bool) -> None:
+        if ok:
+            self.ok += 1
+        else:
+            self.errors += 1
+        self.latencies_ms.append(latency_ms)
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if latency_ms <= bound:
+                self.histogram[index] += 1
+                break
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        total = self.ok + self.errors
+        pool = self.pool or {}
+        capacity = pool.get("size", 0) + pool.get("maxOverflow", 0)
+        return {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "backlog": self.backlog,
+            "pool_checked_out": pool.get("checkedOut"),
+            "pool_saturation": round(pool["checkedOut"] / capacity, 3) if capacity and "checkedOut" in pool else None,
+        }
+
+
+class Recorder:
+    """Collects results from the client threads into per-interval windows."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.windows: List[Window] = [Window(started=self.started)]
+        self.total = Window(started=self.started)
+        self._lock = threading.Lock()
+
+    def add(self, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            self.windows[-1].add(latency_ms, ok)
+            self.total.add(latency_ms, ok)
+
+    def rotate(self, backlog: int, pool: Optional[Dict[str, int]]) -> Tuple[Window, float]:
+        with self._lock:
+            window = self.windows[-1]
+            window.backlog = backlog
+            window.pool = pool
+            now = time.monotonic()
+            self.windows.append(Window(started=now))
+            return window, now - window.started
+
+
+def load_replay(path: str, reads_only: bool) -> List[Request]:
+    requests = []
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if reads_only and MUTATION.match(entry["query"]):
+                continue
+            requests.append(Request(entry.get("operationName"), entry["query"], entry.get("variables") or {}))
+    if not requests:
+        raise click.ClickException(f"No replayable operations in {path}")
+    return requests
+
+
+# Synthetic traffic: read operations weighted roughly like a POS front end.
+SYNTHETIC_READS = (
+    (30, "LoadProduct", "query LoadProduct($productId: Int!) { getProductById(productId: $productId) { id name } }"),
+    (20, "LoadStockLevel", "query LoadStockLevel($productId: Int!) { stockLevel(productId: $productId) { productId quantity } }"),
+    (15, "LoadSuggest", "query LoadSuggest($prefix: String!) { suggest(prefix: $prefix) { kind id name } }"),
+    (10, "LoadSearchProducts", "query LoadSearchProducts($query: String!) { searchProducts(query: $query, first: 10) { edges { node { score product { id name } } } } }"),
+    (10, "LoadConsumerOrder", "query LoadConsumerOrder($consumerOrderId: Int!) { getConsumerOrderById(consumerOrderId: $consumerOrderId) { id totalAmount } }"),
+    (10, "LoadBoughtWith", "query LoadBoughtWith($productId: Int!) { frequentlyBoughtWith(productId: $productId) { orderCount product { id name } } }"),
+    (5, "LoadProductsPage", "query LoadProductsPage { getAllProductsConnection(first: 20) { edges { cursor node { id name } } } }"),
+)
+
+CREATE_ORDER_ITEM = (
+    "mutation LoadCreateConsumerOrderItem($consumerOrderId: Int!, $productId: Int!, $itemName: String!, "
+    "$quantity: Int!, $unitPrice: Float!) { createConsumerOrderItem(consumerOrderId: $consumerOrderId, "
+    "productId: $productId, itemName: $itemName, quantity: $quantity, unitPrice: $unitPrice) { id totalPrice } }"
+)
+
+SAMPLE_QUERY = (
+    "query LoadTestSample { getAllProductsConnection(first: 500) { edges { node { id name } } } "
+    "getAllConsumerOrdersConnection(first: 500) { edges { node { id } } } }"
+)
+
+
+def synthetic_requests(client: GraphQLClient, write_ratio: float, seed: int) -> Iterator[Request]:
+    ok, data = client.send(Request("LoadTestSample", SAMPLE_QUERY))
+    if not ok:
+        raise click.ClickException(f"Could not sample ids from the server: {data}")
+    products = [(edge["node"]["id"], edge["node"]["name"]) for edge in data["data"]["getAllProductsConnection"]["edges"]]
+    orders = [edge["node"]["id"] for edge in data["data"]["getAllConsumerOrdersConnection"]["edges"]]
+    if not products or not orders:
+        raise click.ClickException("The server has no products or consumer orders to load test against")
+
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in SYNTHETIC_READS]
+    while True:
+        product_id, name = rng.choice(products)
+        if rng.random() < write_ratio:
+            yield Request("LoadCreateConsumerOrderItem", CREATE_ORDER_ITEM, {
+                "consumerOrderId": rng.choice(orders), "productId": product_id, "itemName": name,
+                "quantity": rng.randint(1, 3), "unitPrice": 1.0,
+            })
+            continue
+        _, operation_name, query = rng.choices(SYNTHETIC_READS, weights)[0]
+        variables = {
+            "productId": product_id,
+            "prefix": name[:3],
+            "query": name.split()[0],
+            "consumerOrderId": rng.choice(orders),
+        }
+        # Only pass the variables the operation declares.
+        yield Request(operation_name, query, {key: value for key, value in variables.items() if f"${key}:" in query})
+
+
+def cycle(requests: List[Request]) -> Iterator[Request]:
+    while True:
+        yield from requests
+
+
+def run_load(url: str, source: Iterator[Request], rps: float, concurrency: int, duration: float, interval: float,
+             timeout: float, headers: Dict[str, str], report=click.echo) -> Dict[str, Any]:
+    schedule: "queue.Queue[Optional[Tuple[float, Request]]]" = queue.Queue()
+    recorder = Recorder(interval)
+    stop = threading.Event()
+
+    def client_loop() -> None:
+        client = GraphQLClient(url, timeout, headers)
+        while True:
+            item = schedule.get()
+            if item is None:
+                return
+            scheduled_at, request = item
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            ok, _ = client.send(request)
+            recorder.add((time.monotonic() - scheduled_at) * 1000, ok)
+
+    def reporter_loop() -> None:
+        pool_client = GraphQLClient(url, timeout, headers)
+        while not stop.wait(interval):
+            ok, data = pool_client.send(Request("LoadTestPoolStats", POOL_STATS_QUERY))
+            pool = data["data"]["getDbPoolStats"] if ok else None
+            window, elapsed = recorder.rotate(schedule.qsize(), pool)
+            summary = window.summary(elapsed)
+            report(
+                f"t={window.started - recorder.started:6.1f}s rps={summary['throughput_rps']:7.1f} "
+                f"err={summary['error_rate']:.2%} p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms "
+                f"p99={summary['p99_ms']:.1f}ms backlog={summary['backlog']} "
+                f"pool={summary['pool_checked_out'] if pool else '?'}/{pool['size'] + pool['maxOverflow'] if pool else '?'}"
+            )
+
+    threads = [threading.Thread(target=client_loop, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    reporter = threading.Thread(target=reporter_loop, daemon=True)
+    reporter.start()
+
+    # Open loop: the schedule does not wait for responses.
+    started = time.monotonic()
+    sent = 0
+    while True:
+        scheduled_at = started + sent / rps
+        if scheduled_at - started >= duration:
+            break
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        schedule.put((scheduled_at, next(source)))
+        sent += 1
+    for _ in threads:
+        schedule.put(None)
+    for thread in threads:
+        thread.join()
+    stop.set()
+    reporter.join()
+    recorder.rotate(0, None)
+
+    elapsed = time.monotonic() - started
+    return {
+        "config": {"url": url, "target_rps": rps, "concurrency": concurrency, "duration": duration},
+        "summary": recorder.total.summary(elapsed),
+        "histogram_ms": {
+            ("inf" if bound == float("inf") else str(bound)): count
+            for bound, count in zip(HISTOGRAM_BOUNDS_MS, recorder.total.histogram)
+        },
+        "intervals": [
+            dict(window.summary(interval), t=round(window.started - recorder.started, 1))
+            for window in recorder.windows[:-1]
+        ],
+    }
+
+
+def print_histogram(histogram: Dict[str, int], report=click.echo) -> None:
+    total = sum(histogram.values()) or 1
+    for bound, count in histogram.items():
+        bar = "#" * round(50 * count / total)
+        report(f"<= {bound:>6} ms {count:>8} {bar}")
+
+
+@click.command()
+@click.option("--url", default="http://127.0.0.1:5000/graphql", show_default=True, help="GraphQL endpoint.")
+@click.option("--replay", "replay_path", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Operation log recorded with GRAPHQL_RECORD_PATH; synthetic traffic when omitted.")
+@click.option("--reads-only", is_flag=True, help="Skip mutations when replaying.")
+@click.option("--write-ratio", type=float, default=0.1, show_default=True,
+              help="Share of synthetic requests that create a consumer order item.")
+@click.option("--rps", type=float, default=50, show_default=True, help="Target requests per second.")
+@click.option("--concurrency", type=int, default=10, show_default=True, help="Concurrent client connections.")
+@click.option("--duration", type=float, default=30, show_default=True, help="Seconds to run.")
+@click.option("--interval", type=float, default=1, show_default=True, help="Seconds between progress reports.")
+@click.option("--timeout", type=float, default=30, show_default=True, help="Per-request timeout in seconds.")
+@click.option("--client-id", default="loadtest", show_default=True, help="Sent as X-Client-Id for query budgets and the admin-only getDbPoolStats.")
+@click.option("--seed", type=int, default=42, show_default=True, help="Random seed for synthetic traffic.")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the JSON report here.")
+def main(url, replay_path, reads_only, write_ratio, rps, concurrency, duration, interval, timeout, client_id, seed, output):
+    headers = {"X-Client-Id": client_id}
+    if replay_path:
+        source = cycle(load_replay(replay_path, reads_only))
+    else:
+        source = synthetic_requests(GraphQLClient(url, timeout, headers), write_ratio, seed)
+    results = run_load(url, source, rps, concurrency, duration, interval, timeout, headers)
+
+    summary = results["summary"]
+    click.echo(
+        f"requests={summary['requests']} throughput={summary['throughput_rps']}/s "
+        f"errors={summary['error_rate']:.2%} p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+        f"p99={summary['p99_ms']}ms max={summary['max_ms']}ms"
+    )
+    print_histogram(results["histogram_ms"])
+    if output:
+        with open(output, "w", encoding="utf-8") as stream:
+            json.dump(results, stream, indent=2)
+    if summary["requests"] and summary["throughput_rps"] < 0.9 * rps:
+        click.echo(f"the server sustained {summary['throughput_rps']}/s of the {rps}/s offered", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
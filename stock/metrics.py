@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from inspect import isawaitable
+from typing import Callable, Dict, Iterator, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from strawberry.extensions import SchemaExtension
+from strawberry.extensions.tracing.utils import should_skip_tracing
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; resolvers and statements both land between a fraction of a millisecond and a few seconds.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label sets per metric and thread beyond this are folded into OVERFLOW_LABEL, so
+# clients sending arbitrary operation names cannot grow the series without bound.
+MAX_SERIES = int(os.environ.get("METRICS_MAX_SERIES", 1000))
+OVERFLOW_LABEL = "other"
+
+# The GraphQL field whose resolver is running, used to attribute SQL statements.
+current_resolver: ContextVar[str] = ContextVar("current_resolver", default=OVERFLOW_LABEL)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A counter or histogram whose values are kept per thread.
+
+    Each thread writes only to its own dict, so recording takes no lock. The
+    registry lock is taken when a thread records for the first time, when it
+    exits (its values are folded into ``_retired``) and when metrics are collected.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: Dict[int, dict] = {}
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards[id(values)] = values
+            weakref.finalize(threading.current_thread(), self._retire, values)
+            return values
+
+    def _key(self, shard: dict, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if labels in shard or len(shard) < MAX_SERIES:
+            return labels
+        return (OVERFLOW_LABEL,) * len(labels)
+
+    def _retire(self, values: dict) -> None:
+        with self._lock:
+            self._shards.pop(id(values), None)
+            self._merge(self._retired, values)
+
+    def _merge(self, into: dict, values: dict) -> None:
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        with self._lock:
+            merged: dict = {}
+            self._merge(merged, self._retired)
+            for values in list(self._shards.values()):
+                self._merge(merged, values)
+        return merged
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        shard = self._shard()
+        key = self._key(shard, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def _merge(self, into: dict, values: dict) -> None:
+        for key, value in list(values.items()):
+            into[key] = into.get(key, 0) + value
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}_total{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        key = self._key(shard, labels)
+        # One slot per bucket plus +Inf (not cumulative), then the sum.
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, into: dict, values: dict) -> None:
+        for key, counts in list(values.items()):
+            merged = into.setdefault(key, [0] * len(counts))
+            for index, count in enumerate(list(counts)):
+                merged[index] += count
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for labels, counts in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {counts[-1]}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class Gauge:
+    """Read from a callback at scrape time, so nothing is recorded on the hot path."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._callbacks: List[Tuple[Tuple[str, ...], Callable[[], float]]] = []
+
+    def register(self, callback: Callable[[], float], *labels: str) -> None:
+        self._callbacks.append((labels, callback))
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, callback in self._callbacks:
+            yield f"{self.name}{_labels(self.label_names, labels)} {callback()}"
+
+
+operation_duration = Histogram(
+    "graphql_operation_duration_seconds", "Time to execute a GraphQL operation.", ("operation_type", "operation_name")
+)
+operation_errors = Counter(
+    "graphql_operation_errors", "GraphQL operations that returned errors.", ("operation_type", "operation_name")
+)
+field_duration = Histogram("graphql_field_duration_seconds", "Time spent in a field resolver.", ("field",))
+statement_duration = Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by the resolver that issued it.", ("engine", "resolver")
+)
+checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection, including connecting.", ("engine",)
+)
+pool_gauges = {
+    key: Gauge(f"db_pool_{key}", documentation, ("engine",))
+    for key, documentation in (
+        ("size", "Configured number of pooled connections."),
+        ("checked_out", "Connections in use."),
+        ("checked_in", "Idle pooled connections."),
+        ("overflow", "Connections open beyond the pool size."),
+        ("max_overflow", "Connections allowed beyond the pool size."),
+    )
+}
+
+METRICS = [operation_duration, operation_errors, field_duration, statement_duration, checkout_wait, *pool_gauges.values()]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+class TimedCheckout:
+    """Pool mixin recording how long each checkout waited for a connection."""
+
+    metrics_engine = OVERFLOW_LABEL
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait.observe(time.perf_counter() - started, self.metrics_engine)
+
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str, pool_stats: Callable[[object], dict]) -> None:
+    """Time every statement on ``engine`` and publish its pool counters under ``engine="<name>"``."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        statement_duration.observe(time.perf_counter() - started, name, current_resolver.get())
+
+    def handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute.
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+    if isinstance(engine.pool, TimedCheckout):
+        engine.pool.metrics_engine = name
+    for key, gauge in pool_gauges.items():
+        # Read engine.pool on every scrape; dispose() replaces the pool object.
+        # SQLAlchemy reports overflow as negative until the pool has filled.
+        gauge.register(lambda key=key: max(0, pool_stats(engine.pool)[key]), name)
+
+
+class GraphQLMetrics(SchemaExtension):
+    """Records operation latency and the latency of every field with its own resolver."""
+
+    def on_operation(self) -> Iterator[None]:
+        started = time.perf_counter()
+        yield
+        execution_context = self.execution_context
+        try:
+            operation_type = execution_context.operation_type.value
+        except Exception:
+            # The document did not parse, so there is no operation.
+            operation_type = "invalid"
+        labels = (operation_type, execution_context.operation_name or "anonymous")
+        operation_duration.observe(time.perf_counter() - started, *labels)
+        result = execution_context.result
+        if execution_context.pre_execution_errors or (result is not None and result.errors):
+            operation_errors.inc(*labels)
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        if should_skip_tracing(_next, info):
+            return _next(root, info, *args, **kwargs)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        token = current_resolver.set(field)
+        started = time.perf_counter()
+        try:
+            result = _next(root, info, *args, **kwargs)
+        except Exception:
+            field_duration.observe(time.perf_counter() - started, field)
+            raise
+        finally:
+            current_resolver.reset(token)
+        if isawaitable(result):
+            return self._timed(result, field, started)
+        field_duration.observe(time.perf_counter() - started, field)
+        return result
+
+    async def _timed(self, result, field: str, started: float):
+        token = current_resolver.set(field)
+        try:
+            return await result
+        finally:
+            current_resolver.reset(token)
+            field_duration.observe(time.perf_counter() - started, field)
+
+
+metrics_extensions = [GraphQLMetrics] if METRICS_ENABLED else []
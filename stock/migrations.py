@@ -0,0 +1,286 @@
+"""Versioned schema migrations applied in place.
+
+Each migration runs once and is recorded in ``schema_migrations``. Operations are
+written to be idempotent (``IF NOT EXISTS``) so a migration that was interrupted
+half way can simply be run again, and so they are no-ops on a database created
+from the current models by ``init-db``.
+
+Migrations marked ``transactional=False`` run on an autocommit connection, which
+``CREATE INDEX CONCURRENTLY`` requires; on PostgreSQL those index builds do not
+block writes to the table.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Union
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Arbitrary key for pg_advisory_lock so two deploys cannot migrate at once.
+MIGRATION_LOCK_ID = 72034511
+
+
+def is_postgres(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+@dataclass
+class CreateIndex:
+    name: str
+    table: str
+    expressions: Sequence[str]
+    using: Optional[str] = None
+    where: Optional[str] = None
+    postgres_only: bool = False
+
+    def apply(self, connection: Connection) -> None:
+        postgres = is_postgres(connection)
+        if self.postgres_only and not postgres:
+            return
+        concurrently = ""
+        using = ""
+        if postgres:
+            concurrently = "CONCURRENTLY " if _autocommit(connection) else ""
+            # A concurrent build that failed leaves an INVALID index behind, which
+            # IF NOT EXISTS would otherwise keep forever.
+            invalid = connection.exec_driver_sql(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = %(name)s AND NOT i.indisvalid",
+                {"name": self.name},
+            ).first()
+            if invalid:
+                connection.exec_driver_sql(f"DROP INDEX {concurrently}IF EXISTS {self.name}")
+            if self.using:
+                using = f" USING {self.using}"
+        where = f" WHERE {self.where}" if self.where else ""
+        connection.exec_driver_sql(
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {self.name} "
+            f"ON {self.table}{using} ({', '.join(self.expressions)}){where}"
+        )
+
+
+@dataclass
+class Sql:
+    statement: str
+    dialect: Optional[str] = None
+
+    def apply(self, connection: Connection) -> None:
+        if self.dialect is None or self.dialect == connection.dialect.name:
+            connection.exec_driver_sql(self.statement)
+
+
+@dataclass
+class AddColumn:
+    table: str
+    column: str
+    definition: str
+
+    def apply(self, connection: Connection) -> None:
+        # Checked first because SQLite has no ADD COLUMN IF NOT EXISTS.
+        if self.column not in {column["name"] for column in inspect(connection).get_columns(self.table)}:
+            connection.exec_driver_sql(f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}")
+
+
+@dataclass
+class DropColumn:
+    table: str
+    column: str
+
+    def apply(self, connection: Connection) -> None:
+        if self.column in {column["name"] for column in inspect(connection).get_columns(self.table)}:
+            connection.exec_driver_sql(f"ALTER TABLE {self.table} DROP COLUMN {self.column}")
+
+
+@dataclass
+class CreateModelTables:
+    """Creates the model tables that do not exist yet (the pre-migration schema)."""
+
+    def apply(self, connection: Connection) -> None:
+        from models import Base
+        Base.metadata.create_all(bind=connection, checkfirst=True)
+
+
+def rebuild_stock_levels(connection: Connection) -> None:
+    from sqlalchemy.orm import Session
+    from dao import StockLevelDAO
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+        StockLevelDAO(session).rebuild_stock_levels()
+
+
+def recount_recommendations(connection: Connection) -> None:
+    from sqlalchemy.orm import Session
+    from recommendations import refresh_recommendations
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+        refresh_recommendations(session, full=True)
+
+
+Operation = Union[CreateIndex, Sql, AddColumn, DropColumn, CreateModelTables, Callable[[Connection], None]]
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    operations: List[Operation] = field(default_factory=list)
+    transactional: bool = True
+
+
+def _autocommit(connection: Connection) -> bool:
+    return connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+
+
+def _run(operation: Operation, connection: Connection) -> None:
+    if hasattr(operation, "apply"):
+        operation.apply(connection)
+    else:
+        operation(connection)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", [CreateModelTables()]),
+    Migration(
+        2,
+        "foreign key, lower(name) and (fk, order_date) indexes",
+        [
+            CreateIndex("ix_products_category_id", "products", ["category_id"]),
+            CreateIndex("ix_categories_product_id", "categories", ["product_id"]),
+            CreateIndex("ix_supplier_orders_supplier_id_order_date", "supplier_orders", ["supplier_id", "order_date"]),
+            CreateIndex("ix_consumer_orders_consumer_id_order_date", "consumer_orders", ["consumer_id", "order_date"]),
+            CreateIndex("ix_supplier_order_items_supplier_order_id", "supplier_order_items", ["supplier_order_id"]),
+            CreateIndex("ix_supplier_order_items_product_id", "supplier_order_items", ["product_id"]),
+            CreateIndex("ix_consumer_order_items_consumer_order_id", "consumer_order_items", ["consumer_order_id"]),
+            CreateIndex("ix_consumer_order_items_product_id", "consumer_order_items", ["product_id"]),
+            CreateIndex("ix_products_lower_name", "products", ["lower(name)"]),
+            CreateIndex("ix_suppliers_lower_name", "suppliers", ["lower(name)"]),
+            CreateIndex("ix_consumers_lower_name", "consumers", ["lower(name)"]),
+            CreateIndex("ix_categories_lower_category_name", "categories", ["lower(category_name)"]),
+        ],
+        transactional=False,
+    ),
+    Migration(3, "stock levels and stock movement ledger", [CreateModelTables(), rebuild_stock_levels]),
+    Migration(4, "frequently bought together tables", [CreateModelTables()]),
+    Migration(
+        5,
+        "(order_date, id) indexes for date-range order queries",
+        [
+            CreateIndex("ix_supplier_orders_order_date_id", "supplier_orders", ["order_date", "id"]),
+            CreateIndex("ix_consumer_orders_order_date_id", "consumer_orders", ["order_date", "id"]),
+        ],
+        transactional=False,
+    ),
+    Migration(
+        6,
+        "copy of order_date on order lines",
+        [
+            AddColumn("supplier_order_items", "order_date", "DATE"),
+            AddColumn("consumer_order_items", "order_date", "DATE"),
+            Sql(
+                "UPDATE supplier_order_items SET order_date = "
+                "(SELECT o.order_date FROM supplier_orders o WHERE o.id = supplier_order_items.supplier_order_id) "
+                "WHERE order_date IS NULL AND supplier_order_id IS NOT NULL"
+            ),
+            Sql(
+                "UPDATE consumer_order_items SET order_date = "
+                "(SELECT o.order_date FROM consumer_orders o WHERE o.id = consumer_order_items.consumer_order_id) "
+                "WHERE order_date IS NULL AND consumer_order_id IS NOT NULL"
+            ),
+        ],
+    ),
+    Migration(
+        7,
+        "pg_trgm trigram indexes for name search",
+        [
+            Sql("CREATE EXTENSION IF NOT EXISTS pg_trgm", dialect="postgresql"),
+            CreateIndex("ix_consumers_name_trgm", "consumers", ["name gin_trgm_ops"], using="gin", postgres_only=True),
+            CreateIndex("ix_suppliers_name_trgm", "suppliers", ["name gin_trgm_ops"], using="gin", postgres_only=True),
+            CreateIndex("ix_products_name_trgm", "products", ["name gin_trgm_ops"], using="gin", postgres_only=True),
+            CreateIndex(
+                "ix_products_description_trgm", "products", ["description gin_trgm_ops"], using="gin", postgres_only=True,
+            ),
+        ],
+        transactional=False,
+    ),
+    Migration(
+        8,
+        "track recommendation refreshes by order line",
+        [AddColumn("recommendation_state", "last_consumer_order_item_id", "INTEGER NOT NULL DEFAULT 0")],
+    ),
+    Migration(
+        9,
+        "drop the per-order recommendation watermark, schedule full recounts",
+        [
+            DropColumn("recommendation_state", "last_consumer_order_id"),
+            AddColumn("recommendation_state", "full_refreshed_at", "TIMESTAMP"),
+            # Counts made per order cannot be mapped to a line id exactly, so recount once.
+            # Runs last: the refresh reads the state row through the current model.
+            recount_recommendations,
+        ],
+    ),
+]
+
+
+def applied_versions(connection: Connection) -> List[int]:
+    migration_metadata.create_all(bind=connection, checkfirst=True)
+    return list(connection.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+
+def _record(connection: Connection, migration: Migration) -> None:
+    connection.execute(schema_migrations.insert().values(
+        version=migration.version, description=migration.description, applied_at=datetime.utcnow(),
+    ))
+
+
+def migrate(engine: Engine, target: Optional[int] = None,
+            migrations: Sequence[Migration] = MIGRATIONS) -> List[Migration]:
+    """Applies pending migrations up to ``target`` (all by default) and returns them."""
+    applied: List[Migration] = []
+    with engine.connect() as lock_connection:
+        if is_postgres(lock_connection):
+            lock_connection.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+            lock_connection.commit()
+        try:
+            with engine.begin() as connection:
+                done = set(applied_versions(connection))
+            for migration in sorted(migrations, key=lambda m: m.version):
+                if migration.version in done or (target is not None and migration.version > target):
+                    continue
+                if migration.transactional:
+                    with engine.begin() as connection:
+                        for operation in migration.operations:
+                            _run(operation, connection)
+                        _record(connection, migration)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                        for operation in migration.operations:
+                            _run(operation, connection)
+                        _record(connection, migration)
+                applied.append(migration)
+        finally:
+            if is_postgres(lock_connection):
+                lock_connection.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+                lock_connection.commit()
+    return applied
+
+
+def stamp(engine: Engine, migrations: Sequence[Migration] = MIGRATIONS) -> None:
+    """Marks every migration as applied, for a database just built from the models."""
+    with engine.begin() as connection:
+        done = set(applied_versions(connection))
+        for migration in migrations:
+            if migration.version not in done:
+                _record(connection, migration)
+
+
+def pending(engine: Engine, migrations: Sequence[Migration] = MIGRATIONS) -> List[Migration]:
+    with engine.begin() as connection:
+        done = set(applied_versions(connection))
+    return [migration for migration in sorted(migrations, key=lambda m: m.version) if migration.version not in done]
@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import date
+from typing import Any, Generic, List, Optional, Sequence, TypeVar
+import strawberry
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+T = TypeVar("T")
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    start_cursor: Optional[str]
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+
+def page_size(first: int) -> int:
+    if first <= 0:
+        raise ValueError("first must be a positive number")
+    return min(first, MAX_PAGE_SIZE)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    values = [value.isoformat() if isinstance(value, date) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    # Cursors are the JSON list encode_cursor wrote; anything else would reach the SQL comparison.
+    if not isinstance(values, list) or not all(
+        isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def build_connection(nodes: List[T], has_next_page: bool, cursor_fields: Sequence[str] = ("id",),
+                     keys: Optional[Sequence[Sequence[Any]]] = None) -> Connection[T]:
+    # ``keys`` gives the cursor values directly, for orderings on values the node does not expose.
+    if keys is None:
+        keys = [[getattr(node, field) for field in cursor_fields] for node in nodes]
+    edges = [Edge(cursor=encode_cursor(key), node=node) for node, key in zip(nodes, keys)]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
@@ -0,0 +1,208 @@
+"""Opt-in monthly range partitioning of the order and order-line tables.
+
+``partition-orders`` rebuilds supplier_orders, supplier_order_items, consumer_orders
+and consumer_order_items as ``PARTITION BY RANGE (order_date)`` tables with one
+partition per month plus a DEFAULT partition, and copies the existing rows across.
+It holds ACCESS EXCLUSIVE locks on those tables while it runs, so schedule it in a
+maintenance window. Afterwards:
+
+* ``ensure-partitions`` creates the coming months ahead of time (``migrate-db``
+  runs it too; schedule it monthly),
+* ``detach-partitions --before`` retires whole months with a metadata-only
+  ``DETACH PARTITION`` instead of a bulk DELETE.
+
+Lines reference their order through (order id, order_date) with ON UPDATE CASCADE.
+That needs PostgreSQL 15: older versions run a cross-partition update of an order
+as a delete plus insert, which would cascade-delete its lines.
+"""
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+from sqlalchemy.engine import Connection, Engine
+from migrations import MIGRATIONS, CreateIndex, is_postgres
+
+MONTHS_AHEAD = int(os.environ.get("ORDER_PARTITION_MONTHS_AHEAD", 3))
+
+
+@dataclass
+class OrderTables:
+    orders: str
+    owner_column: str
+    owner_table: str
+    lines: str
+    order_column: str
+
+
+ORDER_TABLES = (
+    OrderTables("supplier_orders", "supplier_id", "suppliers", "supplier_order_items", "supplier_order_id"),
+    OrderTables("consumer_orders", "consumer_id", "consumers", "consumer_order_items", "consumer_order_id"),
+)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %(table)s",
+        {"table": table},
+    ).first() is not None
+
+
+def table_exists(connection: Connection, name: str) -> bool:
+    return connection.exec_driver_sql("SELECT to_regclass(%(name)s)", {"name": name}).scalar() is not None
+
+
+def partitions(connection: Connection, table: str) -> List[str]:
+    return list(connection.exec_driver_sql(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %(table)s ORDER BY c.relname",
+        {"table": table},
+    ).scalars())
+
+
+def create_partition(connection: Connection, table: str, month: date) -> str:
+    name = partition_name(table, month)
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+    return name
+
+
+def _swap_in_partitioned_table(connection: Connection, table: str) -> None:
+    # The new parent takes over the column defaults, including the id sequence.
+    connection.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    connection.exec_driver_sql(
+        f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (order_date)"
+    )
+    sequence = connection.exec_driver_sql(
+        "SELECT pg_get_serial_sequence(%(table)s, 'id')", {"table": f"{table}_unpartitioned"}
+    ).scalar()
+    if sequence:
+        connection.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+
+def _partition(connection: Connection, tables: OrderTables, months_ahead: int) -> List[str]:
+    connection.exec_driver_sql(f"LOCK TABLE {tables.orders}, {tables.lines} IN ACCESS EXCLUSIVE MODE")
+    undated = connection.exec_driver_sql(
+        f"SELECT (SELECT count(*) FROM {tables.orders} WHERE order_date IS NULL)"
+        f" + (SELECT count(*) FROM {tables.lines} WHERE order_date IS NULL)"
+    ).scalar()
+    if undated:
+        raise RuntimeError(f"{undated} rows of {tables.orders}/{tables.lines} have no order_date; set one before partitioning")
+    first, last = connection.exec_driver_sql(f"SELECT min(order_date), max(order_date) FROM {tables.orders}").first()
+
+    created = []
+    first_month = month_start(first or date.today())
+    last_month = add_months(month_start(max(last or date.today(), date.today())), months_ahead)
+    for table in (tables.orders, tables.lines):
+        _swap_in_partitioned_table(connection, table)
+        month = first_month
+        while month <= last_month:
+            created.append(create_partition(connection, table, month))
+            month = add_months(month, 1)
+        connection.exec_driver_sql(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        created.append(f"{table}_default")
+        connection.exec_driver_sql(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    connection.exec_driver_sql(f"DROP TABLE {tables.lines}_unpartitioned")
+    connection.exec_driver_sql(f"DROP TABLE {tables.orders}_unpartitioned")
+
+    # Unique constraints on a partitioned table must include the partition key.
+    for table in (tables.orders, tables.lines):
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD PRIMARY KEY (id, order_date)")
+    connection.exec_driver_sql(
+        f"ALTER TABLE {tables.orders} ADD FOREIGN KEY ({tables.owner_column}) REFERENCES {tables.owner_table} (id)"
+    )
+    connection.exec_driver_sql(f"ALTER TABLE {tables.lines} ADD FOREIGN KEY (product_id) REFERENCES products (id)")
+    connection.exec_driver_sql(
+        f"ALTER TABLE {tables.lines} ADD CONSTRAINT {tables.lines}_order_fkey "
+        f"FOREIGN KEY ({tables.order_column}, order_date) REFERENCES {tables.orders} (id, order_date) "
+        f"ON UPDATE CASCADE ON DELETE CASCADE"
+    )
+    # Same indexes as the migrations; a partitioned parent cannot build them CONCURRENTLY.
+    for migration in MIGRATIONS:
+        for operation in migration.operations:
+            if isinstance(operation, CreateIndex) and operation.table in (tables.orders, tables.lines):
+                operation.apply(connection)
+    return created
+
+
+def partition_order_tables(engine: Engine, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Converts the order tables that are not partitioned yet; returns the partitions created."""
+    created: List[str] = []
+    with engine.begin() as connection:
+        if not is_postgres(connection):
+            raise RuntimeError("Partitioning the order tables needs PostgreSQL")
+        if connection.dialect.server_version_info < (15,):
+            raise RuntimeError("Partitioning the order tables needs PostgreSQL 15 or newer")
+        for tables in ORDER_TABLES:
+            if not is_partitioned(connection, tables.orders):
+                created.extend(_partition(connection, tables, months_ahead))
+    return created
+
+
+def ensure_partitions(engine: Engine, months_ahead: int = MONTHS_AHEAD, today: Optional[date] = None) -> List[str]:
+    """Creates partitions from this month to ``months_ahead`` months out; returns the new ones."""
+    created: List[str] = []
+    this_month = month_start(today or date.today())
+    with engine.begin() as connection:
+        if not is_postgres(connection):
+            return created
+        for tables in ORDER_TABLES:
+            for table in (tables.orders, tables.lines):
+                if not is_partitioned(connection, table):
+                    continue
+                for offset in range(months_ahead + 1):
+                    month = add_months(this_month, offset)
+                    if not table_exists(connection, partition_name(table, month)):
+                        created.append(create_partition(connection, table, month))
+    return created
+
+
+def detach_partitions(engine: Engine, before: date, drop: bool = False) -> List[str]:
+    """Detaches (and optionally drops) every monthly partition that ends on or before ``before``."""
+    detached: List[str] = []
+    with engine.begin() as connection:
+        if not is_postgres(connection):
+            return detached
+        for tables in ORDER_TABLES:
+            # Lines first: an order partition cannot leave while lines still reference it.
+            for table in (tables.lines, tables.orders):
+                if not is_partitioned(connection, table):
+                    continue
+                for name in partitions(connection, table):
+                    month = partition_month(table, name)
+                    if month is None or add_months(month, 1) > before:
+                        continue
+                    connection.exec_driver_sql(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                    if table == tables.lines:
+                        # The detached lines keep a copy of the foreign key to the orders parent.
+                        for constraint in connection.exec_driver_sql(
+                            "SELECT conname FROM pg_constraint "
+                            "WHERE conrelid = to_regclass(%(name)s) AND confrelid = to_regclass(%(orders)s)",
+                            {"name": name, "orders": tables.orders},
+                        ).scalars().all():
+                            connection.exec_driver_sql(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"')
+                    if drop:
+                        connection.exec_driver_sql(f"DROP TABLE {name}")
+                    detached.append(name)
+    return detached
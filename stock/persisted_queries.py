@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, Optional
+from graphql import GraphQLError
+from strawberry.extensions import ParserCache, SchemaExtension, ValidationCache
+from cache import LRUCache
+
+DOCUMENT_CACHE_SIZE = int(os.environ.get("DOCUMENT_CACHE_SIZE", 512))
+
+
+def hash_query(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class PersistedQueryStore:
+    """Query documents that clients can run by sending only their sha256 hash.
+
+    Documents from the manifest are kept for the life of the process. When
+    ``allow_registration`` is on, clients can also register a document by sending
+    it once together with its hash (the Apollo APQ flow); those live in a bounded
+    LRU so unknown clients cannot grow memory without limit.
+    """
+
+    def __init__(self, manifest: Optional[Dict[str, str]] = None, allow_registration: bool = True,
+                 max_registered: int = 10000):
+        self.documents: Dict[str, str] = dict(manifest or {})
+        self.allow_registration = allow_registration
+        self.registered = LRUCache(max_registered, ttl=float("inf"))
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "PersistedQueryStore":
+        # The manifest is either {"<sha256>": "<query>"} or a plain list of queries.
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        if isinstance(manifest, list):
+            manifest = {hash_query(query): query for query in manifest}
+        for query_hash, query in manifest.items():
+            if hash_query(query) != query_hash:
+                raise ValueError(f"Persisted query {query_hash} does not match its document")
+        return cls(manifest, **kwargs)
+
+    def get(self, query_hash: str) -> Optional[str]:
+        query = self.documents.get(query_hash)
+        if query is None:
+            query = self.registered.get(query_hash, None)
+        return query
+
+    def register(self, query_hash: str, query: str) -> None:
+        if query_hash not in self.documents:
+            self.registered.set(query_hash, query)
+
+
+class PersistedQueries(SchemaExtension):
+    """Resolves ``extensions.persistedQuery.sha256Hash`` to a stored document before parsing."""
+
+    def __init__(self, store: "PersistedQueryStore", persisted_only: bool = False):
+        super().__init__()
+        self.store = store
+        self.persisted_only = persisted_only
+
+    def on_operation(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        persisted = (execution_context.operation_extensions or {}).get("persistedQuery")
+        if persisted:
+            query_hash = persisted.get("sha256Hash")
+            if execution_context.query:
+                if hash_query(execution_context.query) != query_hash:
+                    raise GraphQLError(
+                        "provided sha does not match query",
+                        extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"},
+                    )
+                if self.store.allow_registration:
+                    self.store.register(query_hash, execution_context.query)
+            else:
+                query = self.store.get(query_hash)
+                if query is None:
+                    raise GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+                execution_context.query = query
+        elif self.persisted_only:
+            raise GraphQLError("Only persisted queries are accepted", extensions={"code": "PERSISTED_QUERY_REQUIRED"})
+        yield
+
+
+def create_store_from_env() -> PersistedQueryStore:
+    allow_registration = os.environ.get("PERSISTED_QUERIES_AUTO_REGISTER", "true").lower() == "true"
+    path = os.environ.get("PERSISTED_QUERIES_PATH")
+    if path:
+        return PersistedQueryStore.from_file(path, allow_registration=allow_registration)
+    return PersistedQueryStore(allow_registration=allow_registration)
+
+
+persisted_query_store = create_store_from_env()
+
+PERSISTED_ONLY = os.environ.get("PERSISTED_QUERIES_ONLY", "false").lower() == "true"
+
+# Extensions shared by the sync and async schemas: hash lookups first, then
+# LRU caches of parsed and validated documents so repeated operations skip both.
+document_extensions = [
+    lambda: PersistedQueries(persisted_query_store, PERSISTED_ONLY),
+    lambda: ParserCache(maxsize=DOCUMENT_CACHE_SIZE),
+    lambda: ValidationCache(maxsize=DOCUMENT_CACHE_SIZE),
+]
@@ -0,0 +1,213 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    get_named_type,
+    is_composite_type,
+    value_from_ast,
+)
+from strawberry.extensions import SchemaExtension
+from pagination import MAX_PAGE_SIZE
+
+# Cost of one object returned by a field. Composite fields cost 1 and scalars are
+# free unless listed here; root fields that run multi-table joins are weighted by
+# roughly how many tables they touch.
+FIELD_WEIGHTS = {
+    "Query.getSupplierByCategoryName": 5,
+    "Query.getCategoryBySuppliername": 5,
+    "Query.getCategoryBySupplierid": 5,
+    "Query.getSuppliersByCategoriesId": 4,
+    "Query.getProductsBySupplierName": 4,
+    "Query.getProductsByCategoryId": 4,
+    "Query.getProductsSupplierid": 3,
+    "Query.getSuppliersByProductName": 4,
+    "Query.getProductsBySupplierOrderId": 3,
+    "Query.getProductsBySupplierOrderDate": 3,
+    "Query.getProductsByCustomerOrderDate": 3,
+    "Query.getSupplierOrdersByProduct": 3,
+    "Query.getAllConsumerOrdersByProduct": 3,
+}
+
+# Assumed row count for list fields that take no page size (the get_all_* lists).
+DEFAULT_LIST_SIZE = int(os.environ.get("QUERY_DEFAULT_LIST_SIZE", 100))
+
+# Relationship lists are much shorter than whole tables.
+LIST_SIZES = {
+    "SupplierOrderSchema.items": 10,
+    "ConsumerOrderSchema.items": 10,
+    "SupplierSchema.orders": 50,
+    "ConsumerSchema.orders": 20,
+}
+
+DEFAULT_MAX_COST = int(os.environ.get("QUERY_MAX_COST", 5000))
+DEFAULT_MAX_DEPTH = int(os.environ.get("QUERY_MAX_DEPTH", 10))
+
+# Per-client overrides, e.g. {"reports": {"max_cost": 50000, "max_depth": 12}}.
+CLIENT_BUDGETS: Dict[str, Dict[str, int]] = json.loads(os.environ.get("QUERY_CLIENT_BUDGETS", "{}"))
+
+# X-Client-Id values allowed to call the operational queries (getSlowQueries,
+# getDbPoolStats, getCatalogCacheStats). Comma-separated; nobody by default.
+ADMIN_CLIENTS = {
+    client.strip() for client in os.environ.get("QUERY_ADMIN_CLIENTS", "").split(",") if client.strip()
+}
+
+# The header is taken at face value: budgets and the admin gate are only as
+# trustworthy as the proxy that sets or strips it in front of the app.
+CLIENT_HEADER = "X-Client-Id"
+
+# Arguments that bound how many rows a field returns.
+SIZE_ARGUMENTS = ("first", "limit")
+
+
+@dataclass
+class Budget:
+    max_cost: int = DEFAULT_MAX_COST
+    max_depth: int = DEFAULT_MAX_DEPTH
+
+
+def budget_for(client_id: Optional[str]) -> Budget:
+    overrides = CLIENT_BUDGETS.get(client_id or "", {})
+    return Budget(
+        max_cost=overrides.get("max_cost", DEFAULT_MAX_COST),
+        max_depth=overrides.get("max_depth", DEFAULT_MAX_DEPTH),
+    )
+
+
+class CostCalculator:
+    def __init__(self, schema, fragments: Dict[str, Any], variables: Optional[Dict[str, Any]]):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+
+    def page_size(self, field_def, node: FieldNode) -> Optional[int]:
+        name = next((name for name in SIZE_ARGUMENTS if name in field_def.args), None)
+        if name is None:
+            return None
+        size = field_def.args[name].default_value
+        # The parser leaves arguments unset on a field written without parentheses.
+        for argument in node.arguments or ():
+            if argument.name.value == name:
+                size = value_from_ast(argument.value, field_def.args[name].type, self.variables)
+        if not isinstance(size, int):
+            return None
+        return max(0, min(size, MAX_PAGE_SIZE))
+
+    def selection_set(self, selection_set, parent_type, depth: int, sized: bool) -> Tuple[int, int]:
+        cost, max_depth = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(selection, parent_type, depth + 1, sized)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                field_cost, field_depth = self.selection_set(selection.selection_set, fragment_type, depth, sized)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments[selection.name.value]
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                field_cost, field_depth = self.selection_set(fragment.selection_set, fragment_type, depth, sized)
+            else:
+                continue
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def field(self, node: FieldNode, parent_type, depth: int, sized: bool) -> Tuple[int, int]:
+        name = node.name.value
+        if name.startswith("__") or not isinstance(parent_type, GraphQLObjectType):
+            return 0, depth - 1
+        field_def = parent_type.fields[name]
+        field_type = field_def.type
+        if isinstance(field_type, GraphQLNonNull):
+            field_type = field_type.of_type
+        named_type = get_named_type(field_type)
+
+        weight = FIELD_WEIGHTS.get(f"{parent_type.name}.{name}", 1 if is_composite_type(named_type) else 0)
+
+        # A size argument bounds the field's own list, or for connections the list
+        # nested below it; otherwise a list is assumed to hold DEFAULT_LIST_SIZE rows.
+        multiplier = 1
+        page_size = self.page_size(field_def, node)
+        child_sized = False
+        if page_size is not None:
+            multiplier = page_size
+            child_sized = not isinstance(field_type, GraphQLList)
+        elif isinstance(field_type, GraphQLList) and not sized:
+            multiplier = LIST_SIZES.get(f"{parent_type.name}.{name}", DEFAULT_LIST_SIZE)
+
+        child_cost, child_depth = 0, depth
+        if node.selection_set is not None:
+            child_cost, child_depth = self.selection_set(node.selection_set, named_type, depth, child_sized)
+        return multiplier * (weight + child_cost), child_depth
+
+
+def operation_cost(schema, document, operation_name: Optional[str], variables: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    fragments = {}
+    operation = None
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            if operation is None or (definition.name and definition.name.value == operation_name):
+                operation = definition
+        else:
+            fragments[definition.name.value] = definition
+    if operation is None:
+        return 0, 0
+    root_type = schema.get_root_type(operation.operation)
+    return CostCalculator(schema, fragments, variables).selection_set(operation.selection_set, root_type, 0, False)
+
+
+def client_id_from_context(context: Any) -> Optional[str]:
+    request = context.get("request") if isinstance(context, dict) else None
+    if request is None:
+        return None
+    return request.headers.get(CLIENT_HEADER)
+
+
+def require_admin(info) -> None:
+    if client_id_from_context(info.context) not in ADMIN_CLIENTS:
+        raise GraphQLError(f"{info.field_name} is restricted to admin clients", extensions={"code": "FORBIDDEN"})
+
+
+class QueryCost(SchemaExtension):
+    """Rejects operations that exceed the client's cost or depth budget before any resolver runs.
+
+    The computed cost is returned under ``extensions.cost`` in the response.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cost: Optional[Dict[str, Any]] = None
+
+    def on_execute(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        budget = budget_for(client_id_from_context(execution_context.context))
+        cost, depth = operation_cost(
+            execution_context.schema._schema,
+            execution_context.graphql_document,
+            execution_context.operation_name,
+            execution_context.variables,
+        )
+        self.cost = {"requested": cost, "maximum": budget.max_cost, "depth": depth, "max_depth": budget.max_depth}
+        if depth > budget.max_depth:
+            raise GraphQLError(
+                f"Query depth {depth} exceeds the limit of {budget.max_depth}",
+                extensions={"code": "QUERY_TOO_DEEP", "cost": self.cost},
+            )
+        if cost > budget.max_cost:
+            raise GraphQLError(
+                f"Query cost {cost} exceeds the budget of {budget.max_cost}",
+                extensions={"code": "QUERY_TOO_EXPENSIVE", "cost": self.cost},
+            )
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        return {"cost": self.cost} if self.cost is not None else {}
@@ -0,0 +1,198 @@
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+from cache import recommendation_cache
+from dao import dialect_insert
+from models import ConsumerOrderItem, ProductCoOccurrence, ProductRecommendation, RecommendationState
+
+TOP_K = int(os.environ.get("RECOMMENDATIONS_TOP_K", 20))
+
+BATCH_SIZE = 5000
+
+# Incremental refreshes only add lines; deleted lines (and the orders, consumers and
+# products deleted with them) leave their pairs counted until a full recount.
+# A refresh turns into one when the last is this old; 0 leaves it to --full.
+FULL_REFRESH_HOURS = float(os.environ.get("RECOMMENDATIONS_FULL_REFRESH_HOURS", 24))
+
+# How long a refresh waits for in-flight checkouts before giving up (PostgreSQL).
+LOCK_TIMEOUT_MS = int(os.environ.get("RECOMMENDATIONS_LOCK_TIMEOUT_MS", 5000))
+
+STATE_ID = 1
+
+
+@dataclass
+class RecommendationRefresh:
+    orders: int
+    pairs: int
+    products: int
+    last_consumer_order_item_id: int
+    full: bool
+
+
+def iter_baskets(session: Session, after_item_id: int = 0, up_to_item_id: Optional[int] = None,
+                 batch_size: int = BATCH_SIZE) -> Iterator[Tuple[List[int], List[int]]]:
+    """Yields ``(products, counted)`` for every order with lines in ``(after_item_id, up_to_item_id]``.
+
+    ``products`` is the order's basket up to ``up_to_item_id`` and ``counted`` the
+    part of it an earlier run already counted (lines up to ``after_item_id``).
+    """
+    lines = ConsumerOrderItem.__table__.c
+    window = [lines.id > after_item_id]
+    if up_to_item_id is not None:
+        window.append(lines.id <= up_to_item_id)
+    touched = select(lines.consumer_order_id).where(*window)
+    # Lines arrive sorted by order through a server-side cursor, so only the
+    # current basket is held in memory.
+    result = session.execute(
+        select(lines.consumer_order_id, lines.product_id, lines.id <= after_item_id)
+        .where(lines.consumer_order_id.in_(touched), lines.product_id.isnot(None), *window[1:])
+        .order_by(lines.consumer_order_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for _, basket in groupby(result, key=itemgetter(0)):
+        basket = list(basket)
+        yield (
+            sorted({product_id for _, product_id, _ in basket}),
+            sorted({product_id for _, product_id, counted in basket if counted}),
+        )
+
+
+def count_co_occurrences(baskets: Iterable[Tuple[List[int], List[int]]]) -> Tuple[Dict[int, Counter], int]:
+    """Builds the sparse product x product matrix of orders containing both products.
+
+    Only pairs inside one basket are visited, so the work grows with lines times
+    basket size rather than with the square of the catalog. Pairs of products
+    that were both counted before are skipped, so lines added to an order later
+    only add the pairs they complete. Returns the matrix (upper triangle,
+    ``matrix[a][b]`` with ``a < b``) and the number of orders counted for the
+    first time.
+    """
+    matrix: Dict[int, Counter] = defaultdict(Counter)
+    orders = 0
+    for products, counted in baskets:
+        counted = set(counted)
+        if not counted:
+            orders += 1
+        for index, product_id in enumerate(products):
+            row = matrix[product_id]
+            for related_product_id in products[index + 1:]:
+                if product_id not in counted or related_product_id not in counted:
+                    row[related_product_id] += 1
+    return matrix, orders
+
+
+def _chunks(values: List, size: int) -> Iterator[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def add_pair_counts(session: Session, matrix: Dict[int, Counter]) -> List[int]:
+    """Adds the matrix to the stored counts in both directions; returns the touched products."""
+    rows = []
+    for product_id, row in matrix.items():
+        for related_product_id, order_count in row.items():
+            rows.append({"product_id": product_id, "related_product_id": related_product_id, "order_count": order_count})
+            rows.append({"product_id": related_product_id, "related_product_id": product_id, "order_count": order_count})
+    for chunk in _chunks(rows, BATCH_SIZE):
+        statement = dialect_insert(session)(ProductCoOccurrence).values(chunk)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[ProductCoOccurrence.product_id, ProductCoOccurrence.related_product_id],
+            set_={"order_count": ProductCoOccurrence.order_count + statement.excluded.order_count},
+        ))
+    return sorted({row["product_id"] for row in rows})
+
+
+def rebuild_top_k(session: Session, product_ids: List[int], top_k: int = TOP_K) -> None:
+    # Only products whose counts moved are re-ranked, one window query per chunk.
+    for chunk in _chunks(product_ids, 1000):
+        session.execute(delete(ProductRecommendation).where(ProductRecommendation.product_id.in_(chunk)))
+        ranked = (
+            select(
+                ProductCoOccurrence.product_id,
+                ProductCoOccurrence.related_product_id,
+                ProductCoOccurrence.order_count,
+                func.row_number().over(
+                    partition_by=ProductCoOccurrence.product_id,
+                    order_by=(ProductCoOccurrence.order_count.desc(), ProductCoOccurrence.related_product_id),
+                ).label("rank"),
+            )
+            .where(ProductCoOccurrence.product_id.in_(chunk))
+            .subquery()
+        )
+        session.execute(
+            ProductRecommendation.__table__.insert().from_select(
+                ["product_id", "related_product_id", "order_count", "rank"],
+                select(ranked.c.product_id, ranked.c.related_product_id, ranked.c.order_count, ranked.c.rank)
+                .where(ranked.c.rank <= top_k),
+            )
+        )
+
+
+def committed_watermark(session: Session) -> int:
+    """The highest consumer order line id with no uncommitted line below it.
+
+    Ids are drawn when a line is inserted, so a checkout that has not committed yet
+    can hold an id below lines that already have. On PostgreSQL a SHARE lock waits
+    for those writers to finish; new checkouts queue only while it waits, as it is
+    released right away. SQLite has one writer at a time, and its uncommitted lines
+    always take ids above every committed one.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}"))
+        session.execute(text(f"LOCK TABLE {ConsumerOrderItem.__tablename__} IN SHARE MODE"))
+    up_to_item_id = session.scalar(select(func.coalesce(func.max(ConsumerOrderItem.id), 0)))
+    session.commit()
+    return up_to_item_id
+
+
+def refresh_recommendations(session: Session, full: bool = False, top_k: int = TOP_K) -> RecommendationRefresh:
+    """Folds consumer order lines committed since the last run into the co-occurrence counts.
+
+    Lines are tracked by id, so lines added later to an order that was already
+    counted are picked up too. Deleted lines are only taken out by a ``full``
+    refresh, which recounts everything and runs by itself every
+    ``FULL_REFRESH_HOURS``.
+    """
+    up_to_item_id = committed_watermark(session)
+
+    session.execute(
+        dialect_insert(session)(RecommendationState)
+        .values(id=STATE_ID, last_consumer_order_item_id=0)
+        .on_conflict_do_nothing(index_elements=[RecommendationState.id])
+    )
+    # The row lock keeps two refreshes from counting the same lines twice.
+    state = session.query(RecommendationState).filter_by(id=STATE_ID).with_for_update().one()
+    now = datetime.utcnow()
+    if FULL_REFRESH_HOURS and (
+        state.full_refreshed_at is None or now - state.full_refreshed_at >= timedelta(hours=FULL_REFRESH_HOURS)
+    ):
+        full = True
+    if full:
+        session.execute(delete(ProductRecommendation))
+        session.execute(delete(ProductCoOccurrence))
+        state.last_consumer_order_item_id = 0
+        state.full_refreshed_at = now
+
+    after_item_id = state.last_consumer_order_item_id
+    matrix, orders = count_co_occurrences(iter_baskets(session, after_item_id, up_to_item_id))
+    product_ids = add_pair_counts(session, matrix)
+    rebuild_top_k(session, product_ids, top_k)
+
+    state.last_consumer_order_item_id = max(after_item_id, up_to_item_id)
+    state.refreshed_at = now
+    result = RecommendationRefresh(
+        orders=orders,
+        pairs=sum(len(row) for row in matrix.values()),
+        products=len(product_ids),
+        last_consumer_order_item_id=state.last_consumer_order_item_id,
+        full=full,
+    )
+    session.commit()
+    recommendation_cache.clear()
+    return result
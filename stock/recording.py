@@ -0,0 +1,58 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Iterator, Optional
+from strawberry.extensions import SchemaExtension
+
+# Set GRAPHQL_RECORD_PATH to append every executed operation to that file as one
+# JSON line, for replay with loadtest.py.
+RECORD_PATH = os.environ.get("GRAPHQL_RECORD_PATH")
+RECORD_SAMPLE_RATE = float(os.environ.get("GRAPHQL_RECORD_SAMPLE_RATE", 1.0))
+
+
+class OperationLog:
+    """Append-only newline-delimited JSON log of GraphQL operations, shared by all threads."""
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, query: str, variables: Optional[dict], operation_name: Optional[str]) -> None:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            line = json.dumps({
+                "ts": time.time(),
+                "operationName": operation_name,
+                "query": query,
+                "variables": variables or {},
+            })
+        except (TypeError, ValueError):
+            # Uploads and other non-JSON variables cannot be replayed.
+            return
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+class RecordOperations(SchemaExtension):
+    """Logs each operation that passed parsing and validation, with its variables."""
+
+    def __init__(self, log: OperationLog):
+        super().__init__()
+        self.log = log
+
+    def on_execute(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        if execution_context.query:
+            self.log.record(execution_context.query, execution_context.variables, execution_context.operation_name)
+        yield
+
+
+operation_log = OperationLog(RECORD_PATH, RECORD_SAMPLE_RATE) if RECORD_PATH else None
+
+recording_extensions = [lambda: RecordOperations(operation_log)] if operation_log else []
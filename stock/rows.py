@@ -0,0 +1,35 @@
+from typing import Dict, Sequence, Tuple
+
+
+class Row:
+    """Read-only result of a list query that bypassed the ORM.
+
+    A subclass per model and column set keeps the values in ``__slots__``: no
+    instance ``__dict__``, identity-map entry or change tracking. Strawberry reads
+    fields with ``getattr``, so a row serializes as the schema type it stands in
+    for. ``model`` is None, as on a schema built without an ORM instance.
+    """
+
+    __slots__ = ()
+    model = None
+
+    def __init__(self, *values):
+        for key, value in zip(self.__slots__, values):
+            setattr(self, key, value)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+# A handful of column sets per model in practice: one per distinct selection.
+_row_classes: Dict[Tuple[type, Tuple[str, ...]], type] = {}
+
+
+def row_class(model, keys: Sequence[str]) -> type:
+    """The ``Row`` subclass holding ``keys`` of ``model``, created on first use."""
+    keys = tuple(keys)
+    cls = _row_classes.get((model, keys))
+    if cls is None:
+        cls = _row_classes[(model, keys)] = type(f"{model.__name__}Row", (Row,), {"__slots__": keys})
+    return cls
@@ -1,12 +1,17 @@
+import io
 import strawberry
-from typing import List, Optional
-from datetime import date
+from strawberry.extensions import FieldExtension
+from strawberry.file_uploads import Upload
+from enum import Enum
+from typing import Annotated, List, Optional
+from datetime import date, datetime
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, inspect
 from database import *
 
-Session = sessionmaker(bind=engine)
-session =Session()
+# Proxy to the current request's session; closed by teardown_db when the request ends.
+session = db_session
 
 from dao import (
     SupplierDAO,
@@ -17,7 +22,21 @@ from dao import (
     ConsumerOrderDAO,
     ConsumerOrderItemDAO,
     ConsumerDAO,
+    StockLevelDAO,
+    RecommendationDAO,
+    SearchDAO,
 )
+from autocomplete import suggestion_index
+from cache import MISSING, catalog_cache
+from catalog_import import import_catalog
+from eager_loading import CONNECTION_PATH, load_options, selected_columns
+from loaders import get_loaders
+from persisted_queries import document_extensions
+from query_cost import QueryCost, require_admin
+from recording import recording_extensions
+from metrics import metrics_extensions
+from slow_queries import SLOW_QUERY_RECENT, slow_query_log
+from pagination import Connection, DEFAULT_PAGE_SIZE, build_connection, decode_cursor, page_size
 from models import (
     Supplier,
     Product,
@@ -29,19 +48,62 @@ from models import (
     Consumer
 )
 
+# The Product strawberry type below shadows the model of the same name.
+ProductModel = Product
+
+# Relationship fields read from ``model`` when the root resolver eager-loaded them
+# (see eager_loading.py); otherwise they batch through the request's DataLoaders.
+# Resolvers that return the ORM instance itself have no ``model``: it is its own.
+def eager_loaded(schema, attribute: str):
+    model = getattr(schema, "model", schema)
+    if model is None or attribute in inspect(model).unloaded:
+        return MISSING
+    return getattr(model, attribute)
+
+async def related_one(schema, info: strawberry.Info, attribute: str, loader: str, key: Optional[int]):
+    value = eager_loaded(schema, attribute)
+    if value is MISSING:
+        value = await getattr(get_loaders(info.context, session), loader).load(key) if key is not None else None
+    return value
+
+async def related_many(schema, info: strawberry.Info, attribute: str, loader: str) -> list:
+    values = eager_loaded(schema, attribute)
+    if values is MISSING:
+        values = await getattr(get_loaders(info.context, session), loader).load(schema.id)
+    return values
+
+# products.unit_price is a Numeric column, so the ORM and row queries return Decimal,
+# which the GraphQL Float serializer rejects.
+class DecimalAsFloat(FieldExtension):
+    def resolve(self, next_, source, info, **kwargs):
+        value = next_(source, info, **kwargs)
+        return float(value) if isinstance(value, Decimal) else value
+
 @strawberry.type
 class SupplierSchema:
     id: int
     name: str
     contact_number: str
+    model: strawberry.Private[Optional[Supplier]] = None
+
+    @strawberry.field
+    async def orders(self, info: strawberry.Info) -> List["SupplierOrderSchema"]:
+        orders = await related_many(self, info, "orders", "supplier_orders_by_supplier")
+        return [supplier_order_schema(order) for order in orders]
 
 @strawberry.type
 class ProductSchema:
     id: int
     category_id: int
     name: str
-    unit_price: float
+    unit_price: float = strawberry.field(extensions=[DecimalAsFloat()])
     description: str
+    model: strawberry.Private[Optional[Product]] = None
+
+    @strawberry.field
+    async def category(self, info: strawberry.Info) -> Optional["CategorySchema"]:
+        category = await related_one(self, info, "category", "category", self.category_id)
+        return category_schema(category) if category else None
 
 @strawberry.type
 class CategorySchema:
@@ -54,6 +116,17 @@ class SupplierOrderSchema:
     supplier_id: int
     order_date: str
     total_amount: float
+    model: strawberry.Private[Optional[SupplierOrder]] = None
+
+    @strawberry.field
+    async def supplier(self, info: strawberry.Info) -> Optional[SupplierSchema]:
+        supplier = await related_one(self, info, "supplier", "supplier", self.supplier_id)
+        return supplier_schema(supplier) if supplier else None
+
+    @strawberry.field
+    async def items(self, info: strawberry.Info) -> List["SupplierOrderItemSchema"]:
+        items = await related_many(self, info, "items", "supplier_order_items_by_order")
+        return [supplier_order_item_schema(item) for item in items]
 
 @strawberry.type
 class SupplierOrderItemSchema:
@@ -64,6 +137,12 @@ class SupplierOrderItemSchema:
     quantity: int
     unit_price: float
     total_price:Optional[float]
+    model: strawberry.Private[Optional[SupplierOrderItem]] = None
+
+    @strawberry.field
+    async def product(self, info: strawberry.Info) -> Optional[ProductSchema]:
+        product = await related_one(self, info, "product", "product", self.product_id)
+        return product_schema(product) if product else None
 
 
 @strawberry.type
@@ -72,6 +151,17 @@ class ConsumerOrderSchema:
     consumer_id: int
     order_date: str
     total_amount: float
+    model: strawberry.Private[Optional[ConsumerOrder]] = None
+
+    @strawberry.field
+    async def consumer(self, info: strawberry.Info) -> Optional["ConsumerSchema"]:
+        consumer = await related_one(self, info, "consumer", "consumer", self.consumer_id)
+        return consumer_schema(consumer) if consumer else None
+
+    @strawberry.field
+    async def items(self, info: strawberry.Info) -> List["ConsumerOrderItemSchema"]:
+        items = await related_many(self, info, "items", "consumer_order_items_by_order")
+        return [consumer_order_item_schema(item) for item in items]
 
 @strawberry.type
 class ConsumerOrderItemSchema:
@@ -82,19 +172,208 @@ class ConsumerOrderItemSchema:
     quantity: int
     unit_price: float
     total_price: float
+    model: strawberry.Private[Optional[ConsumerOrderItem]] = None
+
+    @strawberry.field
+    async def product(self, info: strawberry.Info) -> Optional[ProductSchema]:
+        product = await related_one(self, info, "product", "product", self.product_id)
+        return product_schema(product) if product else None
 
 @strawberry.type
 class ConsumerSchema:
     id: int
     name: str
     contact_number: str
+    model: strawberry.Private[Optional[Consumer]] = None
+
+    @strawberry.field
+    async def orders(self, info: strawberry.Info) -> List[ConsumerOrderSchema]:
+        orders = await related_many(self, info, "orders", "consumer_orders_by_consumer")
+        return [consumer_order_schema(order) for order in orders]
+
+
+def column_reader(row):
+    # Columns a load_only projection skipped were not selected: report None rather
+    # than lazy-load them one row at a time (or fail on a detached async row).
+    # Expired columns, e.g. after a commit, still refresh as usual.
+    state = inspect(row)
+    values = row.__dict__
+
+    def value(name: str):
+        return getattr(row, name) if name in values or name in state.expired_attributes else None
+
+    return value
+
+def supplier_schema(supplier) -> SupplierSchema:
+    value = column_reader(supplier)
+    return SupplierSchema(
+        id=supplier.id,
+        name=value("name"),
+        contact_number=value("contact_number"),
+        model=supplier,
+    )
+
+def product_schema(product) -> ProductSchema:
+    value = column_reader(product)
+    return ProductSchema(
+        id=product.id,
+        category_id=value("category_id"),
+        name=value("name"),
+        unit_price=value("unit_price"),
+        description=value("description"),
+        model=product,
+    )
+
+def category_schema(category) -> CategorySchema:
+    return CategorySchema(id=category.id, category_name=category.category_name)
+
+def supplier_order_schema(supplier_order) -> SupplierOrderSchema:
+    value = column_reader(supplier_order)
+    return SupplierOrderSchema(
+        id=supplier_order.id,
+        supplier_id=value("supplier_id"),
+        order_date=value("order_date"),
+        total_amount=value("total_amount"),
+        model=supplier_order,
+    )
+
+def supplier_order_item_schema(supplier_order_item) -> SupplierOrderItemSchema:
+    value = column_reader(supplier_order_item)
+    return SupplierOrderItemSchema(
+        id=supplier_order_item.id,
+        supplier_order_id=value("supplier_order_id"),
+        product_id=value("product_id"),
+        item_name=value("item_name"),
+        quantity=value("quantity"),
+        unit_price=value("unit_price"),
+        total_price=value("total_price"),
+        model=supplier_order_item,
+    )
+
+def consumer_order_schema(consumer_order) -> ConsumerOrderSchema:
+    value = column_reader(consumer_order)
+    return ConsumerOrderSchema(
+        id=consumer_order.id,
+        consumer_id=value("consumer_id"),
+        order_date=value("order_date"),
+        total_amount=value("total_amount"),
+        model=consumer_order,
+    )
+
+def consumer_order_item_schema(consumer_order_item) -> ConsumerOrderItemSchema:
+    value = column_reader(consumer_order_item)
+    return ConsumerOrderItemSchema(
+        id=consumer_order_item.id,
+        consumer_order_id=value("consumer_order_id"),
+        product_id=value("product_id"),
+        item_name=value("item_name"),
+        quantity=value("quantity"),
+        unit_price=value("unit_price"),
+        total_price=value("total_price"),
+        model=consumer_order_item,
+    )
+
+def consumer_schema(consumer) -> ConsumerSchema:
+    value = column_reader(consumer)
+    return ConsumerSchema(
+        id=consumer.id,
+        name=value("name"),
+        contact_number=value("contact_number"),
+        model=consumer,
+    )
+
+@strawberry.type
+class CatalogImportSchema:
+    inserted: int
+    updated: int
+    rejected: int
+    suppliers_inserted: int
+    categories_inserted: int
+
+@strawberry.type
+class CacheStatsSchema:
+    backend: str
+    size: Optional[int]
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+@strawberry.type
+class PoolStatsSchema:
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+
+@strawberry.type
+class SlowQuerySchema:
+    recorded_at: datetime
+    duration_ms: float
+    engine: str
+    statement: str
+    parameters: str
+    resolver: Optional[str]
+    dao_method: Optional[str]
+    plan: Optional[str]
+
+@strawberry.type
+class StockLevelSchema:
+    product_id: int
+    quantity: int
+    updated_at: Optional[datetime]
+
+@strawberry.type
+class RecommendationSchema:
+    product: ProductSchema
+    order_count: int
+
+@strawberry.type
+class ConsumerSearchResultSchema:
+    consumer: ConsumerSchema
+    score: float
+
+@strawberry.type
+class SupplierSearchResultSchema:
+    supplier: SupplierSchema
+    score: float
+
+@strawberry.type
+class ProductSearchResultSchema:
+    product: ProductSchema
+    score: float
+
+@strawberry.enum
+class SuggestionKind(Enum):
+    PRODUCT = "product"
+    SUPPLIER = "supplier"
+    CATEGORY = "category"
+
+@strawberry.type
+class SuggestionSchema:
+    kind: SuggestionKind
+    id: int
+    name: str
+
+@strawberry.enum
+class SortOrder(Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+@strawberry.input
+class OrderItemInput:
+    product_id: int
+    item_name: str
+    quantity: int
+    unit_price: float
 
 @strawberry.type
 class Product:
     id: int
     category_id: int
     name: str
-    unit_price: float
+    unit_price: float = strawberry.field(extensions=[DecimalAsFloat()])
     description: str
 
 
@@ -104,62 +383,58 @@ class Product:
 class Query:
     # Supplier queries
     @strawberry.field
-    def get_supplier_by_id(self, supplier_id: int) -> Optional[SupplierSchema]:
-        supplier_dao = SupplierDAO(session)
-        supplier = supplier_dao.get_supplier_by_id(supplier_id)
-        return SupplierSchema(id=supplier.id, name=supplier.name, contact_number=supplier.contact_number) if supplier else None
+    async def get_supplier_by_id(self, info: strawberry.Info, supplier_id: int) -> Optional[SupplierSchema]:
+        options = load_options(info, Supplier)
+        if options:
+            supplier = SupplierDAO(session).get_supplier_by_id(supplier_id, options)
+        else:
+            supplier = await get_loaders(info.context, session).supplier.load(supplier_id)
+        return supplier_schema(supplier) if supplier else None
 
     
     @strawberry.field
-    def get_all_suppliers(self) -> List[SupplierSchema]:
+    def get_all_suppliers(self, info: strawberry.Info) -> List[SupplierSchema]:
         supplier_dao = SupplierDAO(session)
-        suppliers = supplier_dao.get_all_suppliers()
-        return [
-            SupplierSchema(id=supplier.id, name=supplier.name, contact_number=supplier.contact_number)
-            for supplier in suppliers
-        ]
+        keys = selected_columns(info, Supplier)
+        if keys is not None:
+            return supplier_dao.get_all_supplier_rows(keys)
+        suppliers = supplier_dao.get_all_suppliers(load_options(info, Supplier, project=True))
+        return [supplier_schema(supplier) for supplier in suppliers]
                 
 
 
     # Product queries
     @strawberry.field
-    def get_product_by_id(self, product_id: int) -> Optional[ProductSchema]:
-        product_dao = ProductDAO(session)
-        product = product_dao.get_product_by_id(product_id)
-        return ProductSchema(
-            id=product.id,
-            category_id=product.category_id,
-            name=product.name,
-            unit_price=product.unit_price,
-            description=product.description,
-        ) if product else None
+    async def get_product_by_id(self, info: strawberry.Info, product_id: int) -> Optional[ProductSchema]:
+        options = load_options(info, ProductModel)
+        if options:
+            product = ProductDAO(session).get_product_by_id(product_id, options)
+        else:
+            product = await get_loaders(info.context, session).product.load(product_id)
+        return product_schema(product) if product else None
 
     
     @strawberry.field
-    def get_all_products(self) -> List[ProductSchema]:
+    def get_all_products(self, info: strawberry.Info) -> List[ProductSchema]:
         product_dao = ProductDAO(session)
-        products = product_dao.get_all_products()
-        return [
-            ProductSchema(
-                id=product.id,
-                category_id=product.category_id,
-                name=product.name,
-                unit_price=product.unit_price,
-                description=product.description,
-            )
-            for product in products
-        ]
+        keys = selected_columns(info, ProductModel)
+        if keys is not None:
+            return product_dao.get_all_product_rows(keys)
+        products = product_dao.get_all_products(load_options(info, ProductModel, project=True))
+        return [product_schema(product) for product in products]
 
     # Category queries
     @strawberry.field
-    def get_category_by_id(self, category_id: int) -> Optional[CategorySchema]:
-        category_dao = CategoryDAO(session)
-        category = category_dao.get_category_by_id(category_id)
+    async def get_category_by_id(self, info: strawberry.Info, category_id: int) -> Optional[CategorySchema]:
+        category = await get_loaders(info.context, session).category.load(category_id)
         return CategorySchema(id=category.id, category_name=category.category_name) if category else None
     
     @strawberry.field
-    def get_all_categories(self) -> List[CategorySchema]:
+    def get_all_categories(self, info: strawberry.Info) -> List[CategorySchema]:
         category_dao = CategoryDAO(session)
+        keys = selected_columns(info, Category)
+        if keys is not None:
+            return category_dao.get_all_category_rows(keys)
         categories = category_dao.get_all_categories()
         return [
             CategorySchema(id=category.id, category_name=category.category_name)
@@ -168,127 +443,90 @@ class Query:
 
     # SupplierOrder queries
     @strawberry.field
-    def get_supplier_order_by_id(self, supplier_order_id: int) -> Optional[SupplierOrderSchema]:
-        supplier_order_dao = SupplierOrderDAO(session)
-        supplier_order = supplier_order_dao.get_supplier_order_by_id(supplier_order_id)
-        return SupplierOrderSchema(
-            id=supplier_order.id,
-            supplier_id=supplier_order.supplier_id,
-            order_date=supplier_order.order_date,
-            total_amount=supplier_order.total_amount,
-        ) if supplier_order else None
+    async def get_supplier_order_by_id(self, info: strawberry.Info, supplier_order_id: int) -> Optional[SupplierOrderSchema]:
+        options = load_options(info, SupplierOrder)
+        if options:
+            supplier_order = SupplierOrderDAO(session).get_supplier_order_by_id(supplier_order_id, options)
+        else:
+            supplier_order = await get_loaders(info.context, session).supplier_order.load(supplier_order_id)
+        return supplier_order_schema(supplier_order) if supplier_order else None
 
     # SupplierOrderItem queries
     @strawberry.field
-    def get_supplier_order_item_by_id(self, supplier_order_item_id: int) -> Optional[SupplierOrderItemSchema]:
-        supplier_order_item_dao = SupplierOrderItemDAO(session)
-        supplier_order_item = supplier_order_item_dao.get_supplier_order_item_by_id(supplier_order_item_id)
-        return SupplierOrderItemSchema(
-            id=supplier_order_item.id,
-            supplier_order_id=supplier_order_item.supplier_order_id,
-            product_id=supplier_order_item.product_id,
-            item_name=supplier_order_item.item_name,
-            quantity=supplier_order_item.quantity,
-            unit_price=supplier_order_item.unit_price,
-            total_price=supplier_order_item.total_price,
-        ) if supplier_order_item else None
+    async def get_supplier_order_item_by_id(self, info: strawberry.Info, supplier_order_item_id: int) -> Optional[SupplierOrderItemSchema]:
+        options = load_options(info, SupplierOrderItem)
+        if options:
+            supplier_order_item = SupplierOrderItemDAO(session).get_supplier_order_item_by_id(supplier_order_item_id, options)
+        else:
+            supplier_order_item = await get_loaders(info.context, session).supplier_order_item.load(supplier_order_item_id)
+        return supplier_order_item_schema(supplier_order_item) if supplier_order_item else None
     
 
     @strawberry.field
-    def get_all_supplier_orders(self) -> List[SupplierOrderSchema]:
+    def get_all_supplier_orders(self, info: strawberry.Info) -> List[SupplierOrderSchema]:
         supplier_order_dao = SupplierOrderDAO(session)
-        supplier_orders = supplier_order_dao.get_all_supplier_orders()
-        return [
-            SupplierOrderSchema(
-                id=supplier_order.id,
-                supplier_id=supplier_order.supplier_id,
-                order_date=supplier_order.order_date,
-                total_amount=supplier_order.total_amount,
-            )
-            for supplier_order in supplier_orders
-        ]
+        keys = selected_columns(info, SupplierOrder)
+        if keys is not None:
+            return supplier_order_dao.get_all_supplier_order_rows(keys)
+        supplier_orders = supplier_order_dao.get_all_supplier_orders(load_options(info, SupplierOrder, project=True))
+        return [supplier_order_schema(supplier_order) for supplier_order in supplier_orders]
     
     @strawberry.field
-    def get_all_supplier_order_items(self) -> List[SupplierOrderItemSchema]:
+    def get_all_supplier_order_items(self, info: strawberry.Info) -> List[SupplierOrderItemSchema]:
         supplier_order_item_dao = SupplierOrderItemDAO(session)
-        supplier_order_items = supplier_order_item_dao.get_all_supplier_order_items()
-        return [
-            SupplierOrderItemSchema(
-                id=supplier_order_item.id,
-                supplier_order_id=supplier_order_item.supplier_order_id,
-                product_id=supplier_order_item.product_id,
-                item_name=supplier_order_item.item_name,
-                quantity=supplier_order_item.quantity,
-                unit_price=supplier_order_item.unit_price,
-                total_price=supplier_order_item.total_price,
-            )
-            for supplier_order_item in supplier_order_items
-        ]
+        keys = selected_columns(info, SupplierOrderItem)
+        if keys is not None:
+            return supplier_order_item_dao.get_all_supplier_order_item_rows(keys)
+        supplier_order_items = supplier_order_item_dao.get_all_supplier_order_items(load_options(info, SupplierOrderItem, project=True))
+        return [supplier_order_item_schema(supplier_order_item) for supplier_order_item in supplier_order_items]
 
     # ConsumerOrder queries
     @strawberry.field
-    def get_consumer_order_by_id(self, consumer_order_id: int) -> Optional[ConsumerOrderSchema]:
-        consumer_order_dao = ConsumerOrderDAO(session)
-        consumer_order = consumer_order_dao.get_consumer_order_by_id(consumer_order_id)
-        return ConsumerOrderSchema(
-            id=consumer_order.id,
-            consumer_id=consumer_order.consumer_id,
-            order_date=consumer_order.order_date,
-            total_amount=consumer_order.total_amount,
-        ) if consumer_order else None
+    async def get_consumer_order_by_id(self, info: strawberry.Info, consumer_order_id: int) -> Optional[ConsumerOrderSchema]:
+        options = load_options(info, ConsumerOrder)
+        if options:
+            consumer_order = ConsumerOrderDAO(session).get_consumer_order_by_id(consumer_order_id, options)
+        else:
+            consumer_order = await get_loaders(info.context, session).consumer_order.load(consumer_order_id)
+        return consumer_order_schema(consumer_order) if consumer_order else None
     
     @strawberry.field
-    def get_all_consumer_orders(self) -> List[ConsumerOrderSchema]:
+    def get_all_consumer_orders(self, info: strawberry.Info) -> List[ConsumerOrderSchema]:
         consumer_order_dao = ConsumerOrderDAO(session)
-        consumer_orders = consumer_order_dao.get_all_consumer_orders()
-        return [
-            ConsumerOrderSchema(
-                id=consumer_order.id,
-                consumer_id=consumer_order.consumer_id,
-                order_date=consumer_order.order_date,
-                total_amount=consumer_order.total_amount,
-            )
-            for consumer_order in consumer_orders
-        ]
+        keys = selected_columns(info, ConsumerOrder)
+        if keys is not None:
+            return consumer_order_dao.get_all_consumer_order_rows(keys)
+        consumer_orders = consumer_order_dao.get_all_consumer_orders(load_options(info, ConsumerOrder, project=True))
+        return [consumer_order_schema(consumer_order) for consumer_order in consumer_orders]
 
     # ConsumerOrderItem queries
     @strawberry.field
-    def get_consumer_order_item_by_id(self, consumer_order_item_id: int) -> Optional[ConsumerOrderItemSchema]:
-        consumer_order_item_dao = ConsumerOrderItemDAO(session)
-        consumer_order_item = consumer_order_item_dao.get_consumer_order_item_by_id(consumer_order_item_id)
-        return ConsumerOrderItemSchema(
-            id=consumer_order_item.id,
-            consumer_order_id=consumer_order_item.consumer_order_id,
-            product_id=consumer_order_item.product_id,
-            item_name=consumer_order_item.item_name,
-            quantity=consumer_order_item.quantity,
-            unit_price=consumer_order_item.unit_price,
-            total_price=consumer_order_item.total_price,
-        ) if consumer_order_item else None
+    async def get_consumer_order_item_by_id(self, info: strawberry.Info, consumer_order_item_id: int) -> Optional[ConsumerOrderItemSchema]:
+        options = load_options(info, ConsumerOrderItem)
+        if options:
+            consumer_order_item = ConsumerOrderItemDAO(session).get_consumer_order_item_by_id(consumer_order_item_id, options)
+        else:
+            consumer_order_item = await get_loaders(info.context, session).consumer_order_item.load(consumer_order_item_id)
+        return consumer_order_item_schema(consumer_order_item) if consumer_order_item else None
     
     @strawberry.field
-    def get_all_consumer_order_items(self) -> List[ConsumerOrderItemSchema]:
+    def get_all_consumer_order_items(self, info: strawberry.Info) -> List[ConsumerOrderItemSchema]:
         consumer_order_item_dao = ConsumerOrderItemDAO(session)
-        consumer_order_items = consumer_order_item_dao.get_all_consumer_order_items()
-        return [
-            ConsumerOrderItemSchema(
-                id=consumer_order_item.id,
-                consumer_order_id=consumer_order_item.consumer_order_id,
-                product_id=consumer_order_item.product_id,
-                item_name=consumer_order_item.item_name,
-                quantity=consumer_order_item.quantity,
-                unit_price=consumer_order_item.unit_price,
-                total_price=consumer_order_item.total_price,
-            )
-            for consumer_order_item in consumer_order_items
-        ]
+        keys = selected_columns(info, ConsumerOrderItem)
+        if keys is not None:
+            return consumer_order_item_dao.get_all_consumer_order_item_rows(keys)
+        consumer_order_items = consumer_order_item_dao.get_all_consumer_order_items(load_options(info, ConsumerOrderItem, project=True))
+        return [consumer_order_item_schema(consumer_order_item) for consumer_order_item in consumer_order_items]
 
     # Consumer queries
     @strawberry.field
-    def get_consumer_by_id(self, consumer_id: int) -> Optional[ConsumerSchema]:
-        consumer_dao = ConsumerDAO(session)
-        consumer = consumer_dao.get_consumer_by_id(consumer_id)
-        return ConsumerSchema(id=consumer.id, name=consumer.name, contact_number=consumer.contact_number) if consumer else None
+    async def get_consumer_by_id(self, info: strawberry.Info, consumer_id: int) -> Optional[ConsumerSchema]:
+        options = load_options(info, Consumer)
+        if options:
+            consumer = ConsumerDAO(session).get_consumer_by_id(consumer_id, options)
+        else:
+            consumer = await get_loaders(info.context, session).consumer.load(consumer_id)
+        return consumer_schema(consumer) if consumer else None
 
     @strawberry.field
     def get_consumers_by_name(self, name: str) -> List[ConsumerSchema]:
@@ -300,13 +538,13 @@ class Query:
         ]
     
     @strawberry.field
-    def get_all_consumers(self) -> List[ConsumerSchema]:
+    def get_all_consumers(self, info: strawberry.Info) -> List[ConsumerSchema]:
         consumer_dao = ConsumerDAO(session)
-        consumers = consumer_dao.get_all_consumers()
-        return [
-            ConsumerSchema(id=consumer.id, name=consumer.name, contact_number=consumer.contact_number)
-            for consumer in consumers
-        ]
+        keys = selected_columns(info, Consumer)
+        if keys is not None:
+            return consumer_dao.get_all_consumer_rows(keys)
+        consumers = consumer_dao.get_all_consumers(load_options(info, Consumer, project=True))
+        return [consumer_schema(consumer) for consumer in consumers]
     
     @strawberry.field
     def get_products_by_category_id(category_id: int) -> List[ProductSchema]:
@@ -374,22 +612,110 @@ class Query:
         return product_dao.get_products_by_supplier_order_item(supplier_order_item_id)
     
     @strawberry.field
-    def get_consumer_orders_by_order_date(self, order_date: date) -> List[ConsumerOrderSchema]:
+    def get_consumer_orders_by_order_date(self, info: strawberry.Info, order_date: date) -> List[ConsumerOrderSchema]:
         consumer_order_dao = ConsumerOrderDAO(session)
+        keys = selected_columns(info, ConsumerOrder)
+        if keys is not None:
+            return consumer_order_dao.get_consumer_order_rows_by_order_date(order_date, keys)
         return consumer_order_dao.get_consumer_orders_by_order_date(order_date)
     
     @strawberry.field
-    def get_supplier_orders_by_order_date(self, order_date: date) -> List[SupplierOrderSchema]:
+    def get_supplier_orders_by_order_date(self, info: strawberry.Info, order_date: date) -> List[SupplierOrderSchema]:
         supplier_order_dao = SupplierOrderDAO(session)
+        keys = selected_columns(info, SupplierOrder)
+        if keys is not None:
+            return supplier_order_dao.get_supplier_order_rows_by_order_date(order_date, keys)
         return supplier_order_dao.get_supplier_orders_by_order_date(order_date)
+
+    # Date-range queries; from and to are both inclusive and either may be omitted.
+    @strawberry.field
+    def get_supplier_orders_by_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        supplier_id: Optional[int] = None,
+        sort: SortOrder = SortOrder.ASC,
+    ) -> List[SupplierOrderSchema]:
+        supplier_order_dao = SupplierOrderDAO(session)
+        supplier_orders = supplier_order_dao.get_supplier_orders_by_date_range(
+            from_date, to_date, supplier_id, sort == SortOrder.DESC
+        )
+        return [
+            SupplierOrderSchema(
+                id=supplier_order.id,
+                supplier_id=supplier_order.supplier_id,
+                order_date=supplier_order.order_date,
+                total_amount=supplier_order.total_amount,
+            )
+            for supplier_order in supplier_orders
+        ]
+
+    @strawberry.field
+    def get_consumer_orders_by_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        consumer_id: Optional[int] = None,
+        sort: SortOrder = SortOrder.ASC,
+    ) -> List[ConsumerOrderSchema]:
+        consumer_order_dao = ConsumerOrderDAO(session)
+        consumer_orders = consumer_order_dao.get_consumer_orders_by_date_range(
+            from_date, to_date, consumer_id, sort == SortOrder.DESC
+        )
+        return [
+            ConsumerOrderSchema(
+                id=consumer_order.id,
+                consumer_id=consumer_order.consumer_id,
+                order_date=consumer_order.order_date,
+                total_amount=consumer_order.total_amount,
+            )
+            for consumer_order in consumer_orders
+        ]
+
+    @strawberry.field
+    def get_products_by_supplier_order_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        supplier_id: Optional[int] = None,
+    ) -> List[ProductSchema]:
+        product_dao = ProductDAO(session)
+        products = product_dao.get_products_by_supplier_order_date_range(from_date, to_date, supplier_id)
+        return [
+            ProductSchema(
+                id=product.id,
+                category_id=product.category_id,
+                name=product.name,
+                unit_price=product.unit_price,
+                description=product.description,
+            )
+            for product in products
+        ]
+
+    @strawberry.field
+    def get_products_by_consumer_order_date_range(
+        self,
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        consumer_id: Optional[int] = None,
+    ) -> List[ProductSchema]:
+        product_dao = ProductDAO(session)
+        products = product_dao.get_products_by_consumer_order_date_range(from_date, to_date, consumer_id)
+        return [
+            ProductSchema(
+                id=product.id,
+                category_id=product.category_id,
+                name=product.name,
+                unit_price=product.unit_price,
+                description=product.description,
+            )
+            for product in products
+        ]
     
     @strawberry.field
     def get_supplier_by_name(supplier_name: str) -> Optional[SupplierSchema]:
-        supplier = (
-            session.query(Supplier)
-            .filter(func.lower(Supplier.name) == func.lower(supplier_name))
-            .first()
-        )
+        supplier_dao = SupplierDAO(session)
+        supplier = supplier_dao.get_supplier_by_name(supplier_name)
         
         if supplier:
             return SupplierSchema(
@@ -412,9 +738,8 @@ class Query:
 
     
     @strawberry.field
-    def get_supplier_by_productid(self, product_id: int) -> Optional[SupplierSchema]:
-        product_dao = ProductDAO(session)
-        supplier = product_dao.get_supplier_by_productid(product_id)
+    async def get_supplier_by_productid(self, info: strawberry.Info, product_id: int) -> Optional[SupplierSchema]:
+        supplier = await get_loaders(info.context, session).supplier_by_product.load(product_id)
         
         if supplier:
             return SupplierSchema(
@@ -472,8 +797,11 @@ class Query:
     
 
     @strawberry.field
-    def get_supplier_orders_by_supplier_id(self, supplier_id: int) -> List[SupplierOrderSchema]:
+    def get_supplier_orders_by_supplier_id(self, info: strawberry.Info, supplier_id: int) -> List[SupplierOrderSchema]:
         supplier_order_dao = SupplierOrderDAO(session)
+        keys = selected_columns(info, SupplierOrder)
+        if keys is not None:
+            return supplier_order_dao.get_supplier_order_rows_by_supplier_id(supplier_id, keys)
         supplier_orders = supplier_order_dao.get_supplier_orders_by_supplier_id(supplier_id)
         return [
             SupplierOrderSchema(
@@ -571,6 +899,272 @@ class Query:
         ]
     
 
+    @strawberry.field
+    def get_catalog_cache_stats(self, info: strawberry.Info) -> CacheStatsSchema:
+        require_admin(info)
+        return CacheStatsSchema(**catalog_cache.stats())
+
+    @strawberry.field
+    def get_db_pool_stats(self, info: strawberry.Info) -> PoolStatsSchema:
+        require_admin(info)
+        return PoolStatsSchema(**pool_stats(engine.pool))
+
+    @strawberry.field
+    def get_slow_queries(self, info: strawberry.Info, limit: int = 20) -> List[SlowQuerySchema]:
+        # Most recent first; plans appear for the sampled statements only.
+        require_admin(info)
+        if slow_query_log is None:
+            return []
+        return [SlowQuerySchema(**vars(record)) for record in slow_query_log.slow_queries(min(limit, SLOW_QUERY_RECENT))]
+
+    # Stock queries
+    @strawberry.field
+    async def stock_level(self, info: strawberry.Info, product_id: int) -> StockLevelSchema:
+        stock_level = await get_loaders(info.context, session).stock_level.load(product_id)
+        return StockLevelSchema(
+            product_id=stock_level.product_id,
+            quantity=stock_level.quantity,
+            updated_at=stock_level.updated_at,
+        )
+
+    @strawberry.field
+    def stock_levels(self, ids: List[int]) -> List[StockLevelSchema]:
+        stock_level_dao = StockLevelDAO(session)
+        stock_levels = {
+            stock_level.product_id: stock_level
+            for stock_level in stock_level_dao.get_stock_levels_by_product_ids(ids)
+        }
+        return [
+            StockLevelSchema(
+                product_id=stock_level.product_id,
+                quantity=stock_level.quantity,
+                updated_at=stock_level.updated_at,
+            )
+            for stock_level in (stock_levels.get(product_id) for product_id in ids)
+            if stock_level is not None
+        ]
+
+    # Recommendation queries
+    @strawberry.field
+    def frequently_bought_with(self, product_id: int, limit: int = 5) -> List[RecommendationSchema]:
+        recommendation_dao = RecommendationDAO(session)
+        return [
+            RecommendationSchema(
+                product=ProductSchema(
+                    id=product.id,
+                    category_id=product.category_id,
+                    name=product.name,
+                    unit_price=product.unit_price,
+                    description=product.description,
+                ),
+                order_count=order_count,
+            )
+            for product, order_count in recommendation_dao.get_frequently_bought_with(product_id, limit)
+        ]
+
+    # Search queries, best match first
+    @strawberry.field
+    def search_consumers(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[ConsumerSearchResultSchema]:
+        search_dao = SearchDAO(session)
+        hits, has_next_page = search_dao.search_consumers(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [
+                ConsumerSearchResultSchema(
+                    consumer=ConsumerSchema(id=consumer.id, name=consumer.name, contact_number=consumer.contact_number),
+                    score=score,
+                )
+                for consumer, score in hits
+            ],
+            has_next_page,
+            keys=[[score, consumer.id] for consumer, score in hits],
+        )
+
+    @strawberry.field
+    def search_suppliers(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[SupplierSearchResultSchema]:
+        search_dao = SearchDAO(session)
+        hits, has_next_page = search_dao.search_suppliers(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [
+                SupplierSearchResultSchema(
+                    supplier=SupplierSchema(id=supplier.id, name=supplier.name, contact_number=supplier.contact_number),
+                    score=score,
+                )
+                for supplier, score in hits
+            ],
+            has_next_page,
+            keys=[[score, supplier.id] for supplier, score in hits],
+        )
+
+    @strawberry.field
+    def search_products(
+        self, query: str, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ) -> Connection[ProductSearchResultSchema]:
+        search_dao = SearchDAO(session)
+        hits, has_next_page = search_dao.search_products(query, page_size(first), decode_cursor(after))
+        return build_connection(
+            [
+                ProductSearchResultSchema(
+                    product=ProductSchema(
+                        id=product.id,
+                        category_id=product.category_id,
+                        name=product.name,
+                        unit_price=product.unit_price,
+                        description=product.description,
+                    ),
+                    score=score,
+                )
+                for product, score in hits
+            ],
+            has_next_page,
+            keys=[[score, product.id] for product, score in hits],
+        )
+
+    # Autocomplete, answered from the in-process prefix index
+    @strawberry.field
+    def suggest(self, prefix: str, limit: int = 10, kinds: Optional[List[SuggestionKind]] = None) -> List[SuggestionSchema]:
+        suggestion_index.ensure_loaded(session)
+        return [
+            SuggestionSchema(kind=SuggestionKind(suggestion.kind), id=suggestion.id, name=suggestion.name)
+            for suggestion in suggestion_index.suggest(prefix, limit, [kind.value for kind in kinds] if kinds else None)
+        ]
+
+    # Paginated list queries
+    @strawberry.field
+    def get_all_suppliers_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[SupplierSchema]:
+        supplier_dao = SupplierDAO(session)
+        suppliers, has_next_page = supplier_dao.get_suppliers_page(
+            page_size(first), decode_cursor(after), options=load_options(info, Supplier, CONNECTION_PATH, project=True)
+        )
+        return build_connection(
+            [supplier_schema(supplier) for supplier in suppliers],
+            has_next_page,
+        )
+
+    @strawberry.field
+    def get_all_products_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ProductSchema]:
+        product_dao = ProductDAO(session)
+        products, has_next_page = product_dao.get_products_page(
+            page_size(first), decode_cursor(after), options=load_options(info, ProductModel, CONNECTION_PATH, project=True)
+        )
+        return build_connection(
+            [product_schema(product) for product in products],
+            has_next_page,
+        )
+
+    @strawberry.field
+    def get_all_categories_connection(self, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[CategorySchema]:
+        category_dao = CategoryDAO(session)
+        categories, has_next_page = category_dao.get_categories_page(page_size(first), decode_cursor(after))
+        return build_connection(
+            [
+                CategorySchema(id=category.id, category_name=category.category_name)
+                for category in categories
+            ],
+            has_next_page,
+        )
+
+    @strawberry.field
+    def get_all_supplier_orders_connection(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        order_by_date: bool = False,
+    ) -> Connection[SupplierOrderSchema]:
+        supplier_order_dao = SupplierOrderDAO(session)
+        # Keyset cursors over (order_date, id) need the date even when it is not selected.
+        keep = ("order_date",) if order_by_date else ()
+        options = load_options(info, SupplierOrder, CONNECTION_PATH, project=True, keep=keep)
+        supplier_orders, has_next_page = supplier_order_dao.get_supplier_orders_page(
+            page_size(first), decode_cursor(after), order_by_date, options=options
+        )
+        return build_connection(
+            [supplier_order_schema(supplier_order) for supplier_order in supplier_orders],
+            has_next_page,
+            ("order_date", "id") if order_by_date else ("id",),
+        )
+
+    @strawberry.field
+    def get_all_supplier_order_items_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[SupplierOrderItemSchema]:
+        supplier_order_item_dao = SupplierOrderItemDAO(session)
+        supplier_order_items, has_next_page = supplier_order_item_dao.get_supplier_order_items_page(
+            page_size(first), decode_cursor(after), options=load_options(info, SupplierOrderItem, CONNECTION_PATH, project=True)
+        )
+        return build_connection(
+            [
+                SupplierOrderItemSchema(
+                    id=supplier_order_item.id,
+                    supplier_order_id=supplier_order_item.supplier_order_id,
+                    product_id=supplier_order_item.product_id,
+                    item_name=supplier_order_item.item_name,
+                    quantity=supplier_order_item.quantity,
+                    unit_price=supplier_order_item.unit_price,
+                    total_price=supplier_order_item.total_price,
+                )
+                for supplier_order_item in supplier_order_items
+            ],
+            has_next_page,
+        )
+
+    @strawberry.field
+    def get_all_consumer_orders_connection(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        order_by_date: bool = False,
+    ) -> Connection[ConsumerOrderSchema]:
+        consumer_order_dao = ConsumerOrderDAO(session)
+        # Keyset cursors over (order_date, id) need the date even when it is not selected.
+        keep = ("order_date",) if order_by_date else ()
+        options = load_options(info, ConsumerOrder, CONNECTION_PATH, project=True, keep=keep)
+        consumer_orders, has_next_page = consumer_order_dao.get_consumer_orders_page(
+            page_size(first), decode_cursor(after), order_by_date, options=options
+        )
+        return build_connection(
+            [consumer_order_schema(consumer_order) for consumer_order in consumer_orders],
+            has_next_page,
+            ("order_date", "id") if order_by_date else ("id",),
+        )
+
+    @strawberry.field
+    def get_all_consumer_order_items_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ConsumerOrderItemSchema]:
+        consumer_order_item_dao = ConsumerOrderItemDAO(session)
+        consumer_order_items, has_next_page = consumer_order_item_dao.get_consumer_order_items_page(
+            page_size(first), decode_cursor(after), options=load_options(info, ConsumerOrderItem, CONNECTION_PATH, project=True)
+        )
+        return build_connection(
+            [
+                ConsumerOrderItemSchema(
+                    id=consumer_order_item.id,
+                    consumer_order_id=consumer_order_item.consumer_order_id,
+                    product_id=consumer_order_item.product_id,
+                    item_name=consumer_order_item.item_name,
+                    quantity=consumer_order_item.quantity,
+                    unit_price=consumer_order_item.unit_price,
+                    total_price=consumer_order_item.total_price,
+                )
+                for consumer_order_item in consumer_order_items
+            ],
+            has_next_page,
+        )
+
+    @strawberry.field
+    def get_all_consumers_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[ConsumerSchema]:
+        consumer_dao = ConsumerDAO(session)
+        consumers, has_next_page = consumer_dao.get_consumers_page(
+            page_size(first), decode_cursor(after), options=load_options(info, Consumer, CONNECTION_PATH, project=True)
+        )
+        return build_connection(
+            [consumer_schema(consumer) for consumer in consumers],
+            has_next_page,
+        )
+
+
 @strawberry.type
 class Mutation:
     # Supplier mutations
@@ -639,6 +1233,18 @@ class Mutation:
         product_dao = ProductDAO(session)
         return product_dao.delete_product(product_id)
 
+    @strawberry.mutation
+    def import_catalog(self, file: Upload, format: str = "csv") -> CatalogImportSchema:
+        stream = io.TextIOWrapper(file.stream, encoding="utf-8", newline="")
+        result = import_catalog(engine, stream, format)
+        return CatalogImportSchema(
+            inserted=result.inserted,
+            updated=result.updated,
+            rejected=result.rejected,
+            suppliers_inserted=result.suppliers_inserted,
+            categories_inserted=result.categories_inserted,
+        )
+
     # Category mutations
     @strawberry.mutation
     def create_category(self, category_name: str) -> CategorySchema:
@@ -662,7 +1268,7 @@ class Mutation:
     def create_supplier_order(
         self,
         supplier_id: int,
-        order_date: str,
+        order_date: date,
         total_amount: float,
     ) -> SupplierOrderSchema:
         supplier_order_dao = SupplierOrderDAO(session)
@@ -678,7 +1284,7 @@ class Mutation:
     def update_supplier_order(
         self,
         supplier_order_id: int,
-        order_date: Optional[str] = None,
+        order_date: Optional[date] = None,
         total_amount: Optional[float] = None,
     ) -> Optional[SupplierOrderSchema]:
         supplier_order_dao = SupplierOrderDAO(session)
@@ -708,14 +1314,13 @@ class Mutation:
     ) -> SupplierOrderItemSchema:
         supplier_order_item_dao = SupplierOrderItemDAO(session)
         supplier_order_item = supplier_order_item_dao.create_supplier_order_item(
-            supplier_order_id, product_id, item_name, quantity, unit_price, total_price
+            supplier_order_id=supplier_order_id,
+            product_id=product_id,
+            item_name=item_name,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=total_price,
         )
-        if supplier_order_item.quantity is not None and supplier_order_item.product and supplier_order_item.product.unit_price is not None:
-                supplier_order_item.total_price = supplier_order_item.quantity * supplier_order_item.unit_price
-                
-        else:
-            supplier_order_item.total_price = 0 # Set a default value if any of the required fields are None
-            
         return SupplierOrderItemSchema(
             id=supplier_order_item.id,
             supplier_order_id=supplier_order_item.supplier_order_id,
@@ -727,6 +1332,25 @@ class Mutation:
         )
 
     
+    @strawberry.mutation
+    def create_supplier_order_items(self, supplier_order_id: int, items: List[OrderItemInput]) -> List[SupplierOrderItemSchema]:
+        supplier_order_item_dao = SupplierOrderItemDAO(session)
+        supplier_order_items = supplier_order_item_dao.create_supplier_order_items(
+            supplier_order_id, [strawberry.asdict(item) for item in items]
+        )
+        return [
+            SupplierOrderItemSchema(
+                id=supplier_order_item.id,
+                supplier_order_id=supplier_order_item.supplier_order_id,
+                product_id=supplier_order_item.product_id,
+                item_name=supplier_order_item.item_name,
+                quantity=supplier_order_item.quantity,
+                unit_price=supplier_order_item.unit_price,
+                total_price=supplier_order_item.total_price,
+            )
+            for supplier_order_item in supplier_order_items
+        ]
+
     @strawberry.mutation
     def update_supplier_order_item(
         self,
@@ -737,29 +1361,15 @@ class Mutation:
         total_price: Optional[float] = None,
     ) -> Optional[SupplierOrderItemSchema]:
         supplier_order_item_dao = SupplierOrderItemDAO(session)
-        supplier_order_item = supplier_order_item_dao.get_supplier_order_item_by_id(supplier_order_item_id)
+        supplier_order_item = supplier_order_item_dao.update_supplier_order_item(
+            supplier_order_item_id,
+            item_name=item_name,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=total_price,
+        )
 
         if supplier_order_item:
-            if item_name is not None:
-                supplier_order_item.item_name = item_name
-            if quantity is not None:
-                supplier_order_item.quantity = quantity
-            if unit_price is not None:
-                supplier_order_item.unit_price = unit_price
-            if total_price is not None:
-                supplier_order_item.total_price = total_price
-            elif (
-                supplier_order_item.quantity is not None
-                and supplier_order_item.unit_price is not None
-            ):
-                supplier_order_item.total_price = (
-                    supplier_order_item.quantity * supplier_order_item.unit_price
-                )
-            else:
-                supplier_order_item.total_price = 0  # Set a default value if any of the required fields are None
-
-            session.commit()
-
             return SupplierOrderItemSchema(
                 id=supplier_order_item.id,
                 supplier_order_id=supplier_order_item.supplier_order_id,
@@ -784,7 +1394,7 @@ class Mutation:
     def create_consumer_order(
         self,
         consumer_id: int,
-        order_date: str,
+        order_date: date,
         total_amount: float,
     ) -> ConsumerOrderSchema:
         consumer_order_dao = ConsumerOrderDAO(session)
@@ -800,7 +1410,7 @@ class Mutation:
     def update_consumer_order(
         self,
         consumer_order_id: int,
-        order_date: Optional[str] = None,
+        order_date: Optional[date] = None,
         total_amount: Optional[float] = None,
     ) -> Optional[ConsumerOrderSchema]:
         consumer_order_dao = ConsumerOrderDAO(session)
@@ -894,7 +1504,7 @@ class Mutation:
     def create_consumer_order(
         self,
         consumer_id: int,
-        order_date: str,
+        order_date: date,
         total_amount: float,
     ) -> ConsumerOrderSchema:
         consumer_order_dao = ConsumerOrderDAO(session)
@@ -910,7 +1520,7 @@ class Mutation:
     def update_consumer_order(
         self,
         consumer_order_id: int,
-        order_date: Optional[str] = None,
+        order_date: Optional[date] = None,
         total_amount: Optional[float] = None,
     ) -> Optional[ConsumerOrderSchema]:
         consumer_order_dao = ConsumerOrderDAO(session)
@@ -986,6 +1596,25 @@ class Mutation:
         consumer_order_item_dao = ConsumerOrderItemDAO(session)
         return consumer_order_item_dao.delete_consumer_order_item(consumer_order_item_id)
 
+    @strawberry.mutation
+    def create_consumer_order_items(self, consumer_order_id: int, items: List[OrderItemInput]) -> List[ConsumerOrderItemSchema]:
+        consumer_order_item_dao = ConsumerOrderItemDAO(session)
+        consumer_order_items = consumer_order_item_dao.create_consumer_order_items(
+            consumer_order_id, [strawberry.asdict(item) for item in items]
+        )
+        return [
+            ConsumerOrderItemSchema(
+                id=consumer_order_item.id,
+                consumer_order_id=consumer_order_item.consumer_order_id,
+                product_id=consumer_order_item.product_id,
+                item_name=consumer_order_item.item_name,
+                quantity=consumer_order_item.quantity,
+                unit_price=consumer_order_item.unit_price,
+                total_price=consumer_order_item.total_price,
+            )
+            for consumer_order_item in consumer_order_items
+        ]
+
     # Consumer mutations
     @strawberry.mutation
     def create_consumer(self, name: str, contact_number: str) -> ConsumerSchema:
@@ -1010,4 +1639,4 @@ class Mutation:
         return consumer_dao.delete_consumer(consumer_id)
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[*document_extensions, QueryCost, *recording_extensions, *metrics_extensions])
\ No newline at end of file
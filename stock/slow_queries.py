@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from metrics import OVERFLOW_LABEL, current_resolver
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # pragma: no cover - greenlet ships with the asyncio extra
+    getcurrent = None
+
+SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 500))
+# Slow statements always reach getSlowQueries; the JSON-lines file is written only when a path is set.
+SLOW_QUERY_LOG_PATH = os.environ.get("SLOW_QUERY_LOG_PATH")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", 5))
+
+# EXPLAIN ANALYZE runs the statement again, so only a sample of slow statements is
+# explained, and the same statement at most once per interval.
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.2))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 600))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 10000))
+
+# Recent slow statements kept in memory for the getSlowQueries query.
+SLOW_QUERY_RECENT = 200
+
+# Longest parameter value kept in a record.
+MAX_PARAMETER_LENGTH = 200
+
+DAO_MODULES = ("dao.py", "async_dao.py")
+
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+@dataclass
+class SlowQuery:
+    recorded_at: datetime
+    duration_ms: float
+    engine: str
+    statement: str
+    parameters: str
+    resolver: Optional[str]
+    dao_method: Optional[str]
+    plan: Optional[str] = None
+
+
+def _parameters(parameters) -> str:
+    def short(value):
+        text = value if isinstance(value, str) else repr(value)
+        return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + "..."
+
+    if isinstance(parameters, dict):
+        return json.dumps({str(key): short(value) for key, value in parameters.items()})
+    if isinstance(parameters, (list, tuple)):
+        return json.dumps([short(value) for value in parameters])
+    return json.dumps(short(parameters))
+
+
+def _frames():
+    frame = sys._getframe(2)
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+    # Under the asyncio extension the statement runs in a greenlet; the DAO
+    # coroutine that awaited it is on the parent greenlet's stack.
+    if getcurrent is not None and getcurrent().parent is not None:
+        frame = getcurrent().parent.gr_frame
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+
+
+def dao_method() -> Optional[str]:
+    """Name of the innermost DAO method on the calling stack, e.g. ``ProductDAO.get_all_products``."""
+    for frame in _frames():
+        if frame.f_code.co_filename.endswith(DAO_MODULES) and "self" in frame.f_locals:
+            return f"{type(frame.f_locals['self']).__name__}.{frame.f_code.co_name}"
+    return None
+
+
+class SlowQueryLog:
+    """Flags statements slower than a threshold and records them from a background thread.
+
+    The request thread only compares a timer against the threshold; building the
+    record's plan and writing it out happen on the worker, so neither EXPLAIN nor
+    disk I/O adds to the latency of the slow request itself.
+    """
+
+    def __init__(self, threshold_ms: float, path: Optional[str], explain_sample_rate: float = SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+        self.threshold = threshold_ms / 1000
+        self.explain_sample_rate = explain_sample_rate
+        self.recent: "deque[SlowQuery]" = deque(maxlen=SLOW_QUERY_RECENT)
+        self._explained_at: Dict[str, float] = {}
+        self._pending: "queue.Queue" = queue.Queue(maxsize=1000)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.dropped = 0
+        self.logger = logging.getLogger("stock.slow_queries")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if path:
+            self.logger.addHandler(RotatingFileHandler(path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS))
+
+    def instrument(self, engine, name: str, explain_engine=None) -> None:
+        """Watch statements on ``engine``; plans are captured through ``explain_engine`` when given.
+
+        ``explain_engine`` must use the same DBAPI paramstyle as ``engine``, so the
+        asyncio engine is registered without one.
+        """
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+            if elapsed >= self.threshold:
+                self._flag(elapsed, name, statement, parameters, None if executemany else explain_engine)
+
+        def handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("slow_query_started"):
+                connection.info["slow_query_started"].pop()
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+
+    def _flag(self, elapsed: float, name: str, statement: str, parameters, explain_engine) -> None:
+        resolver = current_resolver.get()
+        record = SlowQuery(
+            recorded_at=datetime.now(timezone.utc),
+            duration_ms=round(elapsed * 1000, 3),
+            engine=name,
+            statement=statement,
+            parameters=_parameters(parameters),
+            resolver=None if resolver == OVERFLOW_LABEL else resolver,
+            dao_method=dao_method(),
+        )
+        self._ensure_worker()
+        try:
+            self._pending.put_nowait((record, parameters, explain_engine))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            record, parameters, explain_engine = self._pending.get()
+            if explain_engine is not None and self._should_explain(record.statement):
+                try:
+                    record.plan = explain(explain_engine, record.statement, parameters)
+                except Exception as e:
+                    record.plan = f"EXPLAIN failed: {e}"
+            self.recent.append(record)
+            self.logger.info(json.dumps(dict(asdict(record), recorded_at=record.recorded_at.isoformat())))
+
+    def _should_explain(self, statement: str) -> bool:
+        if random.random() >= self.explain_sample_rate:
+            return False
+        now = time.monotonic()
+        if now - self._explained_at.get(statement, float("-inf")) < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        self._explained_at[statement] = now
+        return True
+
+    def slow_queries(self, limit: int = 20) -> List[SlowQuery]:
+        return list(reversed(self.recent))[:limit]
+
+
+def explain(engine, statement: str, parameters) -> str:
+    """The plan of ``statement``, run on its own connection and always rolled back.
+
+    On PostgreSQL read-only statements get EXPLAIN (ANALYZE, BUFFERS); anything
+    that may write is only planned, never executed a second time.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if engine.dialect.name == "postgresql":
+            cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            analyze = READ_ONLY.match(statement) and not DATA_MODIFYING.search(statement)
+            options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+            cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_PATH) if SLOW_QUERY_LOG_ENABLED else None
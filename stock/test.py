@@ -1,10 +1,35 @@
-from datetime import datetime
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from types import SimpleNamespace
 import unittest
-from sqlalchemy import create_engine
+from unittest import mock
+from sqlalchemy import create_engine, event, select
 from sqlalchemy.orm import sessionmaker
-from models import Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer
+from models import (
+    Supplier, Product, Category, SupplierOrder, SupplierOrderItem, ConsumerOrder, ConsumerOrderItem, Consumer, StockLevel, StockMovement,
+    ProductCoOccurrence, RecommendationState,
+)
 from sqlalchemy.ext.declarative import declarative_base
+from graphql import build_schema, lexicographic_sort_schema, parse, print_schema
+import database
+import query_cost
+from query_cost import DEFAULT_LIST_SIZE, LIST_SIZES, operation_cost
+from schemas import eager_loaded, schema
+from cache import MISSING
+from dao import (
+    CONSUMER_ORDER_ITEM, SUPPLIER_ORDER_ITEM, ConsumerDAO, ConsumerOrderDAO, ConsumerOrderItemDAO, ProductDAO,
+    StockLevelDAO, SupplierDAO, SupplierOrderDAO, SupplierOrderItemDAO,
+)
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size
+import recommendations
+from recommendations import count_co_occurrences, refresh_recommendations
 
 Base = declarative_base()
 
@@ -211,6 +236,368 @@ class TestModels(unittest.TestCase):
         self.assertEqual(retrieved_consumer.name, 'Test Consumer')
         self.assertEqual(retrieved_consumer.contact_number, '9876543210')
 
+    def test_stock_level(self):
+
+        product = Product(name='Test Product', unit_price=10.99, description='Test Description')
+        self.session.add(product)
+        self.session.commit()
+
+        stock_level = StockLevel(product_id=product.id, quantity=25, updated_at=datetime.now())
+        self.session.add(stock_level)
+        self.session.commit()
+
+        retrieved_stock_level = self.session.query(StockLevel).get(product.id)
+
+        self.assertEqual(retrieved_stock_level.product_id, product.id)
+        self.assertEqual(retrieved_stock_level.quantity, 25)
+
+
+class TestOrderLines(unittest.TestCase):
+    def setUp(self):
+
+        self.session = Session()
+
+    def tearDown(self):
+
+        self.session.rollback()
+        self.session.close()
+
+    def product(self, unit_price):
+        return ProductDAO(self.session).create_product('Test Product', unit_price, 'Test Description', None)
+
+    def consumer_order(self):
+        consumer = ConsumerDAO(self.session).create_consumer('Test Consumer', '9876543210')
+        return ConsumerOrderDAO(self.session).create_consumer_order(consumer.id, date.today(), 0)
+
+    def supplier_order(self):
+        supplier = SupplierDAO(self.session).create_supplier('Test Supplier', '1234567890')
+        return SupplierOrderDAO(self.session).create_supplier_order(supplier.id, date.today(), 0)
+
+    def stock_level(self, product_id):
+        return StockLevelDAO(self.session).get_stock_level(product_id).quantity
+
+    def test_stock_level_follows_order_lines(self):
+
+        product = self.product(2)
+        supplier_order = self.supplier_order()
+        SupplierOrderItemDAO(self.session).create_supplier_order_item(supplier_order.id, product.id, 'Received', 10, 2)
+        self.assertEqual(self.stock_level(product.id), 10)
+
+        item_dao = ConsumerOrderItemDAO(self.session)
+        consumer_order = self.consumer_order()
+        sold = item_dao.create_consumer_order_item(consumer_order.id, product.id, 'Sold', 3, 2)
+        self.assertEqual(self.stock_level(product.id), 7)
+
+        item_dao.update_consumer_order_item(sold.id, quantity=4)
+        self.assertEqual(self.stock_level(product.id), 6)
+
+        item_dao.delete_consumer_order_item(sold.id)
+        self.assertEqual(self.stock_level(product.id), 10)
+
+    def test_update_supplier_order_item_mutation_moves_stock(self):
+
+        product = self.product(2)
+        line = SupplierOrderItemDAO(self.session).create_supplier_order_item(self.supplier_order().id, product.id, 'Received', 10, 2).id
+        self.addCleanup(database.db_session.remove)
+
+        result = schema.execute_sync(
+            "mutation { updateSupplierOrderItem(supplierOrderItemId: %d, quantity: 4) { quantity } }" % line
+        )
+
+        self.assertIsNone(result.errors)
+        self.session.expire_all()
+        self.assertEqual(self.stock_level(product.id), 4)
+        movements = self.session.scalars(
+            select(StockMovement.quantity).where(StockMovement.source_id == line, StockMovement.source == SUPPLIER_ORDER_ITEM)
+            .order_by(StockMovement.id)
+        ).all()
+        self.assertEqual(movements, [10, -6])
+
+    def test_delete_consumer_reverses_its_lines(self):
+
+        product = self.product(2)
+        SupplierOrderItemDAO(self.session).create_supplier_order_item(self.supplier_order().id, product.id, 'Received', 10, 2)
+        consumer_order = self.consumer_order()
+        ConsumerOrderItemDAO(self.session).create_consumer_order_item(consumer_order.id, product.id, 'Sold', 3, 2)
+
+        ConsumerDAO(self.session).delete_consumer(consumer_order.consumer_id)
+
+        self.assertEqual(self.stock_level(product.id), 10)
+
+    def test_delete_supplier_reverses_its_lines(self):
+
+        product = self.product(2)
+        supplier_order = self.supplier_order()
+        item_dao = SupplierOrderItemDAO(self.session)
+        item_dao.create_supplier_order_item(supplier_order.id, product.id, 'Received', 10, 2)
+        item_dao.create_supplier_order_item(supplier_order.id, product.id, 'Received again', 5, 2)
+        ConsumerOrderItemDAO(self.session).create_consumer_order_item(self.consumer_order().id, product.id, 'Sold', 3, 2)
+
+        SupplierDAO(self.session).delete_supplier(supplier_order.supplier_id)
+
+        self.assertEqual(self.stock_level(product.id), -3)
+
+    def test_delete_product_reverses_its_lines(self):
+
+        product = self.product(2)
+        received = SupplierOrderItemDAO(self.session).create_supplier_order_item(self.supplier_order().id, product.id, 'Received', 10, 2).id
+        sold = ConsumerOrderItemDAO(self.session).create_consumer_order_item(self.consumer_order().id, product.id, 'Sold', 3, 2).id
+
+        # Where ON DELETE CASCADE is enforced the ledger goes with the product, so it is
+        # read in the deleting transaction, at the flush that removes the product row.
+        ledger = {}
+
+        def read_ledger(session, flush_context, instances):
+            if not any(isinstance(instance, Product) for instance in session.deleted):
+                return
+            with session.no_autoflush:
+                ledger["movements"] = session.execute(
+                    select(StockMovement.source, StockMovement.source_id, StockMovement.quantity)
+                    .where(StockMovement.product_id == product.id).order_by(StockMovement.id)
+                ).all()
+                ledger["level"] = session.scalar(select(StockLevel.quantity).where(StockLevel.product_id == product.id))
+
+        event.listen(self.session, "before_flush", read_ledger)
+        ProductDAO(self.session).delete_product(product.id)
+
+        self.assertEqual([tuple(movement) for movement in ledger["movements"]], [
+            (SUPPLIER_ORDER_ITEM, received, 10),
+            (CONSUMER_ORDER_ITEM, sold, -3),
+            (SUPPLIER_ORDER_ITEM, received, -10),
+            (CONSUMER_ORDER_ITEM, sold, 3),
+        ])
+        self.assertEqual(ledger["level"], 0)
+
+    def test_delete_product_updates_order_totals(self):
+
+        removed, kept = self.product(2), self.product(5)
+        consumer_order = self.consumer_order()
+        item_dao = ConsumerOrderItemDAO(self.session)
+        item_dao.create_consumer_order_item(consumer_order.id, removed.id, 'Removed', 3, 2)
+        item_dao.create_consumer_order_item(consumer_order.id, kept.id, 'Kept', 1, 5)
+
+        ProductDAO(self.session).delete_product(removed.id)
+
+        self.session.expire_all()
+        self.assertEqual(self.session.get(ConsumerOrder, consumer_order.id).total_amount, 5)
+
+    def test_supplier_order_item_mutations_keep_the_order_total(self):
+
+        product = self.product(2)
+        supplier_order = self.supplier_order()
+        self.addCleanup(database.db_session.remove)
+
+        created = schema.execute_sync(
+            'mutation { createSupplierOrderItem(supplierOrderId: %d, productId: %d, itemName: "Received", '
+            'quantity: 10, unitPrice: 2, totalPrice: 15) { id totalPrice } }' % (supplier_order.id, product.id)
+        )
+        line = created.data["createSupplierOrderItem"]
+        self.session.expire_all()
+        self.assertEqual(line["totalPrice"], 15)
+        self.assertEqual(self.session.get(SupplierOrderItem, line["id"]).total_price, 15)
+        self.assertEqual(self.session.get(SupplierOrder, supplier_order.id).total_amount, 15)
+
+        updated = schema.execute_sync(
+            "mutation { updateSupplierOrderItem(supplierOrderItemId: %d, quantity: 4) { totalPrice } }" % line["id"]
+        )
+        self.session.expire_all()
+        self.assertEqual(updated.data["updateSupplierOrderItem"]["totalPrice"], 8)
+        self.assertEqual(self.session.get(SupplierOrder, supplier_order.id).total_amount, 8)
+
+
+class TestPagination(unittest.TestCase):
+    def raw_cursor(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    def test_cursor_round_trip(self):
+
+        cursor = encode_cursor([date(2024, 1, 2), 7])
+
+        self.assertEqual(decode_cursor(cursor), ["2024-01-02", 7])
+
+    def test_invalid_cursors_are_rejected(self):
+
+        for value in (5, "abc", {"id": 5}, [[1]], [None], [True]):
+            with self.assertRaisesRegex(ValueError, "Invalid cursor"):
+                decode_cursor(self.raw_cursor(value))
+        with self.assertRaisesRegex(ValueError, "Invalid cursor"):
+            decode_cursor("not a cursor")
+
+    def test_page_size(self):
+
+        self.assertEqual(page_size(10), 10)
+        self.assertEqual(page_size(MAX_PAGE_SIZE + 1), MAX_PAGE_SIZE)
+        for first in (0, -1):
+            with self.assertRaises(ValueError):
+                page_size(first)
+
+
+class TestRecommendations(unittest.TestCase):
+    def test_new_orders_count_every_pair(self):
+
+        matrix, orders = count_co_occurrences([([1, 2, 3], [])])
+
+        self.assertEqual(orders, 1)
+        self.assertEqual(matrix[1], {2: 1, 3: 1})
+        self.assertEqual(matrix[2], {3: 1})
+
+    def test_lines_added_to_a_counted_order_only_add_new_pairs(self):
+
+        matrix, orders = count_co_occurrences([([1, 2, 3], [1, 2])])
+
+        self.assertEqual(orders, 0)
+        self.assertEqual(matrix[1], {3: 1})
+        self.assertEqual(matrix[2], {3: 1})
+
+    def test_stale_counts_are_recounted_without_deleted_lines(self):
+
+        session = Session()
+        self.addCleanup(session.close)
+        product_dao = ProductDAO(session)
+        kept = product_dao.create_product('Test Product', 2, 'Test Description', None).id
+        removed = product_dao.create_product('Test Product', 2, 'Test Description', None).id
+        consumer = ConsumerDAO(session).create_consumer('Test Consumer', '9876543210')
+        order = ConsumerOrderDAO(session).create_consumer_order(consumer.id, date.today(), 0).id
+        item_dao = ConsumerOrderItemDAO(session)
+        item_dao.create_consumer_order_item(order, kept, 'Kept', 1, 2)
+        line = item_dao.create_consumer_order_item(order, removed, 'Removed', 1, 2).id
+
+        def pair_count():
+            return session.scalar(select(ProductCoOccurrence.order_count).where(
+                ProductCoOccurrence.product_id == kept, ProductCoOccurrence.related_product_id == removed,
+            ))
+
+        with mock.patch.object(recommendations, "FULL_REFRESH_HOURS", 24):
+            refresh_recommendations(session)
+            self.assertEqual(pair_count(), 1)
+
+            item_dao.delete_consumer_order_item(line)
+            self.assertFalse(refresh_recommendations(session).full)
+            self.assertEqual(pair_count(), 1)
+
+            state = session.get(RecommendationState, recommendations.STATE_ID)
+            state.full_refreshed_at -= timedelta(hours=25)
+            session.commit()
+            self.assertTrue(refresh_recommendations(session).full)
+            self.assertIsNone(pair_count())
+
+
+class TestAsyncSchema(unittest.TestCase):
+    def test_same_sdl_as_the_flask_schema(self):
+
+        import async_schemas
+
+        # Rebuilt from the printed SDL so the sort does not depend on strawberry's enum values.
+        def sdl(strawberry_schema):
+            return print_schema(lexicographic_sort_schema(build_schema(str(strawberry_schema))))
+
+        self.assertEqual(sdl(async_schemas.schema), sdl(schema))
+
+
+class TestNestedFields(unittest.TestCase):
+    def test_orm_instances_resolve_their_own_relationships(self):
+
+        supplier = Supplier(name='Test Supplier', orders=[SupplierOrder(total_amount=0)])
+        self.assertEqual(eager_loaded(supplier, "orders"), supplier.orders)
+        self.assertIs(eager_loaded(Supplier(name='Test Supplier'), "orders"), MISSING)
+
+
+class TestQueryCost(unittest.TestCase):
+    def cost(self, query, variables=None):
+        return operation_cost(schema._schema, parse(query), None, variables)
+
+    def test_connection_cost(self):
+
+        cost, depth = self.cost("{ getAllSuppliersConnection(first: 10) { edges { node { id name } } pageInfo { hasNextPage } } }")
+
+        # first bounds everything below the connection: connection, edge + node, pageInfo.
+        self.assertEqual(cost, 10 * (1 + 2 + 1))
+        self.assertEqual(depth, 4)
+
+    def test_connection_cost_uses_variables(self):
+
+        query = "query ($first: Int!) { getAllSuppliersConnection(first: $first) { edges { node { id } } } }"
+
+        self.assertEqual(self.cost(query, {"first": 20})[0], 20 * (1 + 2))
+        self.assertEqual(self.cost(query, {"first": 100000})[0], 500 * (1 + 2))
+
+    def test_nested_list_cost(self):
+
+        cost, depth = self.cost("{ getAllSupplierOrders { id items { quantity product { name } } } }")
+
+        items = LIST_SIZES["SupplierOrderSchema.items"]
+        self.assertEqual(cost, DEFAULT_LIST_SIZE * (1 + items * (1 + 1)))
+        self.assertEqual(depth, 4)
+
+    def test_over_budget_is_rejected_before_sql(self):
+
+        query_cost.CLIENT_BUDGETS["tests"] = {"max_cost": 10}
+        self.addCleanup(query_cost.CLIENT_BUDGETS.pop, "tests")
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(database.engine, "before_cursor_execute", listener)
+        self.addCleanup(event.remove, database.engine, "before_cursor_execute", listener)
+        request = SimpleNamespace(headers={query_cost.CLIENT_HEADER: "tests"})
+
+        result = asyncio.run(schema.execute("{ getAllSuppliers { id name } }", context_value={"request": request}))
+
+        self.assertIsNone(result.data)
+        self.assertEqual(result.errors[0].extensions["code"], "QUERY_TOO_EXPENSIVE")
+        self.assertEqual(result.extensions["cost"]["requested"], DEFAULT_LIST_SIZE)
+        self.assertEqual(statements, [])
+
+
+class TestAdminQueries(unittest.TestCase):
+    def test_only_admin_clients_see_operational_queries(self):
+
+        import async_schemas
+
+        queries = {
+            "getSlowQueries": "{ getSlowQueries { statement parameters plan } }",
+            "getDbPoolStats": "{ getDbPoolStats { size checkedOut } }",
+            "getCatalogCacheStats": "{ getCatalogCacheStats { hits misses } }",
+        }
+        admin = SimpleNamespace(headers={query_cost.CLIENT_HEADER: "ops"})
+        other = SimpleNamespace(headers={query_cost.CLIENT_HEADER: "tests"})
+
+        for graphql_schema in (schema, async_schemas.schema):
+            for field, query in queries.items():
+                with self.subTest(schema=graphql_schema, field=field):
+                    with mock.patch.object(query_cost, "ADMIN_CLIENTS", {"ops"}):
+                        denied = asyncio.run(graphql_schema.execute(query, context_value={"request": other}))
+                        anonymous = asyncio.run(graphql_schema.execute(query, context_value={}))
+                        allowed = asyncio.run(graphql_schema.execute(query, context_value={"request": admin}))
+
+                    self.assertIsNone(denied.data)
+                    self.assertEqual(denied.errors[0].extensions["code"], "FORBIDDEN")
+                    self.assertEqual(anonymous.errors[0].extensions["code"], "FORBIDDEN")
+                    self.assertIsNone(allowed.errors)
+                    self.assertIn(field, allowed.data)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_output_is_written_for_an_error_free_run(self):
+
+        operations = [
+            "getSlowQueries", "getDbPoolStats", "getCatalogCacheStats", "getAllSuppliers", "getAllProducts", "getSupplierOrdersByOrderDate",
+            "createSupplierOrder", "createSupplierOrderItem", "createConsumerOrderItem",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            command = [
+                sys.executable, "benchmark.py", "--database-uri", f"sqlite:///{directory}/bench.db",
+                "--iterations", "1", "--warmup", "0", "--output", output,
+            ]
+            for operation in operations:
+                command += ["--only", operation]
+            run = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+
+            self.assertEqual(run.returncode, 0, run.stdout + run.stderr)
+            with open(output, encoding="utf-8") as stream:
+                results = json.load(stream)
+        self.assertEqual(sorted(results["operations"]), sorted(operations))
+        self.assertEqual([name for name, result in results["operations"].items() if result["errors"]], [])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file